@@ -1,3 +1,5 @@
 from .base import *
 from .exceptions import *
+from .subscriptions import *
 from .pool import pool
+from .bus import bus
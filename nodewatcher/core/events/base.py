@@ -3,7 +3,7 @@ import copy
 from django.utils import timezone
 
 from . import exceptions
-from .pool import pool
+from .bus import bus
 
 # Exports
 __all__ = [
@@ -57,8 +57,7 @@ class EventRecord(object):
         Posts an event to subscribed sinks.
         """
 
-        for sink in pool.get_all_sinks():
-            sink.post(self)
+        bus.post(self)
 
     def absent(self):
         """
@@ -66,10 +65,7 @@ class EventRecord(object):
         """
 
         # Generate the complementary event.
-        complement = ~self
-
-        for sink in pool.get_all_sinks():
-            sink.post(complement)
+        bus.post(~self)
 
     def post_or_absent(self, condition):
         """
@@ -144,16 +140,29 @@ class EventSink(object):
 
     name = None
 
-    def __init__(self, disable=False, filters=None, **kwargs):
+    def __init__(self, disable=False, filters=None, asynchronous=False, queue=None, max_backlog=None,
+                 drop_when_congested=False, **kwargs):
         """
         Class constructor.
 
         :param disable: Should the sink be disabled by default
+        :param asynchronous: Should events be delivered by a separate consumer
+        :param queue: Celery queue used for asynchronous delivery
+        :param max_backlog: Number of queued batches at which the queue is
+          considered congested
+        :param drop_when_congested: Should events be dropped when the queue is
+          congested instead of being delivered synchronously
         """
 
         self._enabled = not disable
         self._filters = {}
         self._filter_cfg = filters or {}
+        self.asynchronous = asynchronous
+        self.queue = queue
+        self.max_backlog = max_backlog
+        self.drop_when_congested = drop_when_congested
+        # Number of events dropped because of congestion.
+        self.dropped = 0
 
     @classmethod
     def get_name(cls):
@@ -224,14 +233,28 @@ class EventSink(object):
         :param event: Event record
         """
 
+        self.post_batch([event])
+
+    def post_batch(self, events):
+        """
+        Posts a batch of events to this sink. Events might be filtered by any
+        filters that are installed on this sink.
+
+        :param events: A list of event records
+        """
+
         if not self._enabled:
             return
 
-        for filter in self._filters.values():
-            if filter.enabled and not filter.filter(event):
-                return
+        filters = [filter for filter in self._filters.values() if filter.enabled]
+        events = [event for event in events if all(filter.filter(event) for filter in filters)]
+        if not events:
+            return
 
-        self.deliver(event)
+        if self.asynchronous:
+            bus.enqueue(self, events)
+        else:
+            self.deliver_batch(events)
 
     def deliver(self, event):
         """
@@ -241,3 +264,33 @@ class EventSink(object):
         """
 
         raise NotImplementedError
+
+    def deliver_batch(self, events):
+        """
+        Delivers a batch of events. Sinks may override this method to deliver
+        multiple events at once.
+
+        :param events: A list of event records to deliver
+        """
+
+        for event in events:
+            self.deliver(event)
+
+    def enter_scope(self, nodes):
+        """
+        Called before events related to the given nodes are posted. Sinks may
+        override this method to load any state they need for delivery.
+
+        :param nodes: A list of nodes
+        """
+
+        pass
+
+    def exit_scope(self, nodes):
+        """
+        Called after events related to the given nodes have been posted.
+
+        :param nodes: A list of nodes
+        """
+
+        pass
@@ -0,0 +1,166 @@
+import contextlib
+import logging
+import time
+
+from django.conf import settings
+
+from .pool import pool
+
+# Maximum number of events buffered within a batch before they are delivered.
+BATCH_SIZE = getattr(settings, 'EVENTS_BATCH_SIZE', 500)
+# Celery queue used for asynchronous event delivery.
+QUEUE = getattr(settings, 'EVENTS_QUEUE', 'events')
+# Interval (in seconds) after which the queue backlog is checked again.
+BACKLOG_CHECK_INTERVAL = 30
+
+logger = logging.getLogger(__name__)
+
+
+class EventBus(object):
+    """
+    Buffers posted events and delivers them to sinks in batches. Events
+    posted outside a batch are delivered immediately.
+    """
+
+    def __init__(self):
+        """
+        Class constructor.
+        """
+
+        self._buffer = []
+        self._depth = 0
+        # Total number of posted events, used to identify positions in the buffer.
+        self._posted = 0
+        # Last known queue backlogs and the times they were checked, indexed by queue.
+        self._backlog = {}
+
+    def post(self, event):
+        """
+        Posts an event to all sinks.
+
+        :param event: Event record
+        """
+
+        self._posted += 1
+        self._buffer.append(event)
+
+        if self._depth == 0 or len(self._buffer) >= BATCH_SIZE:
+            self.flush()
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Buffers all events posted within the block and delivers them when the
+        outermost block exits.
+        """
+
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                self.flush()
+
+    def mark(self):
+        """
+        Returns a marker of the current position in the buffer.
+        """
+
+        return self._posted
+
+    def discard(self, marker):
+        """
+        Discards buffered events posted after the given marker, for example
+        when the transaction that posted them has been rolled back. Events that
+        have already been delivered are not affected.
+
+        :param marker: Marker returned by `mark`
+        """
+
+        count = min(self._posted - marker, len(self._buffer))
+        if count > 0:
+            del self._buffer[-count:]
+
+    def flush(self):
+        """
+        Delivers all buffered events to sinks.
+        """
+
+        events, self._buffer = self._buffer, []
+        if not events:
+            return
+
+        for sink in pool.get_all_sinks():
+            try:
+                sink.post_batch(events)
+            except Exception:
+                logger.exception("Event sink '%s' has failed to deliver %d events." % (sink.get_name(), len(events)))
+
+    def get_backlog(self, queue):
+        """
+        Returns the number of batches waiting in the given queue.
+
+        :param queue: Queue name
+        :return: Number of queued batches or None when it cannot be determined
+        """
+
+        from nodewatcher import celery
+
+        try:
+            with celery.app.connection() as connection:
+                _, size, _ = connection.default_channel.queue_declare(queue=queue, passive=True)
+                return size
+        except Exception:
+            logger.exception("Unable to determine event queue backlog.")
+            return None
+
+    def is_congested(self, queue, max_backlog):
+        """
+        Checks whether the given queue has too large a backlog. The backlog is
+        only checked once per `BACKLOG_CHECK_INTERVAL`.
+
+        :param queue: Queue name
+        :param max_backlog: Maximum number of queued batches
+        :return: True if the queue is congested
+        """
+
+        now = time.time()
+        size, checked = self._backlog.get(queue, (0, None))
+        if checked is None or now - checked >= BACKLOG_CHECK_INTERVAL:
+            checked = now
+            size = self.get_backlog(queue)
+            if size is None:
+                size = self._backlog.get(queue, (0, None))[0]
+            self._backlog[queue] = (size, checked)
+
+        return size >= max_backlog
+
+    def enqueue(self, sink, events):
+        """
+        Queues events for asynchronous delivery to a sink. When the sink's queue
+        is congested, events are either dropped or delivered synchronously,
+        depending on sink configuration.
+
+        :param sink: Event sink instance
+        :param events: A list of event records
+        """
+
+        queue = sink.queue or QUEUE
+        if sink.max_backlog is not None and self.is_congested(queue, sink.max_backlog):
+            if sink.drop_when_congested:
+                sink.dropped += len(events)
+                logger.warning("Event queue '%s' is congested, sink '%s' dropped %d events (%d in total)." % (
+                    queue, sink.get_name(), len(events), sink.dropped
+                ))
+                return
+
+            # Deliver synchronously, which slows down the producers until the backlog is processed.
+            sink.deliver_batch(events)
+            return
+
+        from . import tasks
+
+        tasks.deliver_events.apply_async(args=(sink.get_name(), events), queue=queue)
+
+bus = EventBus()
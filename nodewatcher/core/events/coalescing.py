@@ -0,0 +1,61 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.serializers import json as serializers_json
+
+
+def get_coalesce_window():
+    """
+    Returns the window (in seconds) within which repeated events with the
+    same content are coalesced. Zero disables coalescing.
+    """
+
+    return getattr(settings, 'EVENTS_COALESCE_WINDOW', 0)
+
+
+def get_storm_rate():
+    """
+    Returns the maximum number of events related to a node within the storm
+    window. Zero disables storm suppression.
+    """
+
+    return getattr(settings, 'EVENTS_STORM_RATE', 0)
+
+
+def get_storm_window():
+    """
+    Returns the window (in seconds) over which the event rate of a node is
+    measured.
+    """
+
+    return getattr(settings, 'EVENTS_STORM_WINDOW', 300)
+
+
+def get_key(event):
+    """
+    Returns the coalescing key of an event or None if the event should not
+    be coalesced. Events are only coalesced with repeats that have the same
+    content and are related to the same nodes and users, so that events
+    reporting a change of state are never merged with events reporting a
+    different state.
+
+    Warnings are never coalesced as their sinks track their state.
+
+    :param event: Event record
+    """
+
+    from . import declarative
+
+    if not isinstance(event, declarative.NodeEventRecord) or isinstance(event, declarative.NodeWarningRecord):
+        return None
+    if not event.related_nodes:
+        return None
+
+    record = event.record.copy()
+    del record['timestamp']
+    record['related_nodes'] = sorted(set([str(getattr(node, 'pk', node)) for node in event.related_nodes]))
+    record['related_users'] = sorted(set([str(getattr(user, 'pk', user)) for user in event.related_users or []]))
+    record['absent'] = event.is_absent()
+
+    return hashlib.sha1(json.dumps(record, sort_keys=True, cls=serializers_json.DjangoJSONEncoder)).hexdigest()
@@ -0,0 +1,136 @@
+import random
+import time
+
+from optparse import make_option
+
+from django.core.management import base
+
+from ... import subscriptions
+
+# Event sources used for generated subscriptions and events.
+SOURCES = [
+    ('core.monitor', 'node_status'),
+    ('core.monitor', 'node_rebooted'),
+    ('monitor.interfaces', 'missing_interface'),
+    ('monitor.interfaces', 'type_mismatch'),
+    ('identity.public_key', 'mismatch'),
+    ('generator', 'build_ready'),
+]
+# Event severities.
+SEVERITIES = [1, 2, 3]
+
+
+class BenchmarkEvent(object):
+    """
+    A stand-in for node event records.
+    """
+
+    def __init__(self, source_name, source_type, severity, related_nodes):
+        self.source_name = source_name
+        self.source_type = source_type
+        self.severity = severity
+        self.related_nodes = related_nodes
+
+
+class Command(base.BaseCommand):
+    help = "Benchmarks matching of event bursts against subscriptions, comparing a linear scan with the subscription index."
+    option_list = base.BaseCommand.option_list + (
+        make_option(
+            '--subscriptions',
+            dest='subscriptions',
+            default=10000,
+            type=int,
+            help='Number of subscriptions',
+        ),
+        make_option(
+            '--nodes',
+            dest='nodes',
+            default=2000,
+            type=int,
+            help='Number of nodes',
+        ),
+        make_option(
+            '--bursts',
+            dest='bursts',
+            default=5,
+            type=int,
+            help='Number of event bursts',
+        ),
+        make_option(
+            '--events',
+            dest='events',
+            default=1000,
+            type=int,
+            help='Number of events in each burst',
+        ),
+        make_option(
+            '--seed',
+            dest='seed',
+            default=0,
+            type=int,
+            help='Random seed',
+        ),
+    )
+
+    def get_subscriptions(self, count, nodes):
+        result = []
+        for index in xrange(count):
+            source_name, source_type = random.choice(SOURCES)
+            if random.random() < 0.2:
+                source_type = None
+            if random.random() < 0.1:
+                source_name = None
+
+            result.append(subscriptions.Subscription(
+                'user%d' % (index % (count // 5 + 1)),
+                source_name=source_name,
+                source_type=source_type,
+                severity=random.choice(SEVERITIES + [None]),
+                nodes=random.sample(nodes, random.randint(1, 10)) if random.random() < 0.9 else None,
+            ))
+
+        return result
+
+    def get_burst(self, count, nodes):
+        # A burst comes from an outage, so most events have the same source.
+        return [
+            BenchmarkEvent(
+                *(SOURCES[0] if random.random() < 0.8 else random.choice(SOURCES)),
+                severity=random.choice(SEVERITIES),
+                related_nodes=[random.choice(nodes)]
+            )
+            for _ in xrange(count)
+        ]
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        nodes = range(options['nodes'])
+        subscription_list = self.get_subscriptions(options['subscriptions'], nodes)
+        bursts = [self.get_burst(options['events'], nodes) for _ in xrange(options['bursts'])]
+
+        start = time.time()
+        index = subscriptions.SubscriptionIndex()
+        for subscription in subscription_list:
+            index.add(subscription)
+        self.stdout.write("Indexed %d subscriptions in %.3f s." % (len(index), time.time() - start))
+
+        results = {}
+        for name, match in (('linear scan', lambda event: set([s for s in subscription_list if s.matches(event)])),
+                            ('subscription index', index.match)):
+            start = time.time()
+            matched = 0
+            results[name] = []
+            for burst in bursts:
+                for event in burst:
+                    subscribers = match(event)
+                    matched += len(subscribers)
+                    results[name].append(subscribers)
+            duration = time.time() - start
+
+            events = options['bursts'] * options['events']
+            self.stdout.write("%s: %.3f s total, %.1f us per event, %d matches" % (
+                name, duration, duration / events * 1000000, matched
+            ))
+
+        if results['linear scan'] != results['subscription index']:
+            raise base.CommandError("Subscription index returned different matches than the linear scan!")
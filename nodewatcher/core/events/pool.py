@@ -1,3 +1,4 @@
+import contextlib
 import copy
 import re
 
@@ -155,6 +156,27 @@ class EventSinkPool(object):
         except KeyError:
             raise exceptions.EventRecordNotRegistered("No event record with name '%s.%s' is registered" % (source_name, source_type))
 
+    @contextlib.contextmanager
+    def scope(self, nodes):
+        """
+        Notifies sinks that events related to the given nodes will be posted
+        within the block, so that they can load any state they need at once.
+
+        :param nodes: A list of nodes
+        """
+
+        sinks = self.get_all_sinks()
+        entered = []
+        try:
+            for sink in sinks:
+                sink.enter_scope(nodes)
+                entered.append(sink)
+
+            yield
+        finally:
+            for sink in entered[::-1]:
+                sink.exit_scope(nodes)
+
     def has_sink(self, sink_name):
         return sink_name in self._sinks
 
@@ -0,0 +1,263 @@
+import bisect
+
+from . import base
+
+# Exports
+__all__ = [
+    'Subscription',
+    'SubscriptionIndex',
+    'SubscriptionSink',
+]
+
+
+def get_pk(obj):
+    """
+    Returns the primary key of a model instance or the value itself when
+    it is already a primary key.
+    """
+
+    return getattr(obj, 'pk', obj)
+
+
+class Subscription(object):
+    """
+    Interest of a subscriber in node events. Criteria that are not set match
+    any event.
+    """
+
+    def __init__(self, subscriber, source_name=None, source_type=None, severity=None, nodes=None):
+        """
+        Class constructor.
+
+        :param subscriber: Subscriber that should be notified of matching events
+        :param source_name: Optional event source name
+        :param source_type: Optional event source type
+        :param severity: Optional minimum event severity
+        :param nodes: Optional list of nodes (or their primary keys) that events
+          must be related to
+        """
+
+        self.subscriber = subscriber
+        self.source_name = source_name
+        self.source_type = source_type
+        self.severity = severity
+        self.nodes = frozenset([get_pk(node) for node in nodes]) if nodes is not None else None
+
+    def matches(self, event):
+        """
+        Returns true if the given event matches this subscription.
+
+        :param event: Event record
+        """
+
+        if self.source_name is not None and getattr(event, 'source_name', None) != self.source_name:
+            return False
+        if self.source_type is not None and getattr(event, 'source_type', None) != self.source_type:
+            return False
+        if self.severity is not None and (getattr(event, 'severity', None) or 0) < self.severity:
+            return False
+        if self.nodes is not None:
+            if not [node for node in getattr(event, 'related_nodes', None) or [] if get_pk(node) in self.nodes]:
+                return False
+
+        return True
+
+    def __repr__(self):
+        return '<Subscription %r: %s.%s severity>=%s>' % (
+            self.subscriber, self.source_name, self.source_type, self.severity
+        )
+
+
+class SubscriptionBucket(object):
+    """
+    Subscriptions with the same source and severity threshold, indexed by
+    the nodes they are limited to.
+    """
+
+    def __init__(self):
+        """
+        Class constructor.
+        """
+
+        # Subscriptions that are not limited to any nodes.
+        self.any_node = set()
+        # Subscriptions limited to specific nodes, indexed by node primary key.
+        self.nodes = {}
+
+    def add(self, subscription):
+        if subscription.nodes is None:
+            self.any_node.add(subscription)
+        else:
+            for node in subscription.nodes:
+                self.nodes.setdefault(node, set()).add(subscription)
+
+    def remove(self, subscription):
+        """
+        Removes a subscription and returns true if it was present.
+        """
+
+        if subscription.nodes is None:
+            if subscription not in self.any_node:
+                return False
+
+            self.any_node.discard(subscription)
+            return True
+
+        removed = False
+        for node in subscription.nodes:
+            subscriptions = self.nodes.get(node, set())
+            if subscription in subscriptions:
+                removed = True
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.nodes[node]
+
+        return removed
+
+    def is_empty(self):
+        return not self.any_node and not self.nodes
+
+    def match(self, nodes, matches):
+        """
+        Adds subscriptions matching events related to the given nodes.
+
+        :param nodes: A list of node primary keys
+        :param matches: Set that receives matching subscriptions
+        """
+
+        matches.update(self.any_node)
+        for node in nodes:
+            matches.update(self.nodes.get(node, ()))
+
+
+class SubscriptionIndex(object):
+    """
+    An index of subscriptions by source name and type, severity threshold
+    and node. Matching an event only visits subscriptions that may be
+    interested in it, so the cost does not grow with the number of all
+    subscriptions.
+    """
+
+    def __init__(self):
+        """
+        Class constructor.
+        """
+
+        # Sorted severity thresholds and their buckets, indexed by (source name, source type).
+        self._sources = {}
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def add(self, subscription):
+        """
+        Adds a subscription to the index.
+
+        :param subscription: Subscription instance
+        """
+
+        thresholds, buckets = self._sources.setdefault((subscription.source_name, subscription.source_type), ([], {}))
+        threshold = subscription.severity or 0
+        if threshold not in buckets:
+            bisect.insort(thresholds, threshold)
+            buckets[threshold] = SubscriptionBucket()
+
+        buckets[threshold].add(subscription)
+        self._count += 1
+
+    def remove(self, subscription):
+        """
+        Removes a subscription from the index.
+
+        :param subscription: Subscription instance
+        """
+
+        key = (subscription.source_name, subscription.source_type)
+        thresholds, buckets = self._sources.get(key, ([], {}))
+        threshold = subscription.severity or 0
+        bucket = buckets.get(threshold, None)
+        if bucket is None or not bucket.remove(subscription):
+            return
+
+        self._count -= 1
+
+        if bucket.is_empty():
+            del buckets[threshold]
+            thresholds.remove(threshold)
+            if not buckets:
+                del self._sources[key]
+
+    def match(self, event):
+        """
+        Returns all subscriptions matching the given event.
+
+        :param event: Event record
+        :return: A set of subscriptions
+        """
+
+        source_name = getattr(event, 'source_name', None)
+        source_type = getattr(event, 'source_type', None)
+        severity = getattr(event, 'severity', None) or 0
+        nodes = [get_pk(node) for node in getattr(event, 'related_nodes', None) or []]
+
+        matches = set()
+        for key in set([(source_name, source_type), (source_name, None), (None, source_type), (None, None)]):
+            try:
+                thresholds, buckets = self._sources[key]
+            except KeyError:
+                continue
+
+            # Only buckets with thresholds up to the event severity match.
+            for threshold in thresholds[:bisect.bisect_right(thresholds, severity)]:
+                buckets[threshold].match(nodes, matches)
+
+        return matches
+
+
+class SubscriptionSink(base.EventSink):
+    """
+    Base class for sinks that notify subscribers of events matching their
+    subscriptions.
+    """
+
+    def __init__(self, **kwargs):
+        """
+        Class constructor.
+        """
+
+        super(SubscriptionSink, self).__init__(**kwargs)
+        self.subscriptions = SubscriptionIndex()
+
+    def deliver(self, event):
+        self.deliver_batch([event])
+
+    def deliver_batch(self, events):
+        """
+        Groups events by interested subscribers and notifies each subscriber
+        once for the whole batch.
+
+        :param events: A list of event records to deliver
+        """
+
+        notifications = {}
+        order = []
+        for event in events:
+            for subscriber in set([subscription.subscriber for subscription in self.subscriptions.match(event)]):
+                if subscriber not in notifications:
+                    notifications[subscriber] = []
+                    order.append(subscriber)
+                notifications[subscriber].append(event)
+
+        for subscriber in order:
+            self.notify(subscriber, notifications[subscriber])
+
+    def notify(self, subscriber, events):
+        """
+        Should notify the subscriber of the given events.
+
+        :param subscriber: Subscriber
+        :param events: A list of matching event records
+        """
+
+        raise NotImplementedError
@@ -0,0 +1,16 @@
+from celery.task import task as celery_task
+
+from .pool import pool
+
+
+@celery_task()
+def deliver_events(sink_name, events):
+    """
+    Delivers a batch of events to a sink that is configured for asynchronous
+    delivery.
+
+    :param sink_name: Sink name
+    :param events: A list of event records
+    """
+
+    pool.get_sink(sink_name).deliver_batch(events)
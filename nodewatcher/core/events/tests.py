@@ -1,8 +1,10 @@
+import time
 import unittest
 
 from django import test as django_test
 
-from . import base, declarative, exceptions
+from . import base, coalescing, declarative, exceptions, subscriptions
+from .bus import bus
 from .pool import pool
 
 
@@ -10,10 +12,17 @@ class TestEventSink(base.EventSink):
     def __init__(self, **kwargs):
         super(TestEventSink, self).__init__(**kwargs)
         self.events = []
+        self.scopes = []
 
     def deliver(self, event):
         self.events.append(event)
 
+    def enter_scope(self, nodes):
+        self.scopes.append(nodes)
+
+    def exit_scope(self, nodes):
+        self.scopes.pop()
+
 
 class TestEventFilter(base.EventFilter):
     def __init__(self, pass_everything=False, **kwargs):
@@ -46,6 +55,23 @@ class TestNodeEvent(declarative.NodeEventRecord):
         )
 
 
+class TestNode(object):
+    def __init__(self, pk):
+        self.pk = pk
+        self.uuid = 'node-%d' % pk
+
+
+class TestFlappingEvent(declarative.NodeEventRecord):
+    state = declarative.CharAttribute()
+
+    def __init__(self, node, state):
+        super(TestFlappingEvent, self).__init__(
+            [node],
+            declarative.NodeEventRecord.SEVERITY_INFO,
+            state=state,
+        )
+
+
 class TestInvalidSubclass(object):
     pass
 
@@ -130,6 +156,111 @@ class EventsTestCase(unittest.TestCase):
         with self.assertRaises(exceptions.EventFilterNotFound):
             pool.get_sink('TestEventSink').remove_filter('TestUnattachedFilter')
 
+    def test_scope(self):
+        sink = pool.get_sink('TestEventSink')
+        with pool.scope(['a']):
+            self.assertEqual(sink.scopes, [['a']])
+            with self.assertRaises(ValueError):
+                with pool.scope(['b']):
+                    self.assertEqual(sink.scopes, [['a'], ['b']])
+                    raise ValueError
+
+            self.assertEqual(sink.scopes, [['a']])
+
+        self.assertEqual(sink.scopes, [])
+
+    def test_batch(self):
+        sink = pool.get_sink('TestEventSink')
+        with bus.batch():
+            base.EventRecord(a=1).post()
+            with bus.batch():
+                base.EventRecord(a=2).post()
+
+            marker = bus.mark()
+            base.EventRecord(a=3).post()
+            base.EventRecord(a=4).post()
+            bus.discard(marker)
+            self.assertEqual(len(sink.events), 0)
+
+        self.assertEqual([x.a for x in sink.events], [1, 2])
+
+    def test_congestion(self):
+        sink = pool.get_sink('TestEventSink')
+        sink.asynchronous = True
+        sink.queue = 'test_events'
+        sink.max_backlog = 10
+        # Pretend that the backlog has just been checked.
+        bus._backlog['test_events'] = (10, time.time())
+        try:
+            base.EventRecord(a=1).post()
+            self.assertEqual([x.a for x in sink.events], [1])
+
+            sink.drop_when_congested = True
+            base.EventRecord(a=2).post()
+            base.EventRecord(a=3).post()
+            self.assertEqual([x.a for x in sink.events], [1])
+            self.assertEqual(sink.dropped, 2)
+        finally:
+            del bus._backlog['test_events']
+
+    def test_subscriptions(self):
+        class Event(object):
+            def __init__(self, source_name, source_type, severity, related_nodes):
+                self.source_name = source_name
+                self.source_type = source_type
+                self.severity = severity
+                self.related_nodes = related_nodes
+
+        subscription_list = [
+            subscriptions.Subscription('a'),
+            subscriptions.Subscription('b', source_name='monitor', severity=2),
+            subscriptions.Subscription('c', source_name='monitor', source_type='reboot', nodes=[1, 2]),
+            subscriptions.Subscription('d', source_type='reboot', severity=3, nodes=[2]),
+        ]
+        index = subscriptions.SubscriptionIndex()
+        for subscription in subscription_list:
+            index.add(subscription)
+
+        events = [
+            Event('monitor', 'reboot', 1, [1]),
+            Event('monitor', 'reboot', 3, [2]),
+            Event('monitor', 'status', 2, [3]),
+            Event('generator', 'reboot', 3, [2, 3]),
+        ]
+        for event in events:
+            self.assertEqual(index.match(event), set([s for s in subscription_list if s.matches(event)]))
+
+        self.assertEqual(set([s.subscriber for s in index.match(events[1])]), set(['a', 'b', 'c', 'd']))
+
+        for subscription in subscription_list:
+            index.remove(subscription)
+        self.assertEqual(len(index), 0)
+        self.assertEqual(index.match(events[1]), set())
+
+    def test_coalescing(self):
+        node_a = TestNode(1)
+        node_b = TestNode(2)
+
+        # Repeats of an event with the same content are coalesced.
+        self.assertIsNotNone(coalescing.get_key(TestFlappingEvent(node_a, 'down')))
+        self.assertEqual(
+            coalescing.get_key(TestFlappingEvent(node_a, 'down')),
+            coalescing.get_key(TestFlappingEvent(node_a, 'down')),
+        )
+
+        # Events reporting a different state or related to other nodes are not.
+        self.assertNotEqual(
+            coalescing.get_key(TestFlappingEvent(node_a, 'down')),
+            coalescing.get_key(TestFlappingEvent(node_a, 'up')),
+        )
+        self.assertNotEqual(
+            coalescing.get_key(TestFlappingEvent(node_a, 'down')),
+            coalescing.get_key(TestFlappingEvent(node_b, 'down')),
+        )
+
+        # Events that are not node events are never coalesced.
+        self.assertIsNone(coalescing.get_key(base.EventRecord(a=1)))
+
     def test_node_events(self):
         self.assertEqual([a.name for a in TestNodeEvent.get_attributes()], ['foo', 'bar'])
         self.assertEqual(TestNodeEvent.get_attribute('foo').name, 'foo')
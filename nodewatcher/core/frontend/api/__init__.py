@@ -1,5 +1,6 @@
 from tastypie import api
 
+from .cache import *
 from .resources import *
 
 
@@ -0,0 +1,127 @@
+import hashlib
+import time
+
+from django import http
+from django.conf import settings
+from django.core import cache
+from django.utils import cache as cache_utils
+
+from ....utils import generations
+
+# Exports
+__all__ = [
+    'CachedResourceMixin',
+]
+
+# Generation scopes of resources that do not declare their own.
+DEFAULT_GENERATIONS = ('config', 'monitoring')
+
+# Cache key of a response.
+RESPONSE_KEY = 'nodewatcher.api.response.%s'
+
+
+def is_enabled():
+    """
+    Returns true if API responses should be cached.
+    """
+
+    return getattr(settings, 'API_CACHE', False)
+
+
+def get_timeout():
+    """
+    Returns the maximum time (in seconds) for which a cached response is
+    served. Responses are invalidated earlier when generations of their
+    scopes change.
+    """
+
+    return getattr(settings, 'API_CACHE_TIMEOUT', 300)
+
+
+def get_permission_scope(request):
+    """
+    Returns the permission scope of the user making a request. Requests in the
+    same scope see the same data.
+
+    :param request: Request instance
+    """
+
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated():
+        return 'anonymous'
+    elif user.is_superuser:
+        return 'superuser'
+
+    return 'user.%s' % user.pk
+
+
+class CachedResourceMixin(object):
+    """
+    A mixin for resources that caches responses to GET requests and answers
+    conditional requests. Cached responses are identified by the request, the
+    permission scope of the user and the generations of scopes that resource
+    data depends on, which resources declare through the `cache_generations`
+    meta option. Setting it to None disables caching for the resource.
+    """
+
+    def get_cache_generations(self):
+        """
+        Returns generation scopes that resource data depends on or None if
+        responses should not be cached.
+        """
+
+        return getattr(self._meta, 'cache_generations', DEFAULT_GENERATIONS)
+
+    def get_cache_key(self, request_type, request, scopes):
+        """
+        Returns the cache key for a request, which is also used as its ETag.
+        """
+
+        key = hashlib.sha1()
+        key.update(repr((
+            request_type,
+            request.get_full_path(),
+            request.META.get('HTTP_ACCEPT', ''),
+            get_permission_scope(request),
+            generations.get(scopes),
+            # Bound the time for which responses are reused when generations are not updated, for
+            # example because the cache is not shared between processes.
+            int(time.time() // get_timeout()),
+        )))
+
+        return key.hexdigest()
+
+    def dispatch(self, request_type, request, **kwargs):
+        scopes = self.get_cache_generations()
+        method = request.META.get('HTTP_X_HTTP_METHOD_OVERRIDE', request.method)
+        if not is_enabled() or scopes is None or method != 'GET':
+            return super(CachedResourceMixin, self).dispatch(request_type, request, **kwargs)
+
+        # Requests must be authenticated before their permission scope is known and before any
+        # cached response is served.
+        self.method_check(request, allowed=getattr(self._meta, '%s_allowed_methods' % request_type, None))
+        self.is_authenticated(request)
+        self.throttle_check(request)
+
+        key = self.get_cache_key(request_type, request, scopes)
+        etag = '"%s"' % key
+
+        if etag in [value.strip() for value in request.META.get('HTTP_IF_NONE_MATCH', '').split(',')]:
+            response = http.HttpResponseNotModified()
+        else:
+            cached = cache.cache.get(RESPONSE_KEY % key)
+            if cached is not None:
+                content, content_type = cached
+                response = http.HttpResponse(content, content_type=content_type)
+            else:
+                response = super(CachedResourceMixin, self).dispatch(request_type, request, **kwargs)
+                if response.status_code != 200 or response.streaming:
+                    return response
+
+                cache.cache.set(RESPONSE_KEY % key, (response.content, response['Content-Type']), get_timeout())
+
+        response['ETag'] = etag
+        cache_utils.patch_cache_control(response, private=True, max_age=0, must_revalidate=True)
+        cache_utils.patch_vary_headers(response, ('Accept', 'Cookie'))
+
+        return response
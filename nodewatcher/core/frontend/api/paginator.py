@@ -1,10 +1,239 @@
+import base64
+import datetime
+import decimal
+import hashlib
+import json
+import uuid
+
+from django.conf import settings
+from django.core import cache
+from django.db.models import query
+from django.db.models.sql import datastructures
+
+from tastypie import exceptions
+
 from django_datastream import paginator
 
+# Time (in seconds) for which object counts are cached. Set to zero to always count objects.
+COUNT_CACHE_TIMEOUT = getattr(settings, 'API_COUNT_CACHE_TIMEOUT', 60)
+
+# Cache key of an object count.
+COUNT_KEY = 'nodewatcher.api.count.%s'
+
+# Directions in which a cursor continues.
+AFTER = 'after'
+BEFORE = 'before'
+
+# Types of values which can be stored in cursors.
+CURSOR_VALUE_TYPES = (basestring, int, long, float, bool, decimal.Decimal, datetime.date, datetime.time, uuid.UUID, type(None))
+
+
+def get_count(objects):
+    """
+    Returns the number of objects. Counts of querysets are cached for a short
+    time, so that paging through a large result set does not count all the
+    objects on every page.
+
+    :param objects: Queryset or a list of objects
+    """
+
+    sql_query = getattr(objects, 'query', None)
+    if not COUNT_CACHE_TIMEOUT or sql_query is None:
+        try:
+            return objects.count()
+        except (AttributeError, TypeError):
+            return len(objects)
+
+    # Ordering does not influence the count.
+    sql_query = sql_query.clone()
+    sql_query.clear_ordering(force_empty=True)
+    try:
+        key = COUNT_KEY % hashlib.sha1(repr(sql_query.sql_with_params())).hexdigest()
+    except datastructures.EmptyResultSet:
+        return 0
+
+    count = cache.cache.get(key)
+    if count is None:
+        count = objects.count()
+        cache.cache.set(key, count, COUNT_CACHE_TIMEOUT)
+
+    return count
+
 
 class Paginator(paginator.Paginator):
+    """
+    Paginator which supports both offset and keyset pagination.
+
+    Offset pagination is used by default (for example, by dataTables). When
+    a `cursor` is given, the page instead continues after (or before) the
+    object identified by the cursor, so that the database can seek to it
+    using an index instead of skipping over all preceding objects. An empty
+    cursor requests the first page. Keyset pagination is only supported when
+    resources mark the queryset with a `_keyset_ordering`, which lists the
+    fields objects are ordered by, ending with an unique field.
+    """
+
+    def get_count(self):
+        return get_count(self.objects)
+
+    def get_keyset_ordering(self):
+        """
+        Returns the fields objects are ordered by or None if the ordering does
+        not support keyset pagination.
+        """
+
+        return getattr(self.objects, '_keyset_ordering', None)
+
+    def get_cursor(self, obj, direction):
+        """
+        Returns a cursor which identifies the position after or before the
+        given object or None if the object cannot be identified.
+
+        :param obj: Object instance
+        :param direction: Cursor direction, `AFTER` or `BEFORE`
+        """
+
+        values = []
+        for field in self.get_keyset_ordering():
+            value = obj
+            for attribute in field.lstrip('-').split('__'):
+                value = getattr(value, attribute, None)
+
+            if not isinstance(value, CURSOR_VALUE_TYPES):
+                return None
+            elif isinstance(value, (datetime.date, datetime.time)):
+                value = value.isoformat()
+            elif isinstance(value, (decimal.Decimal, uuid.UUID)):
+                value = str(value)
+
+            values.append(value)
+
+        return base64.urlsafe_b64encode(json.dumps([direction, values]))
+
+    def parse_cursor(self, cursor):
+        """
+        Parses a cursor into its direction and ordering field values.
+
+        :param cursor: Cursor string
+        """
+
+        try:
+            direction, values = json.loads(base64.urlsafe_b64decode(str(cursor)))
+            if direction not in (AFTER, BEFORE) or len(values) != len(self.get_keyset_ordering()):
+                raise ValueError
+        except (TypeError, ValueError):
+            raise exceptions.BadRequest("Invalid cursor '%s' provided." % cursor)
+
+        return direction, values
+
+    def get_seek_filter(self, ordering, values):
+        """
+        Returns a filter which selects objects following the given ordering
+        field values in the given ordering. NULL values are ordered last when
+        ordering in ascending and first when ordering in descending order.
+
+        :param ordering: A list of ordering fields
+        :param values: A list of ordering field values
+        """
+
+        expand_proxy_field = getattr(self.objects, 'registry_expand_proxy_field', lambda x: x)
+
+        seek_filter = None
+        preceding_equal = query.Q()
+        for field, value in zip(ordering, values):
+            descending = field.startswith('-')
+            field = expand_proxy_field(field.lstrip('-'))
+
+            if value is None:
+                following = query.Q(**{'%s__isnull' % field: False}) if descending else None
+                equal = query.Q(**{'%s__isnull' % field: True})
+            else:
+                following = query.Q(**{'%s__%s' % (field, 'lt' if descending else 'gt'): value})
+                if not descending:
+                    following |= query.Q(**{'%s__isnull' % field: True})
+                equal = query.Q(**{field: value})
+
+            if following is not None:
+                following = preceding_equal & following
+                seek_filter = following if seek_filter is None else seek_filter | following
+            preceding_equal &= equal
+
+        return seek_filter
+
+    def _generate_cursor_uri(self, limit, cursor):
+        if self.resource_uri is None or cursor is None:
+            return None
+
+        request_params = self.request_data.copy()
+        for param in ('limit', 'offset', 'cursor'):
+            if param in request_params:
+                del request_params[param]
+        request_params.update({'limit': limit, 'cursor': cursor})
+
+        return '%s?%s' % (self.resource_uri, request_params.urlencode())
+
+    def keyset_page(self, cursor):
+        """
+        Returns the page which continues at the given cursor.
+
+        :param cursor: Cursor string
+        """
+
+        ordering = self.get_keyset_ordering()
+        if ordering is None:
+            raise exceptions.BadRequest("Cursor pagination is not supported for the requested ordering.")
+
+        limit = self.get_limit()
+        objects = self.objects
+        direction = AFTER
+        if cursor:
+            direction, values = self.parse_cursor(cursor)
+            if direction == BEFORE:
+                # Seek backwards by reversing the ordering.
+                ordering = [field[1:] if field.startswith('-') else '-%s' % field for field in ordering]
+                objects = objects.order_by(*ordering)
+
+            objects = objects.filter(self.get_seek_filter(ordering, values))
+
+        if limit:
+            # Fetch one more object to determine if there are more objects in this direction.
+            objects = list(objects[:limit + 1])
+            has_more = len(objects) > limit
+            objects = objects[:limit]
+        else:
+            objects = list(objects)
+            has_more = False
+
+        if direction == BEFORE:
+            objects.reverse()
+            has_previous, has_next = has_more, True
+        else:
+            has_previous, has_next = bool(cursor), has_more
+
+        previous_cursor = self.get_cursor(objects[0], BEFORE) if objects and has_previous else None
+        next_cursor = self.get_cursor(objects[-1], AFTER) if objects and has_next else None
+
+        return {
+            self.collection_name: objects,
+            'meta': {
+                'limit': limit,
+                'cursor': cursor,
+                'total_count': self.get_count(),
+                'previous_cursor': previous_cursor,
+                'next_cursor': next_cursor,
+                'previous': self._generate_cursor_uri(limit, previous_cursor),
+                'next': self._generate_cursor_uri(limit, next_cursor),
+            },
+        }
+
     def page(self):
+        cursor = self.request_data.get('cursor', None)
+        if cursor is not None:
+            page = self.keyset_page(cursor)
+        else:
+            page = super(Paginator, self).page()
+
         # We add count of all objects before filtering (used in dataTables)
-        page = super(Paginator, self).page()
         if hasattr(self.objects, '_nonfiltered_count'):
             page['meta']['nonfiltered_count'] = self.objects._nonfiltered_count
         return page
@@ -13,7 +13,7 @@ import json_field
 
 from ...registry import fields as registry_fields
 
-from . import fields, paginator
+from . import cache, fields, paginator
 
 # Exports
 __all__ = [
@@ -80,7 +80,7 @@ class BaseMetaclass(resources.ModelDeclarativeMetaclass):
         return new_class
 
 
-class BaseResource(six.with_metaclass(BaseMetaclass, resources.NamespacedModelResource, gis_resources.ModelResource, datastream_resources.BaseResource)):
+class BaseResource(six.with_metaclass(BaseMetaclass, cache.CachedResourceMixin, resources.NamespacedModelResource, gis_resources.ModelResource, datastream_resources.BaseResource)):
     # In class methods which are called from a metaclass we cannot use super() because BaseResource is not
     # yet defined then. We cannot call gis_resources.ModelResource.<method>() either, because then our current
     # cls is not given, but gis_resources.ModelResource is used instead. So we create a custom function where skip
@@ -315,13 +315,17 @@ class BaseResource(six.with_metaclass(BaseMetaclass, resources.NamespacedModelRe
         # We temporary replace order_by method on the queryset to hijack
         # the arguments passed to the order_by so that we can pass them
         # to _after_apply_sorting.
-        obj_list_order_by = obj_list.order_by
+        def hijack_order_by(queryset):
+            queryset_order_by = queryset.order_by
 
-        def order_by(*args):
-            stored_order_by['value'] = args
-            return obj_list_order_by(*args)
+            def order_by(*args):
+                stored_order_by['value'] = args
+                return queryset_order_by(*args)
 
-        obj_list.order_by = order_by
+            queryset.order_by = order_by
+            return queryset_order_by
+
+        obj_list_order_by = hijack_order_by(obj_list)
 
         try:
             sorted_queryset = super(BaseResource, self).apply_sorting(obj_list, options)
@@ -330,20 +334,51 @@ class BaseResource(six.with_metaclass(BaseMetaclass, resources.NamespacedModelRe
             # if it is reused somewhere else as well.
             obj_list.order_by = obj_list_order_by
 
-        sorted_queryset = self._after_apply_sorting(sorted_queryset, options, stored_order_by['value'])
+        # The final ordering is also hijacked, so that it can be used for keyset pagination.
+        order_by_args = stored_order_by['value']
+        hijacked_queryset = sorted_queryset
+        hijacked_queryset_order_by = hijack_order_by(hijacked_queryset)
+
+        try:
+            sorted_queryset = self._after_apply_sorting(hijacked_queryset, options, order_by_args)
+        finally:
+            hijacked_queryset.order_by = hijacked_queryset_order_by
 
         # Restore the count of all objects.
         sorted_queryset._nonfiltered_count = nonfiltered_count
+        sorted_queryset._keyset_ordering = self._get_keyset_ordering(stored_order_by['value'])
 
         return sorted_queryset
 
+    def _get_keyset_ordering(self, order_by_args):
+        """
+        Returns the ordering fields if objects ordered by them can be paginated
+        using keyset pagination or None otherwise. All fields must be listed
+        in the `keyset_fields` resource option and the last field must be
+        unique.
+        """
+
+        keyset_fields = getattr(self._meta, 'keyset_fields', None)
+        if not keyset_fields or not order_by_args:
+            return None
+
+        fields = [field.lstrip('-') for field in order_by_args]
+        if any([field not in keyset_fields for field in fields]):
+            return None
+
+        object_class = getattr(self._meta, 'object_class', None)
+        if fields[-1] != 'pk' and (object_class is None or fields[-1] != object_class._meta.pk.name):
+            return None
+
+        return tuple(order_by_args)
+
     def authorized_read_list(self, object_list, bundle):
         # Since authorization filter is applied after the generic filters have been
         # applied, we need to account for the difference that the auth filter causes
         nonfiltered_count = object_list._nonfiltered_count
-        count = object_list.count()
+        count = paginator.get_count(object_list)
         filtered_queryset = super(BaseResource, self).authorized_read_list(object_list, bundle)
-        delta = count - filtered_queryset.count()
+        delta = count - paginator.get_count(filtered_queryset)
         filtered_queryset._nonfiltered_count = nonfiltered_count - delta
 
         return filtered_queryset
@@ -372,7 +407,7 @@ class BaseResource(six.with_metaclass(BaseMetaclass, resources.NamespacedModelRe
             filtered_queryset = filtered_queryset.filter(filter_query).distinct()
 
         # We store count of all objects before filtering to be able to provide it in paginator (used in dataTables)
-        filtered_queryset._nonfiltered_count = queryset.count()
+        filtered_queryset._nonfiltered_count = paginator.get_count(queryset)
 
         return filtered_queryset
 
@@ -13,7 +13,7 @@ class BuildVersionAdmin(admin.ModelAdmin):
 
 
 class BuilderAdmin(admin.ModelAdmin):
-    list_display = ('host', 'platform', 'architecture', 'version')
+    list_display = ('host', 'platform', 'architecture', 'version', 'slots')
     list_filter = ('platform', 'architecture', 'version')
 
 admin.site.register(models.BuildChannel, BuildChannelAdmin)
@@ -0,0 +1,112 @@
+import hashlib
+import tempfile
+
+from django.conf import settings
+from django.core.files import base as files_base
+
+# Size (in bytes) of chunks in which firmware files are transferred.
+CHUNK_SIZE = getattr(settings, 'GENERATOR_ARTIFACT_CHUNK_SIZE', 1024 * 1024)
+# Size (in bytes) up to which firmware files are kept in memory instead of a temporary file.
+SPOOL_SIZE = getattr(settings, 'GENERATOR_ARTIFACT_SPOOL_SIZE', 1024 * 1024)
+
+
+class BuildArtifact(object):
+    """
+    A file produced by a firmware build. Content is spooled to a temporary
+    file as it is received, while its checksums are computed in the same
+    pass, so that large firmware images are never held in memory.
+    """
+
+    def __init__(self):
+        """
+        Class constructor.
+        """
+
+        self.size = 0
+        self._file = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        self._md5 = hashlib.md5()
+        self._sha256 = hashlib.sha256()
+
+    @classmethod
+    def from_stream(cls, stream):
+        """
+        Creates an artifact by reading a stream in chunks.
+
+        :param stream: File-like object
+        :return: Artifact instance
+        """
+
+        artifact = cls()
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+
+            artifact.write(chunk)
+
+        return artifact
+
+    @classmethod
+    def from_content(cls, content):
+        """
+        Creates an artifact from a string.
+
+        :param content: File content
+        :return: Artifact instance
+        """
+
+        artifact = cls()
+        artifact.write(content)
+        return artifact
+
+    def write(self, data):
+        """
+        Appends data to the artifact.
+
+        :param data: Data string
+        """
+
+        self._file.write(data)
+        self._md5.update(data)
+        self._sha256.update(data)
+        self.size += len(data)
+
+    @property
+    def checksum_md5(self):
+        return self._md5.hexdigest()
+
+    @property
+    def checksum_sha256(self):
+        return self._sha256.hexdigest()
+
+    def get_file(self, name):
+        """
+        Returns a Django file, which reads the artifact content in chunks when
+        saved into a storage.
+
+        :param name: File name
+        """
+
+        self._file.seek(0)
+        django_file = files_base.File(self._file, name=name)
+        django_file.size = self.size
+        return django_file
+
+    def read(self):
+        """
+        Returns the whole artifact content. This should only be used for small
+        files.
+        """
+
+        self._file.seek(0)
+        return self._file.read()
+
+    def close(self):
+        """
+        Removes the temporary file holding the artifact content.
+        """
+
+        self._file.close()
+
+    def __len__(self):
+        return self.size
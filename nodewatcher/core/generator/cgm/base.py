@@ -1,12 +1,10 @@
-import copy
-
 from django.template import loader as template_loader
 
 from ....utils import loader
 
-from ...registry import registration
+from ...registry import access as registry_access, registration
 
-from . import devices as cgm_devices, resources as cgm_resources, exceptions
+from . import catalogue as cgm_catalogue, devices as cgm_devices, incremental as cgm_incremental, resources as cgm_resources, exceptions
 from .. import models as generator_models
 
 # Registered platform modules
@@ -349,58 +347,105 @@ class PlatformBase(object):
         self._modules = []
         self._packages = []
         self._devices = {}
+        # Sorted module chains, indexed by device identifier.
+        self._chains = {}
 
-    def generate(self, node):
+    def generate(self, node, incremental=False):
         """
         Generates a concrete configuration for this platform.
+
+        :param node: Node instance to generate the configuration for
+        :param incremental: Should results of the previous generation for this
+          node be reused for modules that are not affected by changes
         """
 
         cfg = self.config_class(self, node)
 
-        try:
-            cfg.builder = self.get_builder(node)[1]
-        except exceptions.BuilderConfigurationError:
-            cfg.builder = None
-
-        modules = copy.copy(self._modules)
-
-        # Process user-configured packages.
-        for name, cfgclass, package, weight in self._packages:
-            pkgcfg = node.config.core.packages(onlyclass=cfgclass)
-            if [x for x in pkgcfg if x.enabled]:
-                # Copy the variables to avoid them being overwritten in the for loop.
-                _package = package
-                _pkgcfg = pkgcfg
-
-                modules.append((
-                    weight,
-                    lambda node, cfg: _package(node, _pkgcfg, cfg),
-                    None
-                ))
-                cfg.packages.add(name)
-
-        # Execute the module chain in order.
-        for weight, module, device in sorted(modules):
-            if device is None or device == node.config.core.general().router:
-                module(node, cfg)
-
-        # Process any deferred configuration.
-        for function in cfg.get_deferred_configuration():
-            function()
+        # Registry items are resolved only once during generation.
+        with registry_access.cache(node):
+            try:
+                cfg.builder = self.get_builder(node)[1]
+            except exceptions.BuilderConfigurationError:
+                cfg.builder = None
+
+            general = node.config.core.general()
+            modules = self.get_module_chain(general.router if general is not None else None)
+
+            # Process user-configured packages. Package configuration is fetched at once and
+            # only enabled packages get their own configuration queryset.
+            package_items = list(node.config.core.packages()) if self._packages else []
+            package_modules = []
+            for name, cfgclass, package, weight in self._packages:
+                if [x for x in package_items if isinstance(x, cfgclass) and x.enabled]:
+                    # Bind the variables to avoid them being overwritten in the for loop.
+                    def package_module(node, cfg, package=package, pkgcfg=node.config.core.packages(onlyclass=cfgclass)):
+                        return package(node, pkgcfg, cfg)
+                    package_module.cgm_package = package
+
+                    package_modules.append((weight, package_module, None))
+                    cfg.packages.add(name)
+
+            if package_modules:
+                modules = sorted(modules + package_modules)
+
+            # Execute the module chain in order.
+            if incremental:
+                cgm_incremental.run(node, cfg, modules)
+            else:
+                for weight, module, device in modules:
+                    module(node, cfg)
+
+            # Process any deferred configuration.
+            for function in cfg.get_deferred_configuration():
+                function()
 
         return cfg
 
+    def get_module_chain(self, device=None):
+        """
+        Returns the sorted chain of modules that apply to a device. Chains are
+        computed once and invalidated when new modules are registered.
+
+        :param device: Optional device identifier
+        :return: A list of (weight, module, device) tuples
+        """
+
+        try:
+            return self._chains[device]
+        except KeyError:
+            chain = sorted([x for x in self._modules if x[2] is None or x[2] == device])
+            self._chains[device] = chain
+            return chain
+
     def build(self, result):
         """
         Builds the firmware using a previously generated and properly
         formatted configuration.
 
         :param result: Destination build result
-        :return: A list of generated firmware files
+        :return: A list of (filename, build artifact) tuples
         """
 
         raise NotImplementedError
 
+    def get_build_fingerprint(self, result):
+        """
+        Returns a description of all inputs that determine the firmware built
+        for a build result. Builds with equal fingerprints produce equivalent
+        firmware, so their files may be reused from the build cache.
+
+        :param result: Destination build result
+        :return: A JSON-serializable fingerprint
+        """
+
+        return {
+            'builder': str(result.builder.pk),
+            'version': result.builder.version.name,
+            'platform': result.builder.platform,
+            'architecture': result.builder.architecture,
+            'config': result.config,
+        }
+
     def defer_build(self, user, node, cfg):
         """
         Deferrs formatting and building to a background Celery job. The job
@@ -424,8 +469,8 @@ class PlatformBase(object):
         )
         result.save()
 
-        from . import tasks
-        tasks.background_build.delay(result.uuid)
+        from .. import tasks
+        tasks.schedule_builds.delay()
 
         return result
 
@@ -474,21 +519,24 @@ class PlatformBase(object):
             except generator_models.BuildVersion.DoesNotExist:
                 raise exceptions.NoBuildersConfigured
 
-        # Select a proper builder.
-        try:
-            builder = generator_models.Builder.objects.get(
-                platform=self.name,
-                architecture=device.architecture,
-                channels=build_channel,
-                version=version,
-            )
-        except generator_models.Builder.DoesNotExist:
+        # Select a proper builder. Any of the equivalent builders may end up doing
+        # the build, as the scheduler dispatches builds to builders with free slots.
+        builders = generator_models.Builder.objects.filter(
+            platform=self.name,
+            architecture=device.architecture,
+            channels=build_channel,
+            version=version,
+        ).order_by('pk')
+        if not builders:
             raise exceptions.NoSuitableBuildersFound
 
         # Ensure that current builder metadata is consistent with what has been stored
         # in the database. Otherwise, the actual builder may be replaced and we will be
         # operating on incorrect data.
-        if not builder.is_consistent():
+        for builder in builders:
+            if builder.is_consistent():
+                break
+        else:
             raise exceptions.BuilderInconsistent
 
         return build_channel, builder
@@ -506,6 +554,7 @@ class PlatformBase(object):
             return
 
         self._modules.append((weight, module, device))
+        self._chains = {}
 
     def register_package(self, name, config, package, weight=300):
         """
@@ -534,6 +583,7 @@ class PlatformBase(object):
 
         self._devices[device.identifier] = device
         device.register(self)
+        cgm_catalogue.invalidate()
 
     def get_device(self, device):
         """
@@ -615,9 +665,7 @@ def iterate_devices():
     Iterates over all registered devices.
     """
 
-    for platform in PLATFORM_REGISTRY.values():
-        for device in platform._devices.values():
-            yield device
+    return iter(cgm_catalogue.get_catalogue())
 
 
 def generate_firmware(node, user=None, only_validate=False):
@@ -635,7 +683,8 @@ def generate_firmware(node, user=None, only_validate=False):
     except (AttributeError, KeyError):
         return None
 
-    cfg = platform.generate(node)
+    # Validation runs on every edit, so it reuses results of previous generations.
+    cfg = platform.generate(node, incremental=only_validate)
     if not only_validate:
         if user is None:
             raise ValueError('To build firmware images, the \'user\' argument must be specified!')
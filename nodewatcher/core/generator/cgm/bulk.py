@@ -0,0 +1,179 @@
+import multiprocessing
+import traceback
+
+from django.db import connection, models as django_models, transaction
+
+from ....utils import loader
+from ... import models as core_models
+from ...registry import registration
+from .. import models as generator_models
+from . import base as cgm_base, exceptions
+
+# Number of nodes that a worker process generates at once.
+CHUNK_SIZE = 20
+
+
+class BulkGeneration(object):
+    """
+    Outcome of bulk firmware generation.
+    """
+
+    def __init__(self):
+        """
+        Class constructor.
+        """
+
+        # Newly queued build results.
+        self.results = []
+        # Nodes for which an identical build is already queued.
+        self.duplicates = []
+        # A dictionary mapping node identifiers to generation error messages.
+        self.errors = {}
+
+
+def prefetch_config(queryset):
+    """
+    Returns a node queryset, which prefetches the top-level configuration
+    items of all nodes.
+
+    :param queryset: Node queryset
+    """
+
+    return queryset.prefetch_related(*registration.point('node.config').get_top_level_relations())
+
+
+def generate_chunk(node_pks):
+    """
+    Generates configuration for a chunk of nodes. This runs in a worker
+    process.
+
+    :param node_pks: A list of node identifiers
+    :return: A list of (node identifier, build, error) tuples, where build is
+      a (build channel identifier, builder identifier, build configuration) tuple
+    """
+
+    # Ensure that all CGMs are loaded before doing processing
+    loader.load_modules('cgm')
+
+    output = []
+    for node in prefetch_config(core_models.Node.objects.filter(pk__in=node_pks)):
+        try:
+            platform = cgm_base.get_platform(node.config.core.general().platform)
+        except (AttributeError, KeyError):
+            output.append((node.pk, None, "No platform configured."))
+            continue
+
+        try:
+            cfg = platform.generate(node)
+            build_channel, builder = platform.validate_build(node, cfg)
+            output.append((node.pk, (build_channel.pk, builder.pk, cfg.get_build_config()), None))
+        except exceptions.BuilderConfigurationError, e:
+            output.append((node.pk, None, "Builder configuration error: %s" % e.__class__.__name__))
+        except cgm_base.ValidationError, e:
+            output.append((node.pk, None, "Validation error: %s" % ', '.join([unicode(arg) for arg in e.args])))
+        except Exception:
+            output.append((node.pk, None, traceback.format_exc()))
+
+    return output
+
+
+def generate_firmware(nodes, user, processes=None, progress=None):
+    """
+    Generates configuration for many nodes in parallel and queues their
+    firmware builds. Builds identical to ones that are already queued for
+    the same node are skipped.
+
+    :param nodes: Node queryset
+    :param user: User that will own the firmware images
+    :param processes: Number of worker processes, defaults to the number of CPUs;
+      when set to one, configuration is generated in the current process
+    :param progress: Optional callable, which is called with the number of
+      processed nodes and the total number of nodes after each chunk
+    :return: A `BulkGeneration` instance
+    """
+
+    node_pks = list(nodes.values_list('pk', flat=True))
+    chunks = [node_pks[index:index + CHUNK_SIZE] for index in xrange(0, len(node_pks), CHUNK_SIZE)]
+
+    generated = []
+    if processes == 1:
+        outputs = (generate_chunk(chunk) for chunk in chunks)
+    else:
+        # Close the connection before forking the workers as otherwise resources will be
+        # shared and chaos will ensue
+        connection.close()
+        workers = multiprocessing.Pool(processes)
+        outputs = workers.imap_unordered(generate_chunk, chunks)
+
+    try:
+        for output in outputs:
+            generated.extend(output)
+            if progress is not None:
+                progress(len(generated), len(node_pks))
+    finally:
+        if processes != 1:
+            workers.terminate()
+            workers.join()
+
+    bulk = BulkGeneration()
+    builders = generator_models.Builder.objects.in_bulk(set([build[1] for _, build, _ in generated if build]))
+
+    # Builds that are already queued.
+    queued = set()
+    for node_pk, build_key in generator_models.BuildResult.objects.filter(
+        node__in=node_pks,
+        status__in=(generator_models.BuildResult.PENDING, generator_models.BuildResult.BUILDING),
+    ).values_list('node_id', 'build_key'):
+        queued.add((node_pk, build_key))
+
+    for node_pk, build, error in generated:
+        if error is not None:
+            bulk.errors[node_pk] = error
+            continue
+
+        build_channel_pk, builder_pk, config = build
+        result = generator_models.BuildResult(
+            user=user,
+            node_id=node_pk,
+            config=config,
+            build_channel_id=build_channel_pk,
+            builder=builders[builder_pk],
+            status=generator_models.BuildResult.PENDING,
+        )
+
+        # Build results are created in bulk, so the key is not computed on save.
+        result.build_key = result.get_build_key()
+        key = (node_pk, result.build_key)
+        if key in queued:
+            bulk.duplicates.append(node_pk)
+            continue
+
+        queued.add(key)
+        bulk.results.append(result)
+
+    with transaction.atomic():
+        generator_models.BuildResult.objects.bulk_create(bulk.results)
+
+    if bulk.results:
+        from .. import tasks
+        tasks.schedule_builds.delay()
+
+    return bulk
+
+
+def get_progress(results):
+    """
+    Returns the number of build results in each state.
+
+    :param results: A list of build results
+    :return: A dictionary mapping build result states to counts
+    """
+
+    progress = dict((status, 0) for status, _ in generator_models.BuildResult.STATUS_CHOICES)
+    for start in xrange(0, len(results), 1000):
+        for item in generator_models.BuildResult.objects.filter(
+            pk__in=[result.pk for result in results[start:start + 1000]],
+        ).values('status').annotate(count=django_models.Count('pk')):
+            progress[item['status']] += item['count']
+
+    return progress
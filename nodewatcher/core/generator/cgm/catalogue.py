@@ -0,0 +1,208 @@
+import collections
+
+from . import devices as cgm_devices
+
+# Catalogue of registered devices, built on first use.
+_catalogue = None
+
+
+class DeviceCatalogue(object):
+    """
+    An immutable index of all registered devices. It is built once after
+    devices have been registered, so that device, port and radio lookups
+    and the serialized device metadata do not need to be computed on every
+    request.
+    """
+
+    def __init__(self, platforms):
+        """
+        Class constructor.
+
+        :param platforms: A list of platform instances
+        """
+
+        # Devices indexed by identifier.
+        self._devices = {}
+        # Devices supported by each platform, indexed by identifier.
+        self._platforms = {}
+        # Device identifiers indexed by port and radio identifiers.
+        self._ports = {}
+        self._radios = {}
+
+        for platform in sorted(platforms, key=lambda platform: platform.name):
+            platform_devices = self._platforms.setdefault(platform.name, collections.OrderedDict())
+            for identifier, device in sorted(platform._devices.items()):
+                platform_devices[identifier] = device
+                if identifier in self._devices:
+                    continue
+
+                self._devices[identifier] = device
+                for port in device.ports:
+                    self._ports.setdefault(port.identifier, []).append(identifier)
+                for radio in device.radios:
+                    self._radios.setdefault(radio.identifier, []).append(identifier)
+
+        # Serialized device metadata, computed on first use.
+        self._metadata = None
+
+    def __iter__(self):
+        for identifier in sorted(self._devices):
+            yield self._devices[identifier]
+
+    def __len__(self):
+        return len(self._devices)
+
+    def get_device(self, identifier, platform=None):
+        """
+        Returns a device descriptor.
+
+        :param identifier: Unique device identifier
+        :param platform: Optional platform name that the device must support
+        :return: Device descriptor or None if no such device is registered
+        """
+
+        if platform is not None:
+            return self._platforms.get(platform, {}).get(identifier, None)
+
+        return self._devices.get(identifier, None)
+
+    def get_platform_devices(self, platform):
+        """
+        Returns all devices supported by a platform.
+
+        :param platform: Platform name
+        """
+
+        return self._platforms.get(platform, {}).values()
+
+    def get_port_devices(self, port):
+        """
+        Returns all devices that have a port with the given identifier.
+
+        :param port: Port identifier
+        """
+
+        return [self._devices[identifier] for identifier in self._ports.get(port, [])]
+
+    def get_radio_devices(self, radio):
+        """
+        Returns all devices that have a radio with the given identifier.
+
+        :param radio: Radio identifier
+        """
+
+        return [self._devices[identifier] for identifier in self._radios.get(radio, [])]
+
+    def _serialize(self):
+        """
+        Computes metadata of all devices.
+        """
+
+        if self._metadata is None:
+            platforms = {}
+            for platform, platform_devices in sorted(self._platforms.items()):
+                for identifier in platform_devices:
+                    platforms.setdefault(identifier, []).append(platform)
+
+            self._metadata = dict([
+                (identifier, describe_device(device, platforms[identifier]))
+                for identifier, device in self._devices.items()
+            ])
+
+        return self._metadata
+
+    def get_metadata(self):
+        """
+        Returns metadata of all devices suitable for JSON serialization. The
+        result is computed once and must not be modified.
+        """
+
+        metadata = self._serialize()
+        return [metadata[identifier] for identifier in sorted(metadata)]
+
+    def get_device_metadata(self, identifier):
+        """
+        Returns metadata of a device suitable for JSON serialization. The
+        result is computed once and must not be modified.
+
+        :param identifier: Unique device identifier
+        :return: Device metadata or None if no such device is registered
+        """
+
+        return self._serialize().get(identifier, None)
+
+
+def describe_device(device, platforms):
+    """
+    Returns device metadata suitable for JSON serialization.
+
+    :param device: Device descriptor
+    :param platforms: A list of platform names that support the device
+    """
+
+    ports = []
+    for port in device.ports:
+        port_data = {
+            'identifier': port.identifier,
+            'description': port.description,
+        }
+        if isinstance(port, cgm_devices.SwitchedEthernetPort):
+            port_data.update({
+                'switch': port.switch,
+                'vlan': port.vlan,
+            })
+        ports.append(port_data)
+
+    return {
+        'identifier': device.identifier,
+        'name': device.name,
+        'manufacturer': device.manufacturer,
+        'url': device.url,
+        'architecture': device.architecture,
+        'platforms': platforms,
+        'usb': device.usb,
+        'ports': ports,
+        'radios': [
+            {
+                'identifier': radio.identifier,
+                'description': radio.description,
+                'protocols': [protocol.identifier for protocol in radio.protocols],
+                'connectors': [connector.identifier for connector in radio.connectors],
+                'features': list(radio.features),
+            }
+            for radio in device.radios
+        ],
+        'switches': [
+            {
+                'identifier': switch.identifier,
+                'description': switch.description,
+                'ports': list(switch.ports),
+                'vlans': switch.vlans,
+            }
+            for switch in device.switches
+        ],
+    }
+
+
+def get_catalogue():
+    """
+    Returns the catalogue of registered devices.
+    """
+
+    global _catalogue
+
+    if _catalogue is None:
+        from . import base as cgm_base
+
+        _catalogue = DeviceCatalogue(cgm_base.PLATFORM_REGISTRY.values())
+
+    return _catalogue
+
+
+def invalidate():
+    """
+    Invalidates the catalogue after device registrations change.
+    """
+
+    global _catalogue
+    _catalogue = None
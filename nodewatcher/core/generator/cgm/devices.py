@@ -7,6 +7,21 @@ from ...registry import registration
 from . import protocols as cgm_protocols
 
 
+def index_descriptors(descriptors):
+    """
+    Returns a dictionary of descriptors indexed by their identifiers. When
+    multiple descriptors have the same identifier, the first one is used.
+
+    :param descriptors: A list of descriptors
+    """
+
+    index = {}
+    for descriptor in descriptors:
+        index.setdefault(descriptor.identifier, descriptor)
+
+    return index
+
+
 class DevicePort(object):
     """
     An abstract descriptor of a device port.
@@ -105,6 +120,9 @@ class DeviceRadio(object):
         self.features = features or []
         self.index = None
 
+        # Protocol descriptors indexed by identifier.
+        self._protocols = index_descriptors(protocols)
+
     def get_connector_choices(self):
         """
         Returns a list of antenna connector choices for this radio.
@@ -126,9 +144,7 @@ class DeviceRadio(object):
         :param identifier: Protocol descriptor
         """
 
-        for protocol in self.protocols:
-            if protocol.identifier == identifier:
-                return protocol
+        return self._protocols.get(identifier, None)
 
     def has_feature(self, feature):
         """
@@ -276,7 +292,7 @@ class DeviceMetaclass(type):
 
             # If USB devices are supported, automatically configure a radio.
             if getattr(new_class, 'usb', False):
-                if not new_class.get_radio('wifi-usb0'):
+                if not [radio for radio in new_class.radios if radio.identifier == 'wifi-usb0']:
                     new_class.radios.append(USBRadio('wifi-usb0', "USB wireless radio"))
 
             # Validate that list of switches only contains Switch instances
@@ -287,14 +303,9 @@ class DeviceMetaclass(type):
             if not len(new_class.radios) and not len(new_class.ports):
                 raise exceptions.ImproperlyConfigured("A device cannot be without radios and ports!")
 
-            # Validate that list of ports only contains DevicePort instances and validate
-            # that switched ports refer to valid switches
-            for port in new_class.ports:
-                if not isinstance(port, DevicePort):
-                    raise exceptions.ImproperlyConfigured("List of device ports may only contain DevicePort instances!")
-
-                if hasattr(port, 'validate'):
-                    port.validate(new_class)
+            # Validate that list of ports only contains DevicePort instances
+            if len([x for x in new_class.ports if not isinstance(x, DevicePort)]):
+                raise exceptions.ImproperlyConfigured("List of device ports may only contain DevicePort instances!")
 
             # Validate that list of radios only contains DeviceRadio instances and assign
             # radio indices
@@ -308,6 +319,16 @@ class DeviceMetaclass(type):
             if len([x for x in new_class.antennas if not isinstance(x, InternalAntenna)]):
                 raise exceptions.ImproperlyConfigured("List of device antennas may only contain InternalAntenna instances!")
 
+            # Index descriptors by identifier, so that lookups do not need to scan the lists
+            new_class._radio_index = index_descriptors(new_class.radios)
+            new_class._switch_index = index_descriptors(new_class.switches)
+            new_class._port_index = index_descriptors(new_class.ports)
+
+            # Validate that switched ports refer to valid switches
+            for port in new_class.ports:
+                if hasattr(port, 'validate'):
+                    port.validate(new_class)
+
             def merge_platform_dict(source, destination):
                 for platform in source:
                     destination.setdefault(platform, {}).update(source[platform])
@@ -348,6 +369,10 @@ class DeviceBase(object):
     switches = None
     usb = False
 
+    _radio_index = {}
+    _switch_index = {}
+    _port_index = {}
+
     @classmethod
     def register(cls, platform):
         """
@@ -466,9 +491,7 @@ class DeviceBase(object):
         :param identifier: Radio identifier
         """
 
-        for radio in cls.radios:
-            if radio.identifier == identifier:
-                return radio
+        return cls._radio_index.get(identifier, None)
 
     @classmethod
     def get_switch(cls, identifier):
@@ -478,9 +501,7 @@ class DeviceBase(object):
         :param identifier: Port identifier
         """
 
-        for switch in cls.switches:
-            if switch.identifier == identifier:
-                return switch
+        return cls._switch_index.get(identifier, None)
 
     @classmethod
     def get_port(cls, identifier):
@@ -490,9 +511,7 @@ class DeviceBase(object):
         :param identifier: Port identifier
         """
 
-        for port in cls.ports:
-            if port.identifier == identifier:
-                return port
+        return cls._port_index.get(identifier, None)
 
 
 def register_module(platform=None, weight=50):
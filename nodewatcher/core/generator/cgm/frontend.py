@@ -9,6 +9,8 @@ if apps.is_installed('nodewatcher.modules.frontend.statistics'):
     from . import statistics
 
     statistics_pool.register(statistics.NodesByDeviceResource())
+    statistics_pool.register(statistics.BuildsByCacheResource())
+    statistics_pool.register(statistics.BuildQueueResource())
 
     components.partials.get_partial('network_statistics_partial').add(components.PartialEntry(
         name='cgm',
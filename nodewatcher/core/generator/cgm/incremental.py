@@ -0,0 +1,272 @@
+import collections
+import copy
+import hashlib
+import logging
+
+from django.conf import settings
+
+from ....utils import generations
+from ... import models as core_models
+from ...registry import access as registry_access, registration
+
+# Maximum number of nodes for which generation state is kept in each process.
+CACHE_SIZE = getattr(settings, 'GENERATOR_INCREMENTAL_CACHE_SIZE', 100)
+
+logger = logging.getLogger(__name__)
+
+# Generation state, indexed by node identifier.
+_states = collections.OrderedDict()
+
+
+class GenerationState(object):
+    """
+    State of a previous configuration generation for a node, which enables
+    subsequent generations to skip modules that are not affected by changes.
+    """
+
+    def __init__(self, signature):
+        """
+        Class constructor.
+
+        :param signature: Module chain signature
+        """
+
+        self.signature = signature
+        # Registry identifiers read by each module in the chain.
+        self.dependencies = None
+        # Fingerprints of registry items at the time of generation, indexed by registry identifier.
+        self.fingerprints = {}
+        # Registry identifiers of items that have changed between generations.
+        self.changed = set()
+        # Configuration snapshots taken before modules, indexed by module position.
+        self.checkpoints = {}
+
+    def get_checkpoint_positions(self):
+        """
+        Returns module positions where checkpoints are useful. These are the
+        modules that read some registry items for the first time in the chain,
+        as changes to these items require the chain to be re-run from there.
+        Only items that have already changed between generations are taken
+        into account, so that configuration is not copied for items that are
+        not being edited.
+        """
+
+        positions = set()
+        seen = set()
+        for position, dependencies in enumerate(self.dependencies):
+            if position > 0 and (dependencies - seen) & self.changed:
+                positions.add(position)
+            seen.update(dependencies)
+
+        return positions
+
+    def get_first_affected(self, changed):
+        """
+        Returns the position of the first module that read any of the changed
+        registry items or the chain length when no modules are affected.
+
+        :param changed: A set of changed registry identifiers
+        """
+
+        for position, dependencies in enumerate(self.dependencies):
+            if dependencies & changed:
+                return position
+
+        return len(self.dependencies)
+
+
+def get_module_identity(module):
+    """
+    Returns an identity of a module that is stable between generations.
+
+    :param module: Module function
+    """
+
+    return getattr(module, 'cgm_package', module)
+
+
+def get_signature(node, cfg, modules):
+    """
+    Returns the signature of a module chain. Generation state may only be
+    reused for the same chain and builder, and while data that modules may
+    read outside the node's registry items is unchanged. This is configuration
+    of other nodes (which also covers allocations from shared pools) and
+    builders. Changes of the node's own configuration are tracked through
+    registry item fingerprints, so they are not part of the signature.
+
+    :param node: Node instance
+    :param cfg: Platform configuration
+    :param modules: A list of (weight, module, device) tuples
+    """
+
+    config, node_config, generator = generations.get(('config', core_models.NODE_CONFIG_SCOPE % node.pk, 'generator'))
+    builder = (cfg.builder.pk, cfg.builder.version_id) if cfg.builder is not None else None
+
+    return (
+        # Both generations change on every change of the node's configuration, so their difference
+        # only changes when configuration of other nodes changes.
+        config - node_config,
+        generator,
+        builder,
+        tuple([(weight, get_module_identity(module), device) for weight, module, device in modules]),
+    )
+
+
+def get_item_fingerprint(node, registry_id):
+    """
+    Returns a fingerprint of all node configuration items with the given
+    registry identifier, not including its descendants. Items are looked up
+    through the registry, so that items already cached during generation
+    are not fetched again.
+
+    :param node: Node instance
+    :param registry_id: Registry identifier
+    """
+
+    resolver = registration.point('node.config').get_accessor(node)
+    fingerprint = hashlib.sha1()
+
+    for item in sorted(resolver.by_registry_id(registry_id, queryset=True), key=lambda item: item.pk):
+        values = [(field.attname, getattr(item, field.attname)) for field in item._meta.concrete_fields]
+        fingerprint.update(repr((registry_id, item.__class__.__name__, values)))
+
+    return fingerprint.hexdigest()
+
+
+def get_fingerprint(node, registry_id, item_fingerprints):
+    """
+    Returns a fingerprint of all node configuration items with the given
+    registry identifier and its descendants.
+
+    :param node: Node instance
+    :param registry_id: Registry identifier
+    :param item_fingerprints: A dictionary of already computed item fingerprints,
+      indexed by registry identifier, which is updated with computed ones
+    """
+
+    fingerprint = hashlib.sha1()
+
+    for item_registry_id in sorted(registration.point('node.config').get_all_registry_ids()):
+        if item_registry_id != registry_id and not item_registry_id.startswith(registry_id + '.'):
+            continue
+
+        if item_registry_id not in item_fingerprints:
+            item_fingerprints[item_registry_id] = get_item_fingerprint(node, item_registry_id)
+        fingerprint.update(item_fingerprints[item_registry_id])
+
+    return fingerprint.hexdigest()
+
+
+def take_snapshot(cfg):
+    """
+    Returns a copy of the platform configuration, which shares the node,
+    platform and builder instances.
+
+    :param cfg: Platform configuration
+    :return: Configuration copy or None if the configuration cannot be copied
+    """
+
+    memo = {id(cfg.node): cfg.node, id(cfg.platform): cfg.platform, id(cfg.builder): cfg.builder}
+    try:
+        return copy.deepcopy(cfg, memo)
+    except (TypeError, copy.Error):
+        logger.debug("Configuration for node '%s' cannot be copied." % cfg.node.pk)
+        return None
+
+
+def restore_snapshot(cfg, snapshot):
+    """
+    Restores the state of a platform configuration from a snapshot. The
+    snapshot itself is left intact, so that it may be restored again.
+
+    :param cfg: Platform configuration
+    :param snapshot: Configuration snapshot
+    """
+
+    memo = {id(snapshot.node): cfg.node, id(snapshot.platform): cfg.platform, id(snapshot.builder): cfg.builder}
+    cfg.__dict__.update(copy.deepcopy(snapshot, memo).__dict__)
+
+
+def run(node, cfg, modules):
+    """
+    Executes a module chain, reusing results of the previous generation for
+    the same node where possible.
+
+    Registry items read by each module are tracked. When items change, the
+    configuration is restored from the last checkpoint before the first
+    module that read them and the chain is executed from there on.
+
+    Results are discarded when configuration of other nodes or builders
+    changes, which is tracked through generations. These have to be shared
+    by all processes, so without a shared cache backend the whole chain is
+    always executed. Other data read by modules (for example pools edited
+    in the admin) is not tracked, which is why incremental generation is
+    only used for validation.
+
+    :param node: Node instance
+    :param cfg: Platform configuration
+    :param modules: A list of (weight, module, device) tuples
+    """
+
+    if not generations.is_shared():
+        for weight, module, device in modules:
+            module(node, cfg)
+        return
+
+    signature = get_signature(node, cfg, modules)
+    state = _states.pop(node.pk, None)
+    if state is None or state.signature != signature:
+        state = GenerationState(signature)
+
+    # Registry items do not change during generation, so fingerprints are computed once.
+    fingerprints = {}
+    item_fingerprints = {}
+
+    def fingerprint(registry_id):
+        if registry_id not in fingerprints:
+            fingerprints[registry_id] = get_fingerprint(node, registry_id, item_fingerprints)
+        return fingerprints[registry_id]
+
+    start = 0
+    if state.dependencies is not None:
+        changed = set([
+            registry_id for registry_id, previous in state.fingerprints.items()
+            if fingerprint(registry_id) != previous
+        ])
+        first_affected = state.get_first_affected(changed)
+        state.changed.update(changed)
+
+        # Checkpoints after the first affected module are based on outdated configuration.
+        state.checkpoints = dict([
+            (position, snapshot) for position, snapshot in state.checkpoints.items()
+            if position <= first_affected
+        ])
+        if state.checkpoints:
+            start = max(state.checkpoints)
+            restore_snapshot(cfg, state.checkpoints[start])
+
+    checkpoint_positions = state.get_checkpoint_positions() if state.dependencies is not None else set()
+    dependencies = list(state.dependencies or [set()] * len(modules))
+
+    for position in xrange(start, len(modules)):
+        # Deferred configuration functions refer to the configuration instance, so no further
+        # checkpoints are possible once there are any.
+        if position in checkpoint_positions and position not in state.checkpoints and not cfg.get_deferred_configuration():
+            snapshot = take_snapshot(cfg)
+            if snapshot is not None:
+                state.checkpoints[position] = snapshot
+
+        weight, module, device = modules[position]
+        with registry_access.track(node) as accessed:
+            module(node, cfg)
+        dependencies[position] = accessed
+
+    state.dependencies = dependencies
+    state.fingerprints = dict([
+        (registry_id, fingerprint(registry_id))
+        for registry_id in set().union(*dependencies)
+    ])
+
+    _states[node.pk] = state
+    while len(_states) > CACHE_SIZE:
+        _states.popitem(last=False)
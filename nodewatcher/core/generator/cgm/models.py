@@ -69,10 +69,17 @@ class CgmGeneralConfig(core_models.GeneralConfig):
         if not self.router:
             return None
 
-        try:
-            return cgm_base.get_platform(self.platform).get_device(self.router)
-        except KeyError:
-            return None
+        # Device descriptors are memoized, as they are used by many modules during generation.
+        key = (self.platform, self.router)
+        if getattr(self, '_device_cache', (None, None))[0] != key:
+            try:
+                device = cgm_base.get_platform(self.platform).get_device(self.router)
+            except KeyError:
+                device = None
+
+            self._device_cache = (key, device)
+
+        return self._device_cache[1]
 
 registration.point('node.config').register_item(CgmGeneralConfig)
 
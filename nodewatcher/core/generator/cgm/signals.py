@@ -7,8 +7,8 @@ pre_firmware_build = dispatch.Signal(providing_args=['result'])
 # downloaded from the builder. If the build process fails, this signal is
 # not emitted.
 #
-# The files variable contains a list of (name, content) tuples which may
-# be replaced or even erased.
+# The files variable contains a list of (name, build artifact) tuples which
+# may be replaced or even erased.
 post_firmware_build = dispatch.Signal(providing_args=['result', 'files'])
 
 # Called after build succeeds and post_firmware_build handlers have been called
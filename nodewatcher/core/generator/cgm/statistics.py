@@ -2,6 +2,7 @@ from django.db import models
 from django.utils.translation import ugettext_lazy as _
 
 from nodewatcher.core import models as core_models
+from nodewatcher.core.generator import models as generator_models, scheduler
 from nodewatcher.core.registry import registration
 from nodewatcher.modules.frontend.statistics import resources
 from nodewatcher.utils import loader
@@ -10,6 +11,7 @@ from nodewatcher.utils import loader
 class NodesByDeviceResource(resources.StatisticsResource):
     name = 'nodes_by_device'
     description = _("Device distribution among nodes.")
+    triggers = ('config',)
 
     def get_header(self):
         # Ensure all CGMs are loaded so that we get all the device metadata.
@@ -30,3 +32,49 @@ class NodesByDeviceResource(resources.StatisticsResource):
         ).annotate(
             count=models.Count('uuid')
         )
+
+
+class BuildsByCacheResource(resources.StatisticsResource):
+    name = 'builds_by_cache'
+    description = _("Distribution of successful firmware builds by whether they were served from the build cache.")
+    triggers = ('generator',)
+
+    def get_header(self):
+        return {
+            'cached': {
+                'type': 'boolean',
+            }
+        }
+
+    def get_statistics(self):
+        return generator_models.BuildResult.objects.filter(
+            status=generator_models.BuildResult.OK
+        ).values(
+            'cached'
+        ).annotate(
+            count=models.Count('uuid')
+        )
+
+
+class BuildQueueResource(resources.StatisticsResource):
+    name = 'build_queue'
+    description = _("Firmware build queue depth and waiting times (in seconds) for each group of equivalent builders.")
+    triggers = ('generator',)
+    # Waiting times change even when the queue does not.
+    refresh_interval = 60
+
+    def get_header(self):
+        return {
+            'platform': {
+                'type': 'string',
+            },
+            'architecture': {
+                'type': 'string',
+            },
+            'version': {
+                'type': 'string',
+            },
+        }
+
+    def get_statistics(self):
+        return scheduler.get_queue_statistics()
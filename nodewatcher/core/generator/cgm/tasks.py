@@ -1,5 +1,3 @@
-import hashlib
-import io
 import json
 import os
 import traceback
@@ -8,39 +6,41 @@ import unidecode
 
 from celery.task import task as celery_task
 
-from django.core.files import uploadedfile
-from django import db
 from django.db import transaction
 
 from ....utils import loader
 
 from . import signals, base as cgm_base, exceptions
-from .. import models as generator_models
+from .. import artifacts, models as generator_models, scheduler
 from .. import events as generator_events
 
 
 @celery_task(bind=True)
-@transaction.atomic
 def background_build(self, result_uuid):
     """
-    A task for deferred building of a firmware image.
+    A task for deferred building of a firmware image. Build results are
+    assigned to a builder slot by the scheduler before this task is called.
 
     :param result_uuid: Destination build result UUID
     """
 
     result = generator_models.BuildResult.objects.get(pk=result_uuid)
-    if result.status != generator_models.BuildResult.PENDING:
+    if result.status != generator_models.BuildResult.BUILDING:
         return
 
-    # Try to lock the builder for building
     try:
-        generator_models.Builder.objects.select_for_update(nowait=True).filter(pk=result.builder.pk)
-    except db.DatabaseError:
-        # Retry the build task again in 15 seconds
-        raise self.retry(countdown=15)
+        build(result)
+    finally:
+        # The build slot is now free, so the next pending build may be dispatched.
+        scheduler.schedule()
 
-    result.status = generator_models.BuildResult.BUILDING
-    result.save()
+
+def build(result):
+    """
+    Builds a firmware image and stores the resulting files.
+
+    :param result: Build result instance
+    """
 
     # Ensure that all CGMs are loaded before doing processing
     loader.load_modules('cgm')
@@ -49,9 +49,16 @@ def background_build(self, result_uuid):
     # Dispatch pre-build signal
     signals.pre_firmware_build.send(sender=None, result=result)
 
-    # Build the firmware and obtain firmware files
+    # Build the firmware and obtain firmware files; identical builds are served from the cache
     try:
-        files = platform.build(result)
+        cache_key = generator_models.BuildCacheEntry.objects.get_key(platform.get_build_fingerprint(result))
+        files = generator_models.BuildCacheEntry.objects.get_files(cache_key)
+        if files is None:
+            files = platform.build(result)
+            generator_models.BuildCacheEntry.objects.store(cache_key, result.builder, files)
+        else:
+            result.cached = True
+            result.build_log = 'Firmware files obtained from the build cache.'
     except exceptions.BuildError, e:
         if len(e.args) > 0:
             error_message = 'ERROR: %s' % e.args[0]
@@ -81,6 +88,29 @@ def background_build(self, result_uuid):
         generator_events.BuildResultFailed(result).post()
         return
 
+    try:
+        store_files(result, files)
+    finally:
+        # Remove temporary files holding the artifacts.
+        for _, artifact in files:
+            if isinstance(artifact, artifacts.BuildArtifact):
+                artifact.close()
+
+    # Dispatch finalize signal
+    signals.finalize_firmware_build.send(sender=None, result=result)
+    # Dispatch the result ready event
+    generator_events.BuildResultReady(result).post()
+
+
+def store_files(result, files):
+    """
+    Stores firmware files of a build result and generates the file manifest.
+    Files are streamed into the storage in chunks.
+
+    :param result: Build result instance
+    :param files: A list of (filename, build artifact) tuples
+    """
+
     # By default, prepend node name and version before firmware filenames.
     node_name = unidecode.unidecode(result.node.config.core.general().name)
     fw_version = result.builder.version.name.replace('.', '')
@@ -91,60 +121,51 @@ def background_build(self, result_uuid):
     # Dispatch signal that can be used to modify files
     signals.post_firmware_build.send(sender=None, result=result, files=files)
 
-    # Store resulting files and generate the file manifest.
-    manifest = {
-        'node': {
-            'uuid': str(result.node.uuid),
-            'name': node_name,
-        },
-        'firmware': {
-            'version': result.builder.version.name,
-        },
-        'files': []
-    }
-
-    for fw_name, fw_file in files:
-        r_file = generator_models.BuildResultFile(
-            result=result,
-            file=uploadedfile.InMemoryUploadedFile(
-                io.BytesIO(fw_file),
-                None,
-                os.path.basename(fw_name),
-                'application/octet-stream',
-                len(fw_file),
-                None
-            ),
-            checksum_md5=hashlib.md5(fw_file).hexdigest(),
-            checksum_sha256=hashlib.sha256(fw_file).hexdigest(),
-        )
-
-        manifest_entry = r_file.to_manifest()
-        if manifest_entry is not None:
-            manifest['files'].append(manifest_entry)
-
-        r_file.save()
-
-    # Store the manifest.
-    manifest = json.dumps(manifest)
-    generator_models.BuildResultFile(
-        result=result,
-        file=uploadedfile.InMemoryUploadedFile(
-            io.BytesIO(manifest),
-            None,
-            'manifest.json',
-            'text/json',
-            len(manifest),
-            None
-        ),
-        checksum_md5=hashlib.md5(manifest).hexdigest(),
-        checksum_sha256=hashlib.sha256(manifest).hexdigest(),
-        hidden=True,
-    ).save()
-
-    result.status = generator_models.BuildResult.OK
-    result.save()
-
-    # Dispatch finalize signal
-    signals.finalize_firmware_build.send(sender=None, result=result)
-    # Dispatch the result ready event
-    generator_events.BuildResultReady(result).post()
+    # Files and the final status are stored atomically.
+    with transaction.atomic():
+        # Store resulting files and generate the file manifest.
+        manifest = {
+            'node': {
+                'uuid': str(result.node.uuid),
+                'name': node_name,
+            },
+            'firmware': {
+                'version': result.builder.version.name,
+            },
+            'files': []
+        }
+
+        for index, (fw_name, fw_file) in enumerate(files[:]):
+            # Signal handlers may also provide plain file contents.
+            if not isinstance(fw_file, artifacts.BuildArtifact):
+                fw_file = artifacts.BuildArtifact.from_content(fw_file)
+                files[index] = (fw_name, fw_file)
+
+            r_file = generator_models.BuildResultFile(
+                result=result,
+                file=fw_file.get_file(os.path.basename(fw_name)),
+                checksum_md5=fw_file.checksum_md5,
+                checksum_sha256=fw_file.checksum_sha256,
+            )
+
+            manifest_entry = r_file.to_manifest()
+            if manifest_entry is not None:
+                manifest['files'].append(manifest_entry)
+
+            r_file.save()
+
+        # Store the manifest.
+        manifest = artifacts.BuildArtifact.from_content(json.dumps(manifest))
+        try:
+            generator_models.BuildResultFile(
+                result=result,
+                file=manifest.get_file('manifest.json'),
+                checksum_md5=manifest.checksum_md5,
+                checksum_sha256=manifest.checksum_sha256,
+                hidden=True,
+            ).save()
+        finally:
+            manifest.close()
+
+        result.status = generator_models.BuildResult.OK
+        result.save()
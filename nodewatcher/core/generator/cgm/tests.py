@@ -0,0 +1,125 @@
+import shutil
+import tempfile
+
+from django import test as django_test
+
+from nodewatcher.core import models as core_models
+from nodewatcher.core.generator import models as generator_models
+
+from . import incremental
+
+
+class TestConfiguration(object):
+    """
+    A minimal platform configuration, which records values set by modules.
+    """
+
+    def __init__(self, node):
+        self.node = node
+        self.platform = None
+        self.builder = None
+        self.values = []
+
+    def get_deferred_configuration(self):
+        return []
+
+
+class IncrementalTestCase(django_test.TestCase):
+    def setUp(self):
+        # Generation state is only reused when generations are shared by all processes.
+        self.cache_location = tempfile.mkdtemp()
+        self.cache_settings = self.settings(CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': self.cache_location,
+            },
+        })
+        self.cache_settings.enable()
+        incremental._states.clear()
+
+        self.node = core_models.Node()
+        self.node.save()
+        self.general = self.node.config.core.general(create=core_models.GeneralConfig, name='first')
+
+        self.calls = []
+
+        def static(node, cfg):
+            self.calls.append('static')
+            cfg.values.append('static')
+
+        def general(node, cfg):
+            self.calls.append('general')
+            cfg.values.append(node.config.core.general().name)
+
+        self.modules = [(10, static, None), (20, general, None)]
+
+    def tearDown(self):
+        incremental._states.clear()
+        self.cache_settings.disable()
+        shutil.rmtree(self.cache_location)
+
+    def validate(self):
+        self.calls = []
+        cfg = TestConfiguration(self.node)
+        incremental.run(self.node, cfg, self.modules)
+        return cfg.values
+
+    def rename(self, name):
+        self.general.name = name
+        self.general.save()
+
+    def test_edits(self):
+        self.assertEqual(self.validate(), ['static', 'first'])
+        self.assertEqual(self.calls, ['static', 'general'])
+
+        # The first edit of an item runs the whole chain and takes a checkpoint before
+        # the module which reads it.
+        self.rename('second')
+        self.assertEqual(self.validate(), ['static', 'second'])
+        self.assertEqual(self.calls, ['static', 'general'])
+
+        # Further edits only run modules from the checkpoint on.
+        self.rename('third')
+        self.assertEqual(self.validate(), ['static', 'third'])
+        self.assertEqual(self.calls, ['general'])
+
+        # Without changes, results are the same.
+        self.assertEqual(self.validate(), ['static', 'third'])
+        self.assertEqual(self.calls, ['general'])
+
+    def test_other_nodes(self):
+        self.validate()
+        self.rename('second')
+        self.validate()
+
+        # Modules may read configuration of other nodes, so their changes discard previous results.
+        other = core_models.Node()
+        other.save()
+        other.config.core.general(create=core_models.GeneralConfig, name='other')
+
+        self.rename('third')
+        self.assertEqual(self.validate(), ['static', 'third'])
+        self.assertEqual(self.calls, ['static', 'general'])
+
+    def test_builders(self):
+        self.validate()
+        self.rename('second')
+        self.validate()
+
+        # Modules may read builders, so their changes discard previous results.
+        generator_models.BuildVersion(name='git.1234567').save()
+
+        self.rename('third')
+        self.assertEqual(self.validate(), ['static', 'third'])
+        self.assertEqual(self.calls, ['static', 'general'])
+
+    def test_not_shared(self):
+        with self.settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self.validate()
+            self.rename('second')
+            self.validate()
+
+            # Without a shared cache changes in other processes are not seen, so the whole chain is run.
+            self.rename('third')
+            self.assertEqual(self.validate(), ['static', 'third'])
+            self.assertEqual(self.calls, ['static', 'general'])
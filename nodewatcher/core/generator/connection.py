@@ -1,14 +1,191 @@
 import hashlib
 import io
+import json
 import os
 import paramiko
 import pipes
 import socket
+import tarfile
+import threading
+import time
 
-from . import exceptions
+from django.conf import settings
+
+from . import artifacts, exceptions
 from .cgm import exceptions as cgm_exceptions
 
 BUILDER_PATH = '/builder/imagebuilder'
+# Directory holding copies of the imagebuilder for additional build slots.
+SLOTS_PATH = '/builder/slots'
+
+# Time (in seconds) after which idle pooled builder connections are closed.
+POOL_IDLE_TIMEOUT = getattr(settings, 'GENERATOR_BUILDER_POOL_IDLE_TIMEOUT', 300)
+
+
+class BuilderSession(object):
+    """
+    An established SSH connection and SFTP session with a builder.
+    """
+
+    def __init__(self, client, sftp):
+        """
+        Class constructor.
+
+        :param client: SSH client
+        :param sftp: SFTP client
+        """
+
+        self.client = client
+        self.sftp = sftp
+        self.last_used = time.time()
+
+    def is_usable(self):
+        """
+        Returns true if the session may be reused.
+        """
+
+        if time.time() - self.last_used > POOL_IDLE_TIMEOUT:
+            return False
+
+        transport = self.client.get_transport()
+        return transport is not None and transport.is_active()
+
+    def close(self):
+        """
+        Closes the session.
+        """
+
+        try:
+            self.sftp.close()
+            self.client.close()
+        except (paramiko.SSHException, socket.error, EOFError):
+            pass
+
+
+class ConnectionPool(object):
+    """
+    A per-process pool of builder sessions, so that consecutive builds on the
+    same builder do not need to establish new connections.
+    """
+
+    def __init__(self):
+        """
+        Class constructor.
+        """
+
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get_key(self, builder):
+        """
+        Returns the pool key for a builder. Sessions are invalidated whenever the
+        builder host or its private key change.
+
+        :param builder: Builder configuration object
+        """
+
+        return (str(builder.pk), builder.host, hashlib.sha1(builder.private_key.encode('utf8')).hexdigest())
+
+    def acquire(self, builder):
+        """
+        Returns an idle session with the builder or None when there is none.
+
+        :param builder: Builder configuration object
+        """
+
+        with self._lock:
+            sessions = self._sessions.get(self.get_key(builder), [])
+            while sessions:
+                session = sessions.pop()
+                if session.is_usable():
+                    return session
+
+                session.close()
+
+        return None
+
+    def release(self, builder, session):
+        """
+        Returns a session into the pool.
+
+        :param builder: Builder configuration object
+        :param session: Builder session
+        """
+
+        session.last_used = time.time()
+        with self._lock:
+            self._sessions.setdefault(self.get_key(builder), []).append(session)
+
+    def close_all(self):
+        """
+        Closes all idle sessions.
+        """
+
+        with self._lock:
+            for sessions in self._sessions.values():
+                for session in sessions:
+                    session.close()
+
+            self._sessions = {}
+
+pool = ConnectionPool()
+
+
+class FileBatch(object):
+    """
+    A batch of files that is transferred to the builder as a single tar stream.
+    """
+
+    def __init__(self):
+        """
+        Class constructor.
+        """
+
+        self._buffer = io.BytesIO()
+        self._archive = tarfile.open(fileobj=self._buffer, mode='w')
+        self._mtime = time.time()
+        self.count = 0
+
+    def add_directory(self, path, mode=0755):
+        """
+        Adds a directory to the batch.
+
+        :param path: Directory path, relative to the destination
+        :param mode: Directory mode
+        """
+
+        info = tarfile.TarInfo(path.strip('/'))
+        info.type = tarfile.DIRTYPE
+        info.mode = mode
+        info.mtime = self._mtime
+        self._archive.addfile(info)
+
+    def add_file(self, path, content, mode=None):
+        """
+        Adds a file to the batch.
+
+        :param path: File path, relative to the destination
+        :param content: File content
+        :param mode: File mode
+        """
+
+        if isinstance(content, unicode):
+            content = content.encode('utf8')
+
+        info = tarfile.TarInfo(path.strip('/'))
+        info.size = len(content)
+        info.mode = 0644 if mode is None else mode
+        info.mtime = self._mtime
+        self._archive.addfile(info, io.BytesIO(content))
+        self.count += 1
+
+    def getvalue(self):
+        """
+        Returns the tar archive containing the batch.
+        """
+
+        self._archive.close()
+        return self._buffer.getvalue()
 
 
 class BuilderConnection(object):
@@ -16,19 +193,41 @@ class BuilderConnection(object):
     Connection with the builder.
     """
 
-    def __init__(self, builder):
+    def __init__(self, builder, pooled=True, slot=None):
         """
         Class constructor.
 
         :param builder: Builder configuration object
+        :param pooled: Should the connection be taken from and returned into
+          the connection pool
+        :param slot: Optional build slot; each slot uses its own imagebuilder
+          working directory, so that builds in different slots do not interfere
         """
 
         self.builder = builder
+        self.pooled = pooled
+        self.slot = slot
+        if slot:
+            self.path = os.path.join(SLOTS_PATH, '%s-%s' % (slot, self.get_imagebuilder_key()))
+        else:
+            self.path = BUILDER_PATH
         self.tempdirs = []
+        self.session = None
 
-    def __enter__(self):
+    def get_imagebuilder_key(self):
         """
-        Establishes a connection with the builder.
+        Returns a key identifying the imagebuilder installed on the builder. It
+        changes whenever the builder is registered with a different version or
+        metadata, so that slot working directories are copied again.
+        """
+
+        return hashlib.sha1(json.dumps([self.builder.version.name, self.builder.metadata], sort_keys=True)).hexdigest()[:16]
+
+    def open_session(self):
+        """
+        Establishes a new session with the builder.
+
+        :return: Builder session
         """
 
         # Load private key (detect RSA or DSS)
@@ -42,31 +241,89 @@ class BuilderConnection(object):
                 raise exceptions.MalformedPrivateKey
 
         try:
-            self.client = paramiko.SSHClient()
-            self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            self.client.connect(
+            client = paramiko.SSHClient()
+            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            client.connect(
                 hostname=self.builder.host,
                 username='builder',
                 pkey=pkey,
             )
-            transport = self.client.get_transport()
+            transport = client.get_transport()
             transport.set_keepalive(60)
-            self.sftp = transport.open_sftp_client()
+            return BuilderSession(client, transport.open_sftp_client())
         except (paramiko.SSHException, paramiko.SFTPError, socket.error):
             raise exceptions.BuilderConnectionFailed
 
+    def __enter__(self):
+        """
+        Establishes a connection with the builder or reuses a pooled one.
+        """
+
+        if self.pooled:
+            self.session = pool.acquire(self.builder)
+        if self.session is None:
+            self.session = self.open_session()
+
+        self.client = self.session.client
+        self.sftp = self.session.sftp
+
+        if self.path != BUILDER_PATH:
+            try:
+                self.prepare_slot()
+            except:
+                self.session.close()
+                raise
+
         return self
 
-    def __exit__(self, *args):
+    def __exit__(self, exc_type, exc_value, traceback):
         """
-        Cleans up any temporary resources and closes the connection.
+        Cleans up any temporary resources and returns the connection into the pool
+        or closes it.
         """
 
-        # Cleanup temporary directories
-        for tmpdir in self.tempdirs:
-            self.client.exec_command('rm -rf %s' % tmpdir)
+        try:
+            # Cleanup temporary directories
+            if self.tempdirs:
+                stdin, stdout, stderr = self.client.exec_command(
+                    'rm -rf %s' % ' '.join([pipes.quote(tmpdir) for tmpdir in self.tempdirs])
+                )
+                stdout.channel.recv_exit_status()
+                self.tempdirs = []
+        except (paramiko.SSHException, socket.error, EOFError):
+            self.session.close()
+            return
+
+        # Only reuse connections after successful builds or ordinary build errors, as other
+        # errors may have left the session in an unknown state.
+        reusable = exc_type is None or issubclass(exc_type, cgm_exceptions.BuildError)
+        if self.pooled and reusable and self.session.is_usable():
+            pool.release(self.builder, self.session)
+        else:
+            self.session.close()
+
+    def prepare_slot(self):
+        """
+        Ensures that the working directory of the build slot exists, creating it
+        as a copy of the imagebuilder when needed. Working directories of the
+        same slot for other imagebuilders are removed.
+        """
 
-        self.client.close()
+        try:
+            stdin, stdout, stderr = self.client.exec_command(
+                'test -d %(path)s || (mkdir -p %(slots)s && rm -rf %(stale)s && cp -a %(source)s %(path)s.tmp && mv %(path)s.tmp %(path)s) 2>&1' % {
+                    'path': pipes.quote(self.path),
+                    'slots': pipes.quote(SLOTS_PATH),
+                    'stale': '%(slot)s %(slot)s-*' % {'slot': pipes.quote(os.path.join(SLOTS_PATH, str(self.slot)))},
+                    'source': pipes.quote(BUILDER_PATH),
+                }
+            )
+            output = stdout.read()
+
+            if stdout.channel.recv_exit_status() != 0:
+                raise cgm_exceptions.BuildError('Failed to prepare build slot %s: %s' % (self.slot, output))
+        except (paramiko.SSHException, socket.error):
+            raise cgm_exceptions.BuildError('Failed to prepare build slot %s.' % self.slot)
 
     def create_tempdir(self):
         """
@@ -109,6 +366,28 @@ class BuilderConnection(object):
         except IOError:
             raise cgm_exceptions.BuildError('Failed to write file: %s' % path)
 
+    def write_files(self, path, batch):
+        """
+        Transfers a batch of files to the builder as a single tar stream and
+        extracts it there.
+
+        :param path: Destination directory
+        :param batch: File batch
+        """
+
+        try:
+            stdin, stdout, stderr = self.client.exec_command('mkdir -p %(path)s && tar -x -f - -C %(path)s 2>&1' % {
+                'path': pipes.quote(path),
+            })
+            stdin.write(batch.getvalue())
+            stdin.channel.shutdown_write()
+            output = stdout.read()
+
+            if stdout.channel.recv_exit_status() != 0:
+                raise cgm_exceptions.BuildError('Failed to write files: %s' % output)
+        except (paramiko.SSHException, socket.error):
+            raise cgm_exceptions.BuildError('Failed to write files.')
+
     def chmod(self, path, mode):
         """
         Changes the permissions of a file.
@@ -129,7 +408,7 @@ class BuilderConnection(object):
 
         try:
             cmd = [
-                'cd %s;' % BUILDER_PATH,
+                'cd %s;' % pipes.quote(self.path),
                 " ".join([pipes.quote(arg) for arg in args]),
                 "2>&1",
             ]
@@ -151,7 +430,7 @@ class BuilderConnection(object):
         :param path: Path relative to the builder directory
         """
 
-        return self.sftp.listdir(os.path.join(BUILDER_PATH, path))
+        return self.sftp.listdir(os.path.join(self.path, path))
 
     def read_result_file(self, path):
         """
@@ -160,5 +439,16 @@ class BuilderConnection(object):
         :param path: Path relative to the builder directory
         """
 
-        with self.sftp.open(os.path.join(BUILDER_PATH, path), 'r') as fobj:
+        with self.sftp.open(os.path.join(self.path, path), 'r') as fobj:
             return fobj.read()
+
+    def stream_result_file(self, path):
+        """
+        Transfers a result file in chunks into a build artifact.
+
+        :param path: Path relative to the builder directory
+        :return: Build artifact
+        """
+
+        with self.sftp.open(os.path.join(self.path, path), 'r') as fobj:
+            return artifacts.BuildArtifact.from_stream(fobj)
@@ -0,0 +1,188 @@
+import os
+import subprocess
+import time
+import uuid
+
+from optparse import make_option
+
+from django.core.management import base
+
+from ... import connection
+
+
+class LocalTransport(object):
+    def is_active(self):
+        return True
+
+
+class LocalChannel(object):
+    def __init__(self, process):
+        self._process = process
+
+    def shutdown_write(self):
+        self._process.stdin.close()
+
+    def recv_exit_status(self):
+        return self._process.wait()
+
+
+class LocalStream(object):
+    def __init__(self, process, stream):
+        self.channel = LocalChannel(process)
+        self._stream = stream
+
+    def write(self, data):
+        self._stream.write(data)
+
+    def read(self):
+        return self._stream.read()
+
+    def readlines(self):
+        return self._stream.readlines()
+
+
+class LocalSSHClient(object):
+    """
+    A stand-in for the paramiko SSH client, which executes commands locally and
+    simulates network latency.
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def get_transport(self):
+        return LocalTransport()
+
+    def exec_command(self, command):
+        time.sleep(self.latency)
+        process = subprocess.Popen(
+            command,
+            shell=True,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        return LocalStream(process, process.stdin), LocalStream(process, process.stdout), None
+
+    def close(self):
+        pass
+
+
+class LocalSFTPClient(object):
+    """
+    A stand-in for the paramiko SFTP client, which operates on the local
+    filesystem and simulates network latency.
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def mkdir(self, path):
+        time.sleep(self.latency)
+        try:
+            os.mkdir(path)
+        except OSError, e:
+            raise IOError(*e.args)
+
+    def open(self, path, mode):
+        time.sleep(self.latency)
+        return open(path, mode)
+
+    def chmod(self, path, mode):
+        time.sleep(self.latency)
+        os.chmod(path, mode)
+
+    def close(self):
+        pass
+
+
+class LocalBuilder(object):
+    def __init__(self):
+        self.pk = uuid.uuid4()
+        self.host = 'localhost'
+        self.private_key = ''
+
+
+class LocalBuilderConnection(connection.BuilderConnection):
+    """
+    Builder connection that uses the local stand-ins instead of SSH.
+    """
+
+    def __init__(self, builder, pooled, latency, handshake):
+        super(LocalBuilderConnection, self).__init__(builder, pooled=pooled)
+        self.latency = latency
+        self.handshake = handshake
+
+    def open_session(self):
+        # Key exchange, authentication and opening the SFTP subsystem take several round trips.
+        time.sleep(self.handshake)
+        return connection.BuilderSession(LocalSSHClient(self.latency), LocalSFTPClient(self.latency))
+
+
+class Command(base.BaseCommand):
+    help = "Benchmarks staging of build files on a builder, using a local stand-in for SSH."
+    option_list = base.BaseCommand.option_list + (
+        make_option(
+            '--builds',
+            dest='builds',
+            default=20,
+            type=int,
+            help='Number of builds',
+        ),
+        make_option(
+            '--files',
+            dest='files',
+            default=40,
+            type=int,
+            help='Number of files per build',
+        ),
+        make_option(
+            '--latency',
+            dest='latency',
+            default=0.01,
+            type=float,
+            help='Simulated round trip latency in seconds',
+        ),
+        make_option(
+            '--handshake',
+            dest='handshake',
+            default=0.2,
+            type=float,
+            help='Simulated connection setup time in seconds',
+        ),
+    )
+
+    def get_files(self, count):
+        return [
+            (os.path.join('etc', 'config', 'file%d' % index), os.urandom(512), 0644)
+            for index in xrange(count)
+        ]
+
+    def stage_per_file(self, builder, files, options):
+        with LocalBuilderConnection(builder, False, options['latency'], options['handshake']) as conn:
+            temp_path = conn.create_tempdir()
+            for path, content, mode in files:
+                conn.write_file(os.path.join(temp_path, path), content, mode=mode)
+
+    def stage_batch(self, builder, files, options):
+        with LocalBuilderConnection(builder, True, options['latency'], options['handshake']) as conn:
+            temp_path = conn.create_tempdir()
+            batch = connection.FileBatch()
+            for path, content, mode in files:
+                batch.add_file(path, content, mode=mode)
+            conn.write_files(temp_path, batch)
+
+    def handle(self, *args, **options):
+        builder = LocalBuilder()
+        files = self.get_files(options['files'])
+
+        for name, method in (('per-file SFTP, new connections', self.stage_per_file),
+                             ('tar batch, pooled connections', self.stage_batch)):
+            start = time.time()
+            for _ in xrange(options['builds']):
+                method(builder, files, options)
+            duration = time.time() - start
+
+            self.stdout.write("%s: %.3f s total, %.3f s per build" % (name, duration, duration / options['builds']))
+
+        connection.pool.close_all()
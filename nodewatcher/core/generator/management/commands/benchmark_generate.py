@@ -0,0 +1,91 @@
+import time
+
+from optparse import make_option
+
+from django.core.management import base
+from django.db import connection, transaction
+from django.test import utils as test_utils
+
+from .... import models as core_models
+from ...cgm import base as cgm_base, bulk
+
+
+class Command(base.BaseCommand):
+    help = "Benchmarks configuration generation time per node for existing nodes of a platform."
+    option_list = base.BaseCommand.option_list + (
+        make_option(
+            '--platform',
+            dest='platform',
+            default='openwrt',
+            help='Platform identifier',
+        ),
+        make_option(
+            '--nodes',
+            dest='nodes',
+            default=50,
+            type=int,
+            help='Maximum number of nodes',
+        ),
+        make_option(
+            '--iterations',
+            dest='iterations',
+            default=3,
+            type=int,
+            help='Number of times configuration is generated for each node',
+        ),
+        make_option(
+            '--prefetch',
+            dest='prefetch',
+            action='store_true',
+            default=False,
+            help='Prefetch top-level registry items of all nodes',
+        ),
+        make_option(
+            '--incremental',
+            dest='incremental',
+            action='store_true',
+            default=False,
+            help='Use incremental generation, as done for validation',
+        ),
+    )
+
+    def handle(self, *args, **options):
+        platform = cgm_base.get_platform(options['platform'])
+        nodes = core_models.Node.objects.regpoint('config').registry_filter(
+            core_general__platform=options['platform'],
+        ).order_by('pk')[:options['nodes']]
+        if options['prefetch']:
+            nodes = bulk.prefetch_config(nodes)
+
+        timings = []
+        queries = []
+        failed = 0
+
+        # Generation should not modify anything, but make sure that nothing is stored.
+        with transaction.atomic():
+            nodes = list(nodes)
+            for _ in xrange(options['iterations']):
+                for node in nodes:
+                    with test_utils.CaptureQueriesContext(connection) as context:
+                        start = time.time()
+                        try:
+                            platform.generate(node, incremental=options['incremental'])
+                        except (cgm_base.ValidationError, KeyError, AttributeError):
+                            failed += 1
+                            continue
+                        timings.append(time.time() - start)
+                    queries.append(len(context))
+
+            transaction.set_rollback(True)
+
+        if not timings:
+            raise base.CommandError("No nodes with platform '%s' could be generated." % options['platform'])
+
+        timings.sort()
+        self.stdout.write("Generated %d configurations for %d nodes, %d failed." % (len(timings), len(nodes), failed))
+        self.stdout.write("Time per node: %.2f ms mean, %.2f ms median, %.2f ms max." % (
+            1000 * sum(timings) / len(timings),
+            1000 * timings[len(timings) // 2],
+            1000 * timings[-1],
+        ))
+        self.stdout.write("Queries per node: %.1f mean." % (float(sum(queries)) / len(queries)))
@@ -0,0 +1,82 @@
+import time
+
+from optparse import make_option
+
+from django.contrib.auth import models as auth_models
+from django.core.management import base
+
+from .... import models as core_models
+from ...cgm import bulk
+
+
+class Command(base.BaseCommand):
+    args = '[node_uuid ...]'
+    help = "Generates and queues firmware builds for many nodes at once."
+    option_list = base.BaseCommand.option_list + (
+        make_option(
+            '--user',
+            dest='user',
+            default=None,
+            help='Username of the user that will own the firmware images',
+        ),
+        make_option(
+            '--project',
+            dest='project',
+            default=None,
+            help='Only generate firmware for nodes in the given project',
+        ),
+        make_option(
+            '--processes',
+            dest='processes',
+            default=None,
+            type=int,
+            help='Number of worker processes used for generating configuration',
+        ),
+        make_option(
+            '--wait',
+            dest='wait',
+            action='store_true',
+            default=False,
+            help='Wait until all queued builds are finished',
+        ),
+    )
+
+    def report_generation(self, processed, total):
+        self.stdout.write("Generated configuration for %d/%d nodes." % (processed, total))
+
+    def handle(self, *args, **options):
+        if not options['user']:
+            raise base.CommandError("The --user option is required.")
+
+        try:
+            user = auth_models.User.objects.get(username=options['user'])
+        except auth_models.User.DoesNotExist:
+            raise base.CommandError("User '%s' does not exist." % options['user'])
+
+        nodes = core_models.Node.objects.regpoint('config')
+        if args:
+            nodes = nodes.filter(pk__in=args)
+        if options['project']:
+            nodes = nodes.registry_filter(core_project__project__name=options['project'])
+
+        result = bulk.generate_firmware(nodes, user, processes=options['processes'], progress=self.report_generation)
+
+        for node_pk, error in sorted(result.errors.items()):
+            self.stderr.write("Node %s: %s" % (node_pk, error))
+
+        self.stdout.write("Queued %d builds, skipped %d already queued builds, %d nodes failed." % (
+            len(result.results),
+            len(result.duplicates),
+            len(result.errors),
+        ))
+
+        if not options['wait']:
+            return
+
+        while result.results:
+            progress = bulk.get_progress(result.results)
+            self.stdout.write("Builds: %(pending)d pending, %(building)d building, %(ok)d ok, %(failed)d failed." % progress)
+            if not progress['pending'] and not progress['building']:
+                break
+
+            time.sleep(10)
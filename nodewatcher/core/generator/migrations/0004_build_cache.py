@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import nodewatcher.core.generator.models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0003_builder_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BuildCacheEntry',
+            fields=[
+                ('key', models.CharField(help_text='Hash of all build inputs.', max_length=64, serialize=False, primary_key=True)),
+                ('created', models.DateTimeField(help_text='Timestamp when cache entry was created.', auto_now_add=True)),
+                ('last_used', models.DateTimeField(help_text='Timestamp when cache entry was last used.', db_index=True)),
+                ('hits', models.PositiveIntegerField(default=0, help_text='Number of builds that used this cache entry.')),
+                ('size', models.BigIntegerField(default=0, help_text='Total size of cached files in bytes.')),
+                ('builder', models.ForeignKey(related_name='cache_entries', to='generator.Builder', help_text='Firmware builder host used.')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BuildCacheFile',
+            fields=[
+                ('uuid', models.UUIDField(primary_key=True, default=uuid.uuid4, serialize=False, editable=False, help_text='A unique build cache file identifier.')),
+                ('name', models.CharField(max_length=200)),
+                ('file', models.FileField(max_length=200, upload_to=nodewatcher.core.generator.models.generate_build_cache_filename)),
+                ('entry', models.ForeignKey(related_name='files', to='generator.BuildCacheEntry')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='buildresult',
+            name='cached',
+            field=models.BooleanField(default=False, help_text='Firmware was obtained from the build cache.'),
+        ),
+    ]
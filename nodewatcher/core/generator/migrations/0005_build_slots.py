@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0004_build_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='builder',
+            name='slots',
+            field=models.PositiveIntegerField(default=1, help_text='Number of builds that may run in parallel on this builder.'),
+        ),
+        migrations.AddField(
+            model_name='buildresult',
+            name='slot',
+            field=models.PositiveIntegerField(help_text='Builder slot used for building.', null=True, editable=False, blank=True),
+        ),
+        migrations.AddField(
+            model_name='buildresult',
+            name='started',
+            field=models.DateTimeField(help_text='Timestamp when build was started.', null=True, blank=True),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import hashlib
+import json
+
+from django.db import models, migrations
+
+
+def compute_build_keys(apps, schema_editor):
+    BuildResult = apps.get_model('generator', 'BuildResult')
+
+    # Only pending and running builds are compared by their keys.
+    for result in BuildResult.objects.filter(status__in=('pending', 'building')).select_related('builder').iterator():
+        result.build_key = hashlib.sha256(json.dumps([
+            result.builder.platform,
+            result.builder.architecture,
+            str(result.builder.version_id),
+            str(result.build_channel_id),
+            result.config,
+        ], sort_keys=True, separators=(',', ':'))).hexdigest()
+        result.save(update_fields=['build_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0005_build_slots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='buildresult',
+            name='build_key',
+            field=models.CharField(help_text='Key identifying builds that produce identical firmware.', max_length=64, editable=False, db_index=True, blank=True),
+        ),
+        migrations.RunPython(compute_build_keys, migrations.RunPython.noop),
+    ]
@@ -1,17 +1,26 @@
+import hashlib
+import json
 import requests
 import uuid
 
-from django import dispatch
+from django import db, dispatch
+from django.conf import settings
 from django.contrib.auth import models as auth_models
 from django.core import exceptions as django_exceptions
 from django.db.models import signals as django_signals
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
 import json_field
 
 from .. import models as core_models
-from . import connection, exceptions
+from ...utils import generations
+from . import artifacts, connection, exceptions
+
+# Maximum total size (in bytes) of firmware images kept in the build cache. Set to zero
+# to disable the build cache.
+BUILD_CACHE_SIZE = getattr(settings, 'GENERATOR_BUILD_CACHE_SIZE', 10 * 1024 * 1024 * 1024)
 
 
 class BuildChannel(models.Model):
@@ -129,6 +138,10 @@ class Builder(models.Model):
     private_key = models.TextField(
         help_text=_('Private key for SSH authentication.'),
     )
+    slots = models.PositiveIntegerField(
+        default=1,
+        help_text=_('Number of builds that may run in parallel on this builder.'),
+    )
 
     def _get_metadata(self):
         """
@@ -161,7 +174,7 @@ class Builder(models.Model):
 
         # Verify that the builder is also reachable over SSH.
         try:
-            with self.connect():
+            with self.connect(pooled=False):
                 pass
         except exceptions.BuilderConnectionFailed:
             raise django_exceptions.ValidationError(_('Failed to establish SSH connection with builder!'))
@@ -187,13 +200,16 @@ class Builder(models.Model):
 
         return True
 
-    def connect(self):
+    def connect(self, pooled=True, slot=None):
         """
         Establishes a connection with the builder via SSH and returns the
         connection controller.
+
+        :param pooled: Should a pooled connection be used
+        :param slot: Optional build slot, which determines the working directory
         """
 
-        return connection.BuilderConnection(self)
+        return connection.BuilderConnection(self, pooled=pooled, slot=slot)
 
     def __unicode__(self):
         return self.host
@@ -275,6 +291,47 @@ class BuildResult(models.Model):
         default=PENDING,
         help_text=_('Build status.')
     )
+    cached = models.BooleanField(
+        default=False,
+        help_text=_('Firmware was obtained from the build cache.'),
+    )
+    started = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text=_('Timestamp when build was started.'),
+    )
+    slot = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text=_('Builder slot used for building.'),
+    )
+    build_key = models.CharField(
+        max_length=64,
+        blank=True,
+        editable=False,
+        db_index=True,
+        help_text=_('Key identifying builds that produce identical firmware.'),
+    )
+
+    def get_build_key(self):
+        """
+        Computes a key identifying builds that produce identical firmware.
+        """
+
+        return hashlib.sha256(json.dumps([
+            self.builder.platform,
+            self.builder.architecture,
+            str(self.builder.version_id),
+            str(self.build_channel_id),
+            self.config,
+        ], sort_keys=True, separators=(',', ':'))).hexdigest()
+
+    def save(self, *args, **kwargs):
+        if not self.build_key:
+            self.build_key = self.get_build_key()
+
+        super(BuildResult, self).save(*args, **kwargs)
 
     def __repr__(self):
         return '<BuildResult for node \'%s\'>' % self.node_id
@@ -344,3 +401,178 @@ def build_result_removed(sender, instance, **kwargs):
 
     if instance.file:
         instance.file.delete(save=False)
+
+
+class BuildCacheEntryManager(models.Manager):
+    def get_key(self, fingerprint):
+        """
+        Computes the cache key for a build fingerprint.
+
+        :param fingerprint: JSON-serializable description of all build inputs
+        :return: Cache key
+        """
+
+        return hashlib.sha256(json.dumps(fingerprint, sort_keys=True, separators=(',', ':'))).hexdigest()
+
+    def get_files(self, key):
+        """
+        Returns cached firmware files and marks the cache entry as recently used.
+
+        :param key: Cache key
+        :return: A list of (filename, build artifact) tuples or None on a cache miss
+        """
+
+        if not BUILD_CACHE_SIZE:
+            return None
+
+        try:
+            entry = self.get(key=key)
+        except self.model.DoesNotExist:
+            return None
+
+        files = []
+        try:
+            for cache_file in entry.files.all():
+                cache_file.file.open('rb')
+                try:
+                    files.append((cache_file.name, artifacts.BuildArtifact.from_stream(cache_file.file)))
+                finally:
+                    cache_file.file.close()
+        except (IOError, OSError):
+            # Files have been removed from the storage, the entry is no longer valid.
+            for name, artifact in files:
+                artifact.close()
+            entry.delete()
+            return None
+
+        self.filter(key=key).update(hits=models.F('hits') + 1, last_used=timezone.now())
+        return files
+
+    def store(self, key, builder, files):
+        """
+        Stores firmware files into the build cache and evicts least recently used
+        entries when the cache is too large.
+
+        :param key: Cache key
+        :param builder: Builder that built the files
+        :param files: A list of (filename, build artifact) tuples
+        """
+
+        if not BUILD_CACHE_SIZE:
+            return
+
+        try:
+            with transaction.atomic():
+                entry = self.create(
+                    key=key,
+                    builder=builder,
+                    last_used=timezone.now(),
+                    size=sum([artifact.size for name, artifact in files]),
+                )
+
+                for name, artifact in files:
+                    BuildCacheFile(
+                        entry=entry,
+                        name=name,
+                        file=artifact.get_file(name),
+                    ).save()
+        except db.IntegrityError:
+            # The same firmware has been stored by a concurrent build.
+            return
+
+        self.evict()
+
+    def evict(self):
+        """
+        Removes least recently used entries until the cache fits into its size limit.
+        """
+
+        total = self.aggregate(total=models.Sum('size'))['total'] or 0
+        for entry in self.order_by('last_used'):
+            if total <= BUILD_CACHE_SIZE:
+                break
+
+            total -= entry.size
+            entry.delete()
+
+
+class BuildCacheEntry(models.Model):
+    """
+    Cached firmware images, keyed by a hash of all inputs of a build.
+    """
+
+    key = models.CharField(
+        max_length=64,
+        primary_key=True,
+        help_text=_('Hash of all build inputs.'),
+    )
+    builder = models.ForeignKey(
+        Builder,
+        related_name='cache_entries',
+        help_text=_('Firmware builder host used.'),
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        help_text=_('Timestamp when cache entry was created.'),
+    )
+    last_used = models.DateTimeField(
+        db_index=True,
+        help_text=_('Timestamp when cache entry was last used.'),
+    )
+    hits = models.PositiveIntegerField(
+        default=0,
+        help_text=_('Number of builds that used this cache entry.'),
+    )
+    size = models.BigIntegerField(
+        default=0,
+        help_text=_('Total size of cached files in bytes.'),
+    )
+
+    objects = BuildCacheEntryManager()
+
+    def __repr__(self):
+        return '<BuildCacheEntry \'%s\'>' % self.key
+
+
+def generate_build_cache_filename(cache_file, filename):
+    """
+    Generates the build cache file location.
+    """
+
+    return 'generator/cache/%s/%s' % (cache_file.entry.key, filename)
+
+
+class BuildCacheFile(models.Model):
+    """
+    A firmware file belonging to a build cache entry.
+    """
+
+    uuid = models.UUIDField(
+        primary_key=True, default=uuid.uuid4, editable=False,
+        help_text=_('A unique build cache file identifier.'),
+    )
+    entry = models.ForeignKey(
+        BuildCacheEntry,
+        related_name='files',
+    )
+    name = models.CharField(max_length=200)
+    file = models.FileField(
+        upload_to=generate_build_cache_filename,
+        max_length=200,
+    )
+
+    def __repr__(self):
+        return '<BuildCacheFile for entry \'%s\'>' % self.entry_id
+
+
+@dispatch.receiver(django_signals.post_delete, sender=BuildCacheFile)
+def build_cache_file_removed(sender, instance, **kwargs):
+    """
+    Removes any cached files from the storage backend.
+    """
+
+    if instance.file:
+        instance.file.delete(save=False)
+
+
+generations.bump_on_change('generator', BuildChannel, BuildVersion, Builder, BuildResult, BuildResultFile)
@@ -0,0 +1,278 @@
+import collections
+import datetime
+import logging
+
+import requests
+
+from django.conf import settings
+from django.db import models as django_models, transaction
+from django.utils import timezone
+
+from . import models
+
+# Time (in seconds) after which builds that are still running are considered failed.
+BUILD_TIMEOUT = getattr(settings, 'GENERATOR_BUILD_TIMEOUT', 2 * 60 * 60)
+# Period (in seconds) of recently started builds used to compute average waiting times.
+WAIT_STATISTICS_PERIOD = getattr(settings, 'GENERATOR_WAIT_STATISTICS_PERIOD', 60 * 60)
+
+logger = logging.getLogger(__name__)
+
+
+def order_fairly(results, running):
+    """
+    Orders pending build results so that users take turns. Each next build is
+    taken from the user with the least builds running or already scheduled,
+    while each user's builds are kept in order of creation.
+
+    :param results: Pending build results, ordered by creation time
+    :param running: A dictionary mapping user identifiers to the number of
+      their running builds
+    :return: A list of build results in scheduling order
+    """
+
+    queues = collections.OrderedDict()
+    for result in results:
+        queues.setdefault(result.user_id, collections.deque()).append(result)
+
+    load = collections.Counter(running)
+    ordered = []
+    while queues:
+        user = min(queues, key=lambda user: (load[user], queues[user][0].created))
+        ordered.append(queues[user].popleft())
+        load[user] += 1
+
+        if not queues[user]:
+            del queues[user]
+
+    return ordered
+
+
+def is_equivalent(builder, other, build_channel_id, builder_channels):
+    """
+    Returns true if a builder produces the same firmware as another builder
+    for the given build channel.
+
+    :param builder: Candidate builder
+    :param other: Builder that was selected when the build was requested
+    :param build_channel_id: Build channel identifier
+    :param builder_channels: A dictionary mapping builder identifiers to sets
+      of their build channel identifiers
+    """
+
+    if (builder.platform, builder.architecture, builder.version_id) != (other.platform, other.architecture, other.version_id):
+        return False
+
+    return build_channel_id in builder_channels[builder.pk]
+
+
+def is_consistent(builder):
+    """
+    Checks builder consistency, treating unreachable builders as inconsistent.
+
+    :param builder: Builder instance
+    """
+
+    try:
+        return builder.is_consistent()
+    except (requests.RequestException, ValueError, KeyError):
+        logger.warning("Unable to verify consistency of builder '%s'." % builder.host)
+        return False
+
+
+def check_builders():
+    """
+    Checks consistency of builders that have free slots. As this requires HTTP
+    requests to the builders, it is done before builders are locked.
+
+    :return: A dictionary mapping builder identifiers to their consistency
+    """
+
+    if not models.BuildResult.objects.filter(status=models.BuildResult.PENDING).exists():
+        return {}
+
+    running = collections.Counter(models.BuildResult.objects.filter(
+        status=models.BuildResult.BUILDING,
+    ).values_list('builder_id', flat=True))
+
+    consistent = {}
+    for builder in models.Builder.objects.select_related('version'):
+        if builder.slots > running[builder.pk]:
+            consistent[builder.pk] = is_consistent(builder)
+
+    return consistent
+
+
+def schedule():
+    """
+    Assigns pending build results to free builder slots and dispatches
+    them for building. Builds may be assigned to any consistent builder
+    with the same platform, architecture and version as the one that was
+    selected when the build was requested. While a build is running, any
+    pending identical builds are held back, so that they are served from
+    the build cache once it completes.
+
+    :return: A list of dispatched build result UUIDs
+    """
+
+    from .cgm import tasks
+
+    consistent = check_builders()
+    if not any(consistent.values()):
+        return []
+
+    dispatched = []
+    with transaction.atomic():
+        # Lock builders, so that concurrent schedulers cannot assign the same slots.
+        builders = list(models.Builder.objects.select_for_update().order_by('pk'))
+
+        free_slots = {}
+        for builder in builders:
+            free_slots[builder.pk] = range(builder.slots)
+
+        running = collections.Counter()
+        building = set()
+        for result in models.BuildResult.objects.filter(
+            status=models.BuildResult.BUILDING,
+        ):
+            running[result.user_id] += 1
+            building.add(result.build_key)
+            if result.slot in free_slots.get(result.builder_id, []):
+                free_slots[result.builder_id].remove(result.slot)
+
+        if not any(free_slots.values()):
+            return dispatched
+
+        builder_channels = collections.defaultdict(set)
+        for builder_id, channel_id in models.BuildChannel.builders.through.objects.values_list('builder_id', 'buildchannel_id'):
+            builder_channels[builder_id].add(channel_id)
+
+        pending = models.BuildResult.objects.filter(
+            status=models.BuildResult.PENDING,
+        ).select_related('builder').order_by('created')
+
+        for result in order_fairly(pending, running):
+            if result.build_key in building:
+                continue
+
+            # Prefer the requested builder, as its build cache is likely to be warm, and
+            # then builders with the most free slots. Builders that have not been checked
+            # are skipped until the next run.
+            candidates = sorted([
+                builder for builder in builders
+                if free_slots[builder.pk] and consistent.get(builder.pk, False) and is_equivalent(builder, result.builder, result.build_channel_id, builder_channels)
+            ], key=lambda builder: (builder.pk != result.builder_id, -len(free_slots[builder.pk])))
+
+            if not candidates:
+                continue
+
+            builder = candidates[0]
+            result.builder = builder
+            result.slot = free_slots[builder.pk].pop(0)
+            result.status = models.BuildResult.BUILDING
+            result.started = timezone.now()
+            result.save()
+            building.add(result.build_key)
+            dispatched.append(result.uuid)
+
+            if not any(free_slots.values()):
+                break
+
+    # Tasks are only dispatched after the transaction has been committed, so that the
+    # workers see the updated build results.
+    for result_uuid in dispatched:
+        tasks.background_build.delay(result_uuid)
+
+    return dispatched
+
+
+def expire():
+    """
+    Marks builds that have been running for longer than `BUILD_TIMEOUT` as
+    failed, so that their slots are released.
+
+    :return: A list of expired build results
+    """
+
+    from .cgm import signals
+    from . import events
+
+    deadline = timezone.now() - datetime.timedelta(seconds=BUILD_TIMEOUT)
+    expired = list(models.BuildResult.objects.filter(
+        django_models.Q(started__lt=deadline) | django_models.Q(started__isnull=True, last_modified__lt=deadline),
+        status=models.BuildResult.BUILDING,
+    ))
+
+    for result in expired:
+        error_message = 'ERROR: Build has timed out.'
+        if result.build_log:
+            result.build_log += '\n' + error_message
+        else:
+            result.build_log = error_message
+        result.status = models.BuildResult.FAILED
+        result.save()
+
+        # Dispatch error signal
+        signals.fail_firmware_build.send(sender=None, result=result)
+        # Dispatch the result failed event
+        events.BuildResultFailed(result).post()
+
+    return expired
+
+
+def get_queue_statistics():
+    """
+    Returns build queue depth and waiting times for each group of equivalent
+    builders.
+
+    :return: A list of dictionaries with platform, architecture, version,
+      slots, building, pending, average_wait (of builds started recently) and
+      longest_wait (of pending builds) keys, where waiting times are in seconds
+    """
+
+    now = timezone.now()
+    groups = collections.OrderedDict()
+
+    def get_group(builder):
+        key = (builder.platform, builder.architecture, builder.version.name)
+        if key not in groups:
+            groups[key] = {
+                'platform': key[0],
+                'architecture': key[1],
+                'version': key[2],
+                'slots': 0,
+                'building': 0,
+                'pending': 0,
+                'waits': [],
+                'longest_wait': 0,
+            }
+        return groups[key]
+
+    for builder in models.Builder.objects.select_related('version').order_by('platform', 'architecture', 'version__name'):
+        get_group(builder)['slots'] += builder.slots
+
+    for result in models.BuildResult.objects.filter(
+        status=models.BuildResult.PENDING,
+    ).select_related('builder__version'):
+        group = get_group(result.builder)
+        group['pending'] += 1
+        group['longest_wait'] = max(group['longest_wait'], (now - result.created).total_seconds())
+
+    for result in models.BuildResult.objects.filter(
+        started__gte=now - datetime.timedelta(seconds=WAIT_STATISTICS_PERIOD),
+    ).select_related('builder__version'):
+        group = get_group(result.builder)
+        group['waits'].append((result.started - result.created).total_seconds())
+        if result.status == models.BuildResult.BUILDING:
+            group['building'] += 1
+
+    for result in models.BuildResult.objects.filter(
+        django_models.Q(started__lt=now - datetime.timedelta(seconds=WAIT_STATISTICS_PERIOD)) | django_models.Q(started__isnull=True),
+        status=models.BuildResult.BUILDING,
+    ).select_related('builder__version'):
+        get_group(result.builder)['building'] += 1
+
+    for group in groups.values():
+        waits = group.pop('waits')
+        group['average_wait'] = sum(waits) / len(waits) if waits else None
+
+    return groups.values()
@@ -4,13 +4,17 @@ from django.utils import timezone
 
 from nodewatcher import celery
 
-from . import models
+from . import models, scheduler
 
 # Register the periodic schedule.
 celery.app.conf.CELERYBEAT_SCHEDULE['nodewatcher.core.generator.tasks.cleanup'] = {
     'task': 'nodewatcher.core.generator.tasks.cleanup',
     'schedule': datetime.timedelta(minutes=30),
 }
+celery.app.conf.CELERYBEAT_SCHEDULE['nodewatcher.core.generator.tasks.schedule_builds'] = {
+    'task': 'nodewatcher.core.generator.tasks.schedule_builds',
+    'schedule': datetime.timedelta(minutes=1),
+}
 
 
 @celery.app.task(queue='monitor', bind=True)
@@ -22,3 +26,14 @@ def cleanup(self):
     models.BuildResult.objects.filter(
         last_modified__lt=timezone.now() - datetime.timedelta(days=30)
     ).delete()
+
+
+@celery.app.task(queue='generator', bind=True)
+def schedule_builds(self):
+    """
+    Fails builds that have timed out and dispatches pending builds to free
+    builder slots.
+    """
+
+    scheduler.expire()
+    scheduler.schedule()
@@ -1,10 +1,16 @@
 import uuid
 
+from django import dispatch
 from django.db import models
+from django.db.models import signals as django_signals
 from django.utils.translation import ugettext_lazy as _
 
 from . import validators as core_validators
 from .registry import fields as registry_fields, registration
+from ..utils import generations
+
+# Generation scope of configuration of a single node.
+NODE_CONFIG_SCOPE = 'config.%s'
 
 
 class Node(models.Model):
@@ -108,3 +114,23 @@ class StaticIpRouterIdConfig(RouterIdConfig):
         super(StaticIpRouterIdConfig, self).save(*args, **kwargs)
 
 registration.point('node.config').register_item(StaticIpRouterIdConfig)
+
+
+@dispatch.receiver(django_signals.post_save)
+@dispatch.receiver(django_signals.post_delete)
+def node_config_changed(sender, instance, raw=False, **kwargs):
+    """
+    Change the configuration generation whenever nodes or their configuration change.
+    Each node also has its own configuration generation, so that changes of other
+    nodes can be told apart.
+    """
+
+    if raw:
+        return
+
+    if isinstance(instance, Node):
+        generations.bump('config')
+        generations.bump(NODE_CONFIG_SCOPE % instance.pk)
+    elif isinstance(instance, registration.bases.NodeConfigRegistryItem):
+        generations.bump('config')
+        generations.bump(NODE_CONFIG_SCOPE % instance.root_id)
@@ -8,8 +8,10 @@ from django import db
 from django.db import connection, transaction
 
 from . import processors as monitor_processors, exceptions
+from ...utils import generations
 from .config import config as monitor_config
 from .. import models as core_models
+from ..events import bus as events_bus, pool as events_pool
 
 # Logger instance
 logger = logging.getLogger('monitor.worker')
@@ -24,9 +26,21 @@ def stage_worker(args):
     context = copy.deepcopy(context)
     context.merge_with(node_context)
     node = core_models.Node.objects.get(pk=node_pk)
+    # Events are delivered in a batch after all processors for the node have finished.
+    with events_pool.scope([node]), events_bus.batch():
+        run_processors(context, node, processors)
+
+
+def run_processors(context, node, processors):
+    """
+    Runs a list of (node) processors and their cleanup functions on a given
+    node.
+    """
+
     cleanup_queue = []
     try:
         for p in processors:
+            events_marker = events_bus.mark()
             try:
                 abort_requested = False
                 with transaction.atomic():
@@ -48,14 +62,18 @@ def stage_worker(args):
             except:
                 logger.error("Processor for node '%s' has failed with exception:" % node.pk)
                 logger.error(traceback.format_exc())
+                # Events posted by the processor have been rolled back together with its transaction.
+                events_bus.discard(events_marker)
                 break
     finally:
         # Invoke all cleanup functions in reverse order
         for processor in cleanup_queue[::-1]:
+            events_marker = events_bus.mark()
             try:
                 with transaction.atomic():
                     processor.cleanup(context, node)
             except:
+                events_bus.discard(events_marker)
                 logger.warning("Processor cleanup method for node '%s' has failed with exception:" % node.pk)
                 logger.warning(traceback.format_exc())
 
@@ -173,6 +191,9 @@ class MonitorRun(object):
                 logger.info("Stopping worker processes...")
                 self.workers.terminate()
 
+        # Invalidate data derived from monitoring results of previous cycles.
+        generations.bump('monitoring')
+
         logger.info("All done.")
 
     def start(self):
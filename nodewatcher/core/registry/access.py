@@ -1,3 +1,4 @@
+import contextlib
 
 
 class RegistryResolver(object):
@@ -23,6 +24,28 @@ class RegistryResolver(object):
         Resolves the registry hierarchy.
         """
 
+        # Record the lookup when access to the registry is being tracked
+        registry_tracker = getattr(self._root, '_registry_tracker', None)
+        if registry_tracker is not None:
+            registry_tracker.add(registry_id)
+
+        # Lookups without side effects may be served from the cache
+        registry_cache = getattr(self._root, '_registry_cache', None)
+        if registry_cache is not None and create is None and default is None and not kwargs:
+            key = (self._regpoint.name, registry_id, queryset, onlyclass)
+            try:
+                return registry_cache[key]
+            except KeyError:
+                registry_cache[key] = self._resolve(registry_id, queryset, onlyclass, create, default, **kwargs)
+                return registry_cache[key]
+
+        return self._resolve(registry_id, queryset, onlyclass, create, default, **kwargs)
+
+    def _resolve(self, registry_id, queryset, onlyclass, create, default, **kwargs):
+        """
+        Resolves the registry hierarchy without caching.
+        """
+
         # Determine which class the root is using for configuration
         cfg, top_level = self._regpoint.get_top_level_queryset(self._root, registry_id)
 
@@ -93,3 +116,49 @@ class RegistryAccessor(object):
 
     def __get__(self, instance, owner):
         return RegistryResolver(self.regpoint, instance)
+
+
+@contextlib.contextmanager
+def cache(root):
+    """
+    Caches registry lookups on the given root for the duration of the
+    block, so that repeated lookups of the same registry items do not
+    query the database. Lookups that create items are never cached. The
+    cached items must not be modified while the cache is active.
+
+    :param root: Root model instance
+    """
+
+    if getattr(root, '_registry_cache', None) is not None:
+        # Already cached by an outer block.
+        yield
+        return
+
+    root._registry_cache = {}
+    try:
+        yield
+    finally:
+        del root._registry_cache
+
+
+@contextlib.contextmanager
+def track(root):
+    """
+    Records identifiers of all registry items that are looked up on the
+    given root for the duration of the block.
+
+    :param root: Root model instance
+    :return: A set, which receives the accessed registry identifiers
+    """
+
+    previous = getattr(root, '_registry_tracker', None)
+    accessed = set()
+    root._registry_tracker = accessed
+    try:
+        yield accessed
+    finally:
+        if previous is not None:
+            previous.update(accessed)
+            root._registry_tracker = previous
+        else:
+            del root._registry_tracker
@@ -48,6 +48,8 @@ class LazyChoiceList(collections.Sequence):
         super(LazyChoiceList, self).__init__()
         self._list = nw_datastructures.OrderedSet()
         self._dependent_choices = nw_datastructures.OrderedSet()
+        # Choices indexed by name.
+        self._names = {}
         self._returns_field_tuples = False
 
     def field_tuples(self):
@@ -56,6 +58,7 @@ class LazyChoiceList(collections.Sequence):
         lazy_choices = LazyChoiceList()
         lazy_choices._list = self._list
         lazy_choices._dependent_choices = self._dependent_choices
+        lazy_choices._names = self._names
         lazy_choices._returns_field_tuples = True
         return lazy_choices
 
@@ -75,11 +78,7 @@ class LazyChoiceList(collections.Sequence):
         :return: An instance of `Choice`
         """
 
-        for choice in self._list:
-            if choice.name == choice_name:
-                return choice
-
-        raise KeyError(choice_name)
+        return self._names[choice_name]
 
     def __len__(self):
         return len(self._list)
@@ -97,15 +96,25 @@ class LazyChoiceList(collections.Sequence):
         return True
 
     def subset_choices(self, condition):
-        return [
-            (choice if not self._returns_field_tuples else choice.get_field_tuple())
-            for limited_to, choice in self._dependent_choices
-            if limited_to is None or condition(*limited_to)
-        ]
+        # Many choices share the same limitation (for example all ports of a device), so
+        # the condition is only evaluated once for each distinct limitation.
+        matches = {}
+        subset = []
+        for limited_to, choice in self._dependent_choices:
+            if limited_to is not None:
+                if limited_to not in matches:
+                    matches[limited_to] = condition(*limited_to)
+                if not matches[limited_to]:
+                    continue
+
+            subset.append(choice if not self._returns_field_tuples else choice.get_field_tuple())
+
+        return subset
 
     def add_choice(self, choice):
         self._dependent_choices.add((choice.limited_to, choice))
         self._list.add(choice)
+        self._names.setdefault(choice.name, choice)
 
     def remove_choice(self, choice_name):
         for limited_to, choice in self._dependent_choices:
@@ -118,6 +127,13 @@ class LazyChoiceList(collections.Sequence):
                 self._list.discard(choice)
                 break
 
+        # Another choice with the same name may remain.
+        self._names.pop(choice_name, None)
+        for choice in self._list:
+            if choice.name == choice_name:
+                self._names[choice_name] = choice
+                break
+
 
 class RegistrationPoint(object):
     """
@@ -367,7 +383,24 @@ class RegistrationPoint(object):
         except KeyError:
             raise exceptions.RegistryItemNotRegistered("Registry item with id '%s' is not registered!" % registry_id)
 
-        return getattr(root, '{0}_{1}_{2}'.format(self.namespace, top_level._meta.app_label, top_level._meta.model_name)), top_level
+        return getattr(root, self._get_top_level_relation(top_level)), top_level
+
+    def _get_top_level_relation(self, top_level):
+        """
+        Returns the name of the root model relation for a top-level class.
+
+        :param top_level: Top-level registry item class
+        """
+
+        return '{0}_{1}_{2}'.format(self.namespace, top_level._meta.app_label, top_level._meta.model_name)
+
+    def get_top_level_relations(self):
+        """
+        Returns the names of all root model relations that hold top-level items,
+        for example to prefetch them for many roots at once.
+        """
+
+        return sorted(set([self._get_top_level_relation(classes[0]) for classes in self.item_registry.values()]))
 
     def get_top_level_class(self, registry_id):
         """
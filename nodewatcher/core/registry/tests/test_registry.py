@@ -7,7 +7,7 @@ from django.core import management, exceptions as django_exceptions
 from django.db.models import query
 from django.test import utils
 
-from nodewatcher.core.registry import registration, exceptions
+from nodewatcher.core.registry import access, registration, exceptions
 
 CUSTOM_SETTINGS = {
     'DEBUG': True,
@@ -240,3 +240,66 @@ class RegistryTestCase(django_test.TransactionTestCase):
             self.assertEqual(thing.f1.interesting, 'nope')
             self.assertEqual(thing.f1.level, None)
             self.assertEqual(thing.f1.test, None)
+
+    def test_prefetch_top_level(self):
+        from .registry_tests import models
+
+        for i in xrange(10):
+            thing = models.Thing(foo='hello', bar=i)
+            thing.save()
+
+            simple = thing.first.foo.simple(create=models.SimpleRegistryItem)
+            simple.interesting = 'foo%d' % i
+            simple.save()
+
+        qs = models.Thing.objects.prefetch_related(*registration.point('thing.first').get_top_level_relations())
+        things = list(qs.order_by('bar'))
+        with self.assertNumQueries(0):
+            for i, thing in enumerate(things):
+                self.assertEqual(thing.first.foo.simple().interesting, 'foo%d' % i)
+
+    def test_lookup_cache(self):
+        from .registry_tests import models
+
+        thing = models.Thing(foo='hello', bar=1)
+        thing.save()
+
+        simple = thing.first.foo.simple(create=models.SimpleRegistryItem)
+        simple.interesting = 'foo'
+        simple.save()
+
+        with access.cache(thing):
+            self.assertEqual(thing.first.foo.simple().interesting, 'foo')
+            with self.assertNumQueries(0):
+                self.assertEqual(thing.first.foo.simple().interesting, 'foo')
+
+        with self.assertNumQueries(1):
+            thing.first.foo.simple()
+
+    def test_dependent_choices(self):
+        choices = registration.LazyChoiceList()
+        choices.add_choice(registration.Choice('any', "Any"))
+        for device in ('a', 'b'):
+            for port in ('lan0', 'wan0'):
+                choices.add_choice(registration.Choice(port, port.upper(), limited_to=('general#router', device)))
+
+        self.assertEqual(choices.resolve('lan0').limited_to, ('general#router', 'a'))
+        self.assertRaises(KeyError, choices.resolve, 'lan1')
+
+        conditions = []
+
+        def condition(registry_id, value):
+            conditions.append(value)
+            return value == 'b'
+
+        subset = choices.subset_choices(condition)
+        self.assertEqual([(choice.name, choice.limited_to) for choice in subset], [
+            ('any', None),
+            ('lan0', ('general#router', 'b')),
+            ('wan0', ('general#router', 'b')),
+        ])
+        self.assertEqual(sorted(conditions), ['a', 'b'])
+
+        choices.remove_choice('lan0')
+        self.assertEqual(choices.resolve('lan0').limited_to, ('general#router', 'b'))
+        self.assertEqual(choices.field_tuples().resolve('wan0').name, 'wan0')
@@ -8,6 +8,7 @@ from nodewatcher.modules.frontend.statistics import resources
 class NodesByProjectResource(resources.StatisticsResource):
     name = 'nodes_by_project'
     description = _("Node distribution among different projects.")
+    triggers = ('config',)
 
     def get_statistics(self):
         return core_models.Node.objects.regpoint('config').registry_fields(
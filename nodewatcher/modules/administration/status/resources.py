@@ -9,6 +9,7 @@ from nodewatcher.modules.frontend.statistics import resources
 class NodesByStatusResource(resources.StatisticsResource):
     name = 'nodes_by_status'
     description = _("Distribution of node statuses.")
+    triggers = ('monitoring',)
 
     def get_header(self):
         return {
@@ -25,3 +25,5 @@ class UserAuthenticationKeyResource(api.BaseResource):
         global_filter = ('name', 'fingerprint', 'created')
         authentication = api_authentication.SessionAuthentication()
         authorization = UserAuthenticationKeyAuthorization()
+        # Changes of keys are not tracked by any generation.
+        cache_generations = None
@@ -1,93 +1,417 @@
-from django.db import transaction
+import collections
+import datetime
+import hashlib
+import json
+import logging
 
-from nodewatcher.core.events import base, pool, declarative
+from django.conf import settings
+from django.core.serializers import json as serializers_json
+from django import db
+from django.db import models as db_models, transaction
+from django.db.models import functions as db_functions
+from django.utils import timezone
+
+from nodewatcher.core import models as core_models
+from nodewatcher.core.events import base, coalescing, pool, declarative
+from nodewatcher.utils import generations
 
 from . import models
 
+# Interval after which the last seen timestamp of an unchanged warning is updated.
+WARNING_REFRESH_INTERVAL = getattr(settings, 'EVENTS_WARNING_REFRESH_INTERVAL', datetime.timedelta(hours=1))
+
+logger = logging.getLogger(__name__)
+
+
+def allocate_ids(model, count):
+    """
+    Reserves primary keys from the model's PostgreSQL sequence, so that
+    related rows may be created in bulk together with the model instances.
+
+    :param model: Model class with an automatic primary key
+    :param count: Number of primary keys to reserve
+    :return: A list of primary keys
+    """
+
+    with db.connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+            [model._meta.db_table, model._meta.pk.column, count]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def get_unique_pks(objects):
+    """
+    Returns unique primary keys of the given model instances (or primary
+    keys), preserving their order.
+
+    :param objects: A list of model instances or primary keys
+    """
+
+    pks = []
+    for obj in objects or []:
+        pk = getattr(obj, 'pk', obj)
+        if pk not in pks:
+            pks.append(pk)
+
+    return pks
+
 
 class DatabaseEventSink(base.EventSink):
     """
     An event sink that stores events into the database.
     """
 
+    def serialize(self, event, names):
+        """
+        Returns an unsaved serialized event.
+
+        :param event: Event record
+        :param names: Node names, indexed by node primary key
+        """
+
+        mdl = models.SerializedNodeEvent()
+        mdl.timestamp = event.timestamp
+        mdl.severity = event.severity
+        mdl.source_name = event.source_name
+        mdl.source_type = event.source_type
+
+        # Denormalize related nodes and users for listing events.
+        mdl.related_nodes_summary = [
+            {'uuid': str(node_pk), 'name': names.get(node_pk, None)}
+            for node_pk in get_unique_pks(event.related_nodes)
+        ]
+        mdl.related_node_names = ' '.join([node['name'] for node in mdl.related_nodes_summary if node['name']])
+        mdl.public = not get_unique_pks(event.related_users)
+
+        # Remove fields that are already in the database
+        record = event.record.copy()
+        del record['timestamp']
+        del record['severity']
+        del record['source_name']
+        del record['source_type']
+        del record['related_nodes']
+        del record['related_users']
+        # Coalesced events carry the number of occurrences.
+        mdl.count = record.pop('count', 1)
+        mdl.first_timestamp = record.pop('first_timestamp', None)
+        mdl.record = record
+
+        return mdl
+
+    def suppress_storms(self, events):
+        """
+        Drops events of nodes that already have as many stored events within the
+        storm window as allowed by the storm rate. The rate is measured on stored
+        events, so storms are tracked across processes and monitoring runs.
+
+        :param events: A list of event records
+        :return: A list of event records that should be stored
+        """
+
+        rate = coalescing.get_storm_rate()
+        if not rate:
+            return events
+
+        node_through = models.SerializedNodeEvent.related_nodes.through
+        rates = collections.Counter(dict(node_through.objects.filter(
+            node__in=set([node_pk for event in events for node_pk in get_unique_pks(event.related_nodes)]),
+            serializednodeevent__timestamp__gte=timezone.now() - datetime.timedelta(seconds=coalescing.get_storm_window()),
+        ).values_list('node').annotate(count=db_models.Count('pk'))))
+
+        allowed = []
+        suppressed = collections.Counter()
+        for event in events:
+            node_pks = get_unique_pks(event.related_nodes)
+            if any([rates[node_pk] >= rate for node_pk in node_pks]):
+                suppressed.update(node_pks)
+                continue
+
+            rates.update(node_pks)
+            allowed.append(event)
+
+        for node_pk, count in suppressed.items():
+            logger.warning("Event storm of node '%s', %d events were suppressed." % (node_pk, count))
+
+        return allowed
+
+    def coalesce(self, serialized, events):
+        """
+        Coalesces serialized events with repeats of the same event that first
+        occurred within the coalescing window. Stored repeats are updated with
+        the number of occurrences and the timestamp of the last one, while
+        repeats within the batch are merged before they are stored.
+
+        :param serialized: A list of unsaved serialized events
+        :param events: A list of corresponding event records
+        :return: A tuple (serialized, events) of events that should be stored
+        """
+
+        window = coalescing.get_coalesce_window()
+        if not window:
+            return serialized, events
+
+        window = datetime.timedelta(seconds=window)
+        for mdl, event in zip(serialized, events):
+            mdl.coalesce_key = coalescing.get_key(event)
+
+        # Stored repeats, indexed by coalescing key.
+        stored = {}
+        keys = set([mdl.coalesce_key for mdl in serialized if mdl.coalesce_key is not None])
+        if keys:
+            since = min([mdl.timestamp for mdl in serialized]) - window
+            for pk, key, timestamp, first_timestamp in models.SerializedNodeEvent.objects.filter(
+                db_models.Q(first_timestamp__gte=since) | db_models.Q(first_timestamp__isnull=True, timestamp__gte=since),
+                coalesce_key__in=keys,
+            ).order_by('timestamp').values_list('pk', 'coalesce_key', 'timestamp', 'first_timestamp'):
+                stored[key] = (pk, first_timestamp or timestamp)
+
+        # Updates of stored repeats, indexed by primary key.
+        updates = {}
+        # Repeats within the batch, indexed by coalescing key.
+        pending = {}
+        result = ([], [])
+        for mdl, event in zip(serialized, events):
+            key = mdl.coalesce_key
+            if key is not None:
+                repeat = pending.get(key, None)
+                if repeat is not None and mdl.timestamp - (repeat.first_timestamp or repeat.timestamp) < window:
+                    repeat.first_timestamp = repeat.first_timestamp or repeat.timestamp
+                    repeat.timestamp = mdl.timestamp
+                    repeat.count += mdl.count
+                    continue
+
+                if key in stored and mdl.timestamp - stored[key][1] < window:
+                    count = updates.get(stored[key][0], (0, None))[0]
+                    updates[stored[key][0]] = (count + mdl.count, mdl.timestamp)
+                    continue
+
+                pending[key] = mdl
+
+            result[0].append(mdl)
+            result[1].append(event)
+
+        for pk, (count, timestamp) in updates.items():
+            models.SerializedNodeEvent.objects.filter(pk=pk).update(
+                count=db_models.F('count') + count,
+                first_timestamp=db_functions.Coalesce('first_timestamp', 'timestamp'),
+                timestamp=timestamp,
+            )
+
+        return result
+
     def deliver(self, event):
         """
         Persists the received event into the database.
         """
 
-        if not isinstance(event, declarative.NodeEventRecord):
-            return
-        elif isinstance(event, declarative.NodeWarningRecord):
+        self.deliver_batch([event])
+
+    def deliver_batch(self, events):
+        """
+        Persists a batch of events into the database. Events and their relations
+        are created in bulk. Repeated events are coalesced with stored ones and
+        events of nodes causing event storms are suppressed, when enabled.
+        """
+
+        events = self.suppress_storms([
+            event for event in events
+            if isinstance(event, declarative.NodeEventRecord) and not isinstance(event, declarative.NodeWarningRecord)
+        ])
+        if not events:
             return
 
+        node_through = models.SerializedNodeEvent.related_nodes.through
+        user_through = models.SerializedNodeEvent.related_users.through
+
+        names = dict(core_models.GeneralConfig.objects.filter(
+            root__in=set([node_pk for event in events for node_pk in get_unique_pks(event.related_nodes)]),
+        ).values_list('root_id', 'name'))
+
         with transaction.atomic():
-            mdl = models.SerializedNodeEvent()
-            mdl.timestamp = event.timestamp
-            mdl.severity = event.severity
-            mdl.source_name = event.source_name
-            mdl.source_type = event.source_type
-
-            # Remove fields that are already in the database
-            record = event.record.copy()
-            del record['timestamp']
-            del record['severity']
-            del record['source_name']
-            del record['source_type']
-            del record['related_nodes']
-            del record['related_users']
-            mdl.record = record
+            serialized, events = self.coalesce([self.serialize(event, names) for event in events], events)
+            for mdl, pk in zip(serialized, allocate_ids(models.SerializedNodeEvent, len(serialized))):
+                mdl.pk = pk
+            models.SerializedNodeEvent.objects.bulk_create(serialized)
 
-            mdl.save()
             # Add related nodes
-            mdl.related_nodes.add(*event.related_nodes)
+            node_through.objects.bulk_create([
+                node_through(serializednodeevent_id=mdl.pk, node_id=node_pk)
+                for mdl, event in zip(serialized, events)
+                for node_pk in get_unique_pks(event.related_nodes)
+            ])
             # Add related users
-            if event.related_users is not None:
-                mdl.related_users.add(*event.related_users)
+            user_through.objects.bulk_create([
+                user_through(serializednodeevent_id=mdl.pk, user_id=user_pk)
+                for mdl, event in zip(serialized, events)
+                for user_pk in get_unique_pks(event.related_users)
+            ])
+
+        generations.bump('events')
 
 pool.register_sink(DatabaseEventSink)
 
 
+class WarningState(object):
+    """
+    Active warnings related to a set of nodes, as stored in the database. It
+    is loaded once when entering an event scope, so that posting warnings
+    that have not changed does not require any queries.
+    """
+
+    def __init__(self, nodes):
+        """
+        Class constructor.
+
+        :param nodes: A list of nodes
+        """
+
+        self.nodes = set([node.pk for node in nodes])
+        # Content hashes and last seen timestamps of active warnings, indexed by primary key.
+        self.warnings = {}
+
+        queryset = models.SerializedNodeWarning.objects.filter(
+            related_nodes__in=self.nodes,
+        ).values_list('pk', 'content_hash', 'last_seen').distinct()
+
+        for pk, content_hash, last_seen in queryset:
+            self.warnings[pk] = (content_hash, last_seen)
+
+    def covers(self, event):
+        """
+        Returns true if the state contains all warnings that may be related
+        to the given event.
+
+        :param event: Warning record
+        """
+
+        return bool(event.related_nodes) and all([node.pk in self.nodes for node in event.related_nodes])
+
+    def is_current(self, pk, content_hash):
+        """
+        Returns true if the given warning is active with the same content and
+        it has been seen recently enough.
+
+        :param pk: Warning primary key
+        :param content_hash: Content hash of the warning record
+        """
+
+        try:
+            stored_hash, last_seen = self.warnings[pk]
+        except KeyError:
+            return False
+
+        return stored_hash == content_hash and timezone.now() - last_seen < WARNING_REFRESH_INTERVAL
+
+
+def get_content_hash(record):
+    """
+    Returns a hash of the warning record content.
+
+    :param record: Record dictionary
+    """
+
+    return hashlib.sha1(json.dumps(record, sort_keys=True, cls=serializers_json.DjangoJSONEncoder)).hexdigest()
+
+
 class DatabaseWarningSink(base.EventSink):
     """
     An event sink that stores warnings into the database.
     """
 
+    def __init__(self, **kwargs):
+        """
+        Class constructor.
+        """
+
+        super(DatabaseWarningSink, self).__init__(**kwargs)
+        self._states = []
+
+    def enter_scope(self, nodes):
+        """
+        Loads active warnings of the given nodes.
+        """
+
+        self._states.append(WarningState(nodes))
+
+    def exit_scope(self, nodes):
+        """
+        Discards active warnings of the given nodes.
+        """
+
+        self._states.pop()
+
+    def get_state(self, event):
+        """
+        Returns the warning state that covers the given event or None if no
+        such state has been loaded.
+
+        :param event: Warning record
+        """
+
+        for state in self._states[::-1]:
+            if state.covers(event):
+                return state
+
+        return None
+
     def deliver(self, event):
         """
-        Persists the received warning into the database.
+        Persists the received warning into the database. Only changes in
+        warning state are written when the state has been loaded.
         """
 
         if not isinstance(event, declarative.NodeWarningRecord):
             return
 
-        with transaction.atomic():
-            if event.is_absent():
+        pk = event.get_primary_key()
+        state = self.get_state(event)
+
+        if event.is_absent():
+            if state is not None and pk not in state.warnings:
+                return
+
+            with transaction.atomic():
                 # This is actually a complementary event, signalling the absence of a warning.
-                models.SerializedNodeWarning.objects.filter(pk=event.get_primary_key()).delete()
-            else:
-                mdl, created = models.SerializedNodeWarning.objects.get_or_create(
-                    pk=event.get_primary_key(),
-                    defaults={
-                        'severity': event.severity,
-                        'source_name': event.source_name,
-                        'source_type': event.source_type,
-                    }
-                )
-
-                if created:
-                    # Add related nodes.
-                    mdl.related_nodes.add(*event.related_nodes)
-
-                # Remove fields that are already in the database.
-                record = event.record.copy()
-                del record['timestamp']
-                del record['severity']
-                del record['source_name']
-                del record['source_type']
-                del record['related_nodes']
-                del record['related_users']
-                mdl.record = record
-
-                mdl.save()
+                models.SerializedNodeWarning.objects.filter(pk=pk).delete()
+
+            if state is not None:
+                del state.warnings[pk]
+            return
+
+        # Remove fields that are already in the database.
+        record = event.record.copy()
+        del record['timestamp']
+        del record['severity']
+        del record['source_name']
+        del record['source_type']
+        del record['related_nodes']
+        del record['related_users']
+        content_hash = get_content_hash(record)
+
+        if state is not None and state.is_current(pk, content_hash):
+            return
+
+        with transaction.atomic():
+            mdl, created = models.SerializedNodeWarning.objects.get_or_create(
+                pk=pk,
+                defaults={
+                    'severity': event.severity,
+                    'source_name': event.source_name,
+                    'source_type': event.source_type,
+                }
+            )
+
+            if created:
+                # Add related nodes.
+                mdl.related_nodes.add(*event.related_nodes)
+
+            mdl.record = record
+            mdl.content_hash = content_hash
+            mdl.save()
+
+        if state is not None:
+            state.warnings[pk] = (content_hash, mdl.last_seen)
 
 pool.register_sink(DatabaseWarningSink)
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events_sinks_database', '0002_serializednodewarning_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='serializednodeevent',
+            name='count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='serializednodeevent',
+            name='first_timestamp',
+            field=models.DateTimeField(null=True, blank=True),
+        ),
+    ]
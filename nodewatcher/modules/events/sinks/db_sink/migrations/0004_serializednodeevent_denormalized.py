@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import collections
+
+from django.db import models, migrations
+import json_field.fields
+
+# Number of events denormalized in a single batch.
+BATCH_SIZE = 5000
+
+
+def denormalize_events(apps, schema_editor):
+    SerializedNodeEvent = apps.get_model('events_sinks_database', 'SerializedNodeEvent')
+    GeneralConfig = apps.get_model('core', 'GeneralConfig')
+    node_through = SerializedNodeEvent.related_nodes.through
+    user_through = SerializedNodeEvent.related_users.through
+
+    # Events with related users are not public.
+    SerializedNodeEvent.objects.filter(
+        pk__in=user_through.objects.values('serializednodeevent'),
+    ).update(public=False)
+
+    # Events without related nodes keep the default summary.
+    summary_field = SerializedNodeEvent._meta.get_field('related_nodes_summary')
+    names_field = SerializedNodeEvent._meta.get_field('related_node_names')
+    query = 'UPDATE %s SET %s = %%s, %s = %%s WHERE %s = %%s' % tuple([
+        schema_editor.quote_name(name) for name in (
+            SerializedNodeEvent._meta.db_table,
+            summary_field.column,
+            names_field.column,
+            SerializedNodeEvent._meta.pk.column,
+        )
+    ])
+
+    names = dict(GeneralConfig.objects.values_list('root_id', 'name'))
+    last_pk = None
+    while True:
+        relations = node_through.objects.all()
+        if last_pk is not None:
+            relations = relations.filter(serializednodeevent__gt=last_pk)
+        pks = list(relations.order_by('serializednodeevent').values_list('serializednodeevent', flat=True).distinct()[:BATCH_SIZE])
+        if not pks:
+            break
+        last_pk = pks[-1]
+
+        summaries = collections.OrderedDict([(pk, []) for pk in pks])
+        for event_pk, node_pk in relations.filter(serializednodeevent__lte=last_pk).order_by('pk').values_list('serializednodeevent', 'node'):
+            summaries[event_pk].append({'uuid': str(node_pk), 'name': names.get(node_pk, None)})
+
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(query, [
+                (
+                    summary_field.get_db_prep_save(summary, schema_editor.connection),
+                    ' '.join([node['name'] for node in summary if node['name']]),
+                    pk,
+                )
+                for pk, summary in summaries.items()
+            ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_auto_20151018_0956'),
+        ('events_sinks_database', '0003_serializednodeevent_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='serializednodeevent',
+            name='public',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='serializednodeevent',
+            name='related_node_names',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='serializednodeevent',
+            name='related_nodes_summary',
+            field=json_field.fields.JSONField(default='null', help_text='Enter a valid JSON object', null=True, editable=False),
+        ),
+        migrations.AlterIndexTogether(
+            name='serializednodeevent',
+            index_together=set([('timestamp', 'severity', 'source_name', 'source_type'), ('public', 'timestamp')]),
+        ),
+        migrations.RunPython(denormalize_events, migrations.RunPython.noop),
+    ]
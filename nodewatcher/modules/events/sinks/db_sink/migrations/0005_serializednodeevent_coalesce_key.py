@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events_sinks_database', '0004_serializednodeevent_denormalized'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='serializednodeevent',
+            name='coalesce_key',
+            field=models.CharField(max_length=40, null=True, editable=False, db_index=True),
+        ),
+    ]
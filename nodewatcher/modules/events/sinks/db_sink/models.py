@@ -42,8 +42,25 @@ class SerializedNodeEvent(SerializedEvent):
     """
 
     timestamp = models.DateTimeField()
+    # Number of coalesced occurrences and the timestamp of the first one.
+    count = models.PositiveIntegerField(default=1)
+    first_timestamp = models.DateTimeField(null=True, blank=True)
+    # Key identifying repeats of the event, which are coalesced with it.
+    coalesce_key = models.CharField(max_length=40, null=True, editable=False, db_index=True)
     related_nodes = models.ManyToManyField(core_models.Node, related_name='events')
     related_users = models.ManyToManyField(auth_models.User, related_name='events')
+    # Related nodes and their names at the time of the event, so that listing events
+    # does not require joins with the node registry.
+    related_nodes_summary = json_field.JSONField(null=True, editable=False)
+    related_node_names = models.TextField(default='', editable=False)
+    # Public events are not restricted to related users.
+    public = models.BooleanField(default=True, editable=False)
+
+    class Meta:
+        index_together = (
+            ('timestamp', 'severity', 'source_name', 'source_type'),
+            ('public', 'timestamp'),
+        )
 
 
 class SerializedNodeWarning(SerializedEvent):
@@ -55,3 +72,5 @@ class SerializedNodeWarning(SerializedEvent):
     first_seen = models.DateTimeField(auto_now_add=True)
     last_seen = models.DateTimeField(auto_now=True)
     related_nodes = models.ManyToManyField(core_models.Node, related_name='warnings')
+    # Hash of the record, used to skip writes when the warning has not changed.
+    content_hash = models.CharField(max_length=40, null=True, editable=False)
@@ -4,51 +4,36 @@ from tastypie import fields as tastypie_fields
 from tastypie import authorization as api_authorization
 
 from nodewatcher.core.frontend import api
-from nodewatcher.core.frontend.api import fields as api_fields
-from nodewatcher.modules.frontend.list import resources
 
 from . import models
 
 
-# We create a new node resource which has only name field available (along with resource_uri)
-class NodeResource(resources.NodeResource):
-    class Meta(resources.NodeResource.Meta):
-        fields = ('uuid', 'name')
-
-    def _build_reverse_url(self, name, args=None, kwargs=None):
-        # We fake it here and set it to the same as registered resource.
-        # It is not set because we have not registered this node resource.
-        self._meta.urlconf_namespace = resources.NodeResource._meta.urlconf_namespace
-        return super(NodeResource, self)._build_reverse_url(name, args=args, kwargs=kwargs)
-
-
-# We need a function which is also a string. Function is used in dehydrating
-# ManyToManyField, string is used in apply_sorting to create an order_by argument.
-class RelatedNodes(str):
-    def __call__(self, bundle):
-        # Add name to related nodes
-        return bundle.obj.related_nodes.regpoint('config').registry_fields(
-            name='core.general#name',
-        )
-
-
 class EventAuthorization(api_authorization.Authorization):
     def read_list(self, object_list, bundle):
         if bundle.request.user.is_authenticated():
+            related_users = models.SerializedNodeEvent.related_users.through.objects.filter(
+                user=bundle.request.user,
+            ).values('serializednodeevent')
             qs = object_list.filter(
-                django_models.Q(related_users=None) | django_models.Q(related_users=bundle.request.user)
+                django_models.Q(public=True) | django_models.Q(pk__in=related_users)
             )
         else:
-            qs = object_list.filter(related_users=None)
+            qs = object_list.filter(public=True)
 
         return qs
 
     def read_detail(self, object_list, bundle):
-        return not bundle.obj.related_users or bundle.request.user in bundle.obj.related_users
+        return bundle.obj.public or bundle.obj.related_users.filter(pk=bundle.request.user.pk).exists()
 
 
 class EventResource(api.BaseResource):
     description = tastypie_fields.CharField('description')
+    related_nodes = tastypie_fields.ListField(
+        'related_nodes_summary',
+        null=True,
+        readonly=True,
+        help_text="Nodes related to the event and their names at the time of the event.",
+    )
 
     class Meta:
         queryset = models.SerializedNodeEvent.objects.all().order_by('-timestamp')
@@ -56,10 +41,21 @@ class EventResource(api.BaseResource):
         list_allowed_methods = ('get',)
         detail_allowed_methods = ('get',)
         ordering = ('timestamp', 'related_nodes')
-        # TODO: How can we generate string from registry, without hardcoding registry relations?
         # TODO: How could we allow filtering on the description?
-        global_filter = ('timestamp', 'related_nodes__config_core_generalconfig__name')
+        global_filter = ('timestamp', 'related_node_names')
+        excludes = ('related_node_names', 'related_nodes_summary', 'public')
         authorization = EventAuthorization()
+        keyset_fields = ('timestamp', 'related_node_names', 'pk')
+        cache_generations = ('events',)
+
+    def _after_apply_sorting(self, obj_list, options, order_by_args):
+        # Related nodes are sorted by their denormalized names. Events are always sorted by primary key
+        # at the end to have a defined order, which is required for both offset and keyset pagination.
+        order_by_args = list(order_by_args or obj_list.query.order_by)
+        order_by_args = [arg.replace('related_nodes_summary', 'related_node_names') for arg in order_by_args]
+        if order_by_args and order_by_args[-1].startswith('-'):
+            order_by_args.append('-pk')
+        else:
+            order_by_args.append('pk')
 
-    # TODO: How can we generate string from registry, without hardcoding registry relations?
-    related_nodes = api_fields.ManyToManyField(to=NodeResource, attribute=RelatedNodes('related_nodes__config_core_generalconfig__name'), full=True, help_text=models.SerializedNodeEvent._meta.get_field('related_nodes').help_text)
+        return obj_list.order_by(*order_by_args)
@@ -10,6 +10,14 @@
         return t.format($.nodewatcher.theme.dateFormat);
     }
 
+    function renderDescription(data, type, row, meta) {
+        if (type !== 'display' || !(row.count > 1))
+            return data;
+
+        // TODO: Make strings translatable
+        return data + " <em>(repeated " + row.count + " times)</em>";
+    }
+
     $(document).ready(function() {
         $('.events-list').each(function(i, table) {
             $.tastypie.newDataTable(table, $(table).data('source'), {
@@ -25,6 +33,7 @@
                         'render': $.tastypie.nodeSubdocumentName(table)
                     }, {
                         'data': 'description',
+                        'render': renderDescription,
                         'orderable': false
                     },
                     // We need extra data to render the related nodes column
@@ -0,0 +1,66 @@
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from nodewatcher import celery
+from nodewatcher.utils import generations
+
+from . import models
+
+# Number of events removed in a single transaction.
+RETENTION_BATCH_SIZE = getattr(settings, 'EVENTS_RETENTION_BATCH_SIZE', 5000)
+
+# Register the periodic schedule.
+celery.app.conf.CELERYBEAT_SCHEDULE['nodewatcher.modules.events.sinks.db_sink.tasks.apply_retention'] = {
+    'task': 'nodewatcher.modules.events.sinks.db_sink.tasks.apply_retention',
+    'schedule': datetime.timedelta(hours=1),
+}
+
+
+def expire_events(severity, before, batch_size=RETENTION_BATCH_SIZE):
+    """
+    Removes events with the given severity that are older than the given
+    time. Events are removed in batches of the oldest events, so that each
+    transaction only touches a contiguous range of the timestamp index.
+
+    :param severity: Event severity
+    :param before: Events older than this time are removed
+    :param batch_size: Number of events removed in a single transaction
+    :return: Number of removed events
+    """
+
+    removed = 0
+    while True:
+        with transaction.atomic():
+            pks = list(models.SerializedNodeEvent.objects.filter(
+                severity=severity,
+                timestamp__lt=before,
+            ).order_by('timestamp').values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                break
+
+            models.SerializedNodeEvent.objects.filter(pk__in=pks).delete()
+            removed += len(pks)
+
+    return removed
+
+
+@celery.app.task(queue='events', bind=True)
+def apply_retention(self):
+    """
+    Removes stored events according to the configured retention policy.
+    """
+
+    # Number of days for which stored events are kept, indexed by severity. Events with
+    # severities that are not listed are kept forever.
+    retention = getattr(settings, 'EVENTS_RETENTION', {})
+
+    now = timezone.now()
+    removed = 0
+    for severity, days in retention.items():
+        removed += expire_events(severity, now - datetime.timedelta(days=days))
+
+    if removed:
+        generations.bump('events')
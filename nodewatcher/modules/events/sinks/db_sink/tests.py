@@ -0,0 +1,393 @@
+import datetime
+
+from django import test as django_test
+from django.contrib.auth import models as auth_models
+from django.core import cache
+from django.db import models as django_models
+from django.utils import timezone
+
+from django_datastream import test_runner
+
+from nodewatcher.core import models as core_models
+from nodewatcher.core.events import declarative
+from nodewatcher.utils import generations
+
+from . import events, models, tasks
+
+
+class TestEvent(declarative.NodeEventRecord):
+    state = declarative.CharAttribute()
+
+    def __init__(self, nodes, state, timestamp=None, severity=declarative.NodeEventRecord.SEVERITY_INFO, users=None):
+        super(TestEvent, self).__init__(
+            nodes,
+            severity,
+            related_users=users,
+            state=state,
+        )
+
+        if timestamp is not None:
+            self.record['timestamp'] = timestamp
+
+
+class TestWarning(declarative.NodeWarningRecord):
+    name = declarative.CharAttribute(primary_key=True)
+
+    def __init__(self, node, name, state):
+        super(TestWarning, self).__init__(
+            [node],
+            declarative.NodeWarningRecord.SEVERITY_WARNING,
+            name=name,
+            state=state,
+        )
+
+
+class DatabaseEventSinkTestCase(django_test.TestCase):
+    def setUp(self):
+        self.sink = events.DatabaseEventSink()
+        self.node_a = core_models.Node()
+        self.node_a.save()
+        self.node_b = core_models.Node()
+        self.node_b.save()
+        self.timestamp = timezone.now().replace(microsecond=0)
+
+    def at(self, seconds):
+        return self.timestamp + datetime.timedelta(seconds=seconds)
+
+    def get_events(self, node):
+        return list(models.SerializedNodeEvent.objects.filter(related_nodes=node).order_by('timestamp').values_list(
+            'record', 'count', 'first_timestamp', 'timestamp'
+        ))
+
+    @django_test.override_settings(EVENTS_COALESCE_WINDOW=0, EVENTS_STORM_RATE=0)
+    def test_disabled(self):
+        self.sink.deliver_batch([TestEvent(self.node_a, 'down', self.at(0)), TestEvent(self.node_a, 'down', self.at(1))])
+        self.sink.deliver_batch([TestEvent(self.node_a, 'down', self.at(2))])
+
+        self.assertEqual([count for record, count, first, last in self.get_events(self.node_a)], [1, 1, 1])
+
+    @django_test.override_settings(EVENTS_COALESCE_WINDOW=60)
+    def test_coalesce(self):
+        self.sink.deliver_batch([TestEvent(self.node_a, 'down', self.at(0))])
+        self.assertEqual(self.get_events(self.node_a), [({'state': 'down'}, 1, None, self.at(0))])
+
+        # Stored repeats are updated with the number of occurrences and the last timestamp.
+        self.sink.deliver_batch([TestEvent(self.node_a, 'down', self.at(10))])
+        self.sink.deliver_batch([TestEvent(self.node_a, 'down', self.at(20))])
+        self.assertEqual(self.get_events(self.node_a), [({'state': 'down'}, 3, self.at(0), self.at(20))])
+
+        # Events with different content or nodes are not coalesced.
+        self.sink.deliver_batch([TestEvent(self.node_a, 'up', self.at(30))])
+        self.sink.deliver_batch([TestEvent([self.node_a, self.node_b], 'down', self.at(31))])
+        self.assertEqual(len(self.get_events(self.node_a)), 3)
+        self.assertEqual(self.get_events(self.node_b), [({'state': 'down'}, 1, None, self.at(31))])
+
+        # The window starts with the first occurrence.
+        self.sink.deliver_batch([TestEvent(self.node_a, 'down', self.at(59))])
+        self.sink.deliver_batch([TestEvent(self.node_a, 'down', self.at(60))])
+        self.assertEqual(self.get_events(self.node_a), [
+            ({'state': 'up'}, 1, None, self.at(30)),
+            ({'state': 'down'}, 1, None, self.at(31)),
+            ({'state': 'down'}, 4, self.at(0), self.at(59)),
+            ({'state': 'down'}, 1, None, self.at(60)),
+        ])
+
+    @django_test.override_settings(EVENTS_COALESCE_WINDOW=60)
+    def test_coalesce_batch(self):
+        self.sink.deliver_batch([
+            TestEvent(self.node_a, 'down', self.at(0)),
+            TestEvent(self.node_a, 'up', self.at(5)),
+            TestEvent(self.node_a, 'down', self.at(10)),
+            TestEvent(self.node_a, 'down', self.at(20)),
+            TestEvent(self.node_a, 'down', self.at(60)),
+            TestEvent(self.node_a, 'down', self.at(70)),
+        ])
+
+        self.assertEqual(self.get_events(self.node_a), [
+            ({'state': 'up'}, 1, None, self.at(5)),
+            ({'state': 'down'}, 3, self.at(0), self.at(20)),
+            ({'state': 'down'}, 2, self.at(60), self.at(70)),
+        ])
+
+        # Repeats in further batches are coalesced with the last stored event.
+        self.sink.deliver_batch([TestEvent(self.node_a, 'down', self.at(80)), TestEvent(self.node_a, 'down', self.at(90))])
+        self.assertEqual(self.get_events(self.node_a)[-1], ({'state': 'down'}, 4, self.at(60), self.at(90)))
+
+    @django_test.override_settings(EVENTS_STORM_RATE=2, EVENTS_STORM_WINDOW=300)
+    def test_storms(self):
+        self.sink.deliver_batch([
+            TestEvent(self.node_a, 'down'),
+            TestEvent(self.node_a, 'up'),
+            TestEvent(self.node_a, 'down'),
+            TestEvent(self.node_b, 'down'),
+        ])
+        self.assertEqual(len(self.get_events(self.node_a)), 2)
+        self.assertEqual(len(self.get_events(self.node_b)), 1)
+
+        # Rates are counted per node on stored events, so they are tracked across batches.
+        self.sink.deliver_batch([TestEvent(self.node_a, 'up'), TestEvent([self.node_a, self.node_b], 'up')])
+        self.sink.deliver_batch([TestEvent(self.node_b, 'up')])
+        self.assertEqual(len(self.get_events(self.node_a)), 2)
+        self.assertEqual(len(self.get_events(self.node_b)), 2)
+
+        # Events outside the storm window are not counted.
+        models.SerializedNodeEvent.objects.update(timestamp=timezone.now() - datetime.timedelta(seconds=301))
+        self.sink.deliver_batch([TestEvent(self.node_a, 'up'), TestEvent(self.node_a, 'down'), TestEvent(self.node_a, 'up')])
+        self.assertEqual(len(self.get_events(self.node_a)), 4)
+
+
+class DatabaseWarningSinkTestCase(django_test.TestCase):
+    def setUp(self):
+        self.sink = events.DatabaseWarningSink()
+        self.node = core_models.Node()
+        self.node.save()
+
+    def get_warning(self, name):
+        return models.SerializedNodeWarning.objects.get(pk=TestWarning(self.node, name, None).get_primary_key())
+
+    def test_unchanged(self):
+        self.sink.deliver(TestWarning(self.node, 'a', 'down'))
+
+        self.sink.enter_scope([self.node])
+        with self.assertNumQueries(0):
+            self.sink.deliver(TestWarning(self.node, 'a', 'down'))
+        self.sink.exit_scope([self.node])
+
+    def test_absent(self):
+        self.sink.enter_scope([self.node])
+        with self.assertNumQueries(0):
+            self.sink.deliver(~TestWarning(self.node, 'a', 'down'))
+
+        self.sink.deliver(TestWarning(self.node, 'a', 'down'))
+        self.sink.deliver(~TestWarning(self.node, 'a', 'down'))
+        self.assertFalse(models.SerializedNodeWarning.objects.exists())
+
+        # Warnings are only removed once.
+        with self.assertNumQueries(0):
+            self.sink.deliver(~TestWarning(self.node, 'a', 'down'))
+        self.sink.exit_scope([self.node])
+
+    def test_changed(self):
+        self.sink.deliver(TestWarning(self.node, 'a', 'down'))
+        self.sink.deliver(TestWarning(self.node, 'b', 'down'))
+
+        self.sink.enter_scope([self.node])
+        self.sink.deliver(TestWarning(self.node, 'a', 'up'))
+        with self.assertNumQueries(0):
+            self.sink.deliver(TestWarning(self.node, 'a', 'up'))
+            self.sink.deliver(TestWarning(self.node, 'b', 'down'))
+        self.sink.exit_scope([self.node])
+
+        self.assertEqual(self.get_warning('a').record['state'], 'up')
+        self.assertEqual(self.get_warning('b').record['state'], 'down')
+        self.assertEqual(list(self.get_warning('a').related_nodes.all()), [self.node])
+
+    def test_refresh(self):
+        self.sink.deliver(TestWarning(self.node, 'a', 'down'))
+        self.sink.deliver(TestWarning(self.node, 'b', 'down'))
+
+        # Unchanged warnings are written once they have not been seen for the refresh interval.
+        stale = timezone.now() - events.WARNING_REFRESH_INTERVAL
+        models.SerializedNodeWarning.objects.filter(pk=self.get_warning('a').pk).update(last_seen=stale)
+        recent = self.get_warning('b').last_seen
+
+        self.sink.enter_scope([self.node])
+        self.sink.deliver(TestWarning(self.node, 'a', 'down'))
+        self.sink.deliver(TestWarning(self.node, 'b', 'down'))
+        self.sink.exit_scope([self.node])
+
+        self.assertGreater(self.get_warning('a').last_seen, stale)
+        self.assertEqual(self.get_warning('b').last_seen, recent)
+
+
+class RetentionTestCase(django_test.TestCase):
+    def setUp(self):
+        self.node = core_models.Node()
+        self.node.save()
+
+        now = timezone.now()
+        events.DatabaseEventSink().deliver_batch([
+            TestEvent(self.node, str(days), now - datetime.timedelta(days=days), severity)
+            for days in xrange(10)
+            for severity in (declarative.NodeEventRecord.SEVERITY_INFO, declarative.NodeEventRecord.SEVERITY_WARNING)
+        ])
+
+    def get_ages(self, severity):
+        return sorted([int(record['state']) for record in models.SerializedNodeEvent.objects.filter(
+            severity=severity,
+        ).values_list('record', flat=True)])
+
+    def test_expire_events(self):
+        before = timezone.now() - datetime.timedelta(days=4, hours=12)
+        self.assertEqual(tasks.expire_events(declarative.NodeEventRecord.SEVERITY_INFO, before, batch_size=2), 5)
+        self.assertEqual(self.get_ages(declarative.NodeEventRecord.SEVERITY_INFO), range(5))
+        self.assertEqual(self.get_ages(declarative.NodeEventRecord.SEVERITY_WARNING), range(10))
+
+        self.assertEqual(tasks.expire_events(declarative.NodeEventRecord.SEVERITY_INFO, before), 0)
+
+    @django_test.override_settings(EVENTS_RETENTION={declarative.NodeEventRecord.SEVERITY_WARNING: 3})
+    def test_apply_retention(self):
+        tasks.apply_retention()
+
+        # Events with severities without retention are kept.
+        self.assertEqual(self.get_ages(declarative.NodeEventRecord.SEVERITY_INFO), range(10))
+        self.assertEqual(self.get_ages(declarative.NodeEventRecord.SEVERITY_WARNING), range(3))
+
+
+class EventResourceTest(test_runner.ResourceTestCase):
+    namespace = 'api'
+
+    @classmethod
+    def setUpClass(cls):
+        super(EventResourceTest, cls).setUpClass()
+
+        cls.users = []
+        for i in xrange(2):
+            cls.users.append(auth_models.User.objects.create_user(
+                username='username%s' % i,
+                password='password',
+            ))
+        auth_models.User.objects.create_superuser(
+            username='superuser',
+            email='superuser@example.com',
+            password='password',
+        )
+
+        cls.nodes = []
+        for i in xrange(3):
+            node = core_models.Node()
+            node.save()
+            node.config.core.general(
+                create=core_models.GeneralConfig,
+                name='Node %s' % (2 - i),
+            )
+            cls.nodes.append(node)
+
+        # Events share timestamps, so that their ordering depends on their primary keys.
+        cls.timestamp = timezone.now().replace(microsecond=0)
+        events.DatabaseEventSink().deliver_batch([
+            TestEvent(
+                cls.nodes[i % len(cls.nodes)],
+                'down',
+                cls.timestamp + datetime.timedelta(seconds=i / 4),
+                users=[cls.users[0]] if i % 10 == 9 else None,
+            )
+            for i in xrange(40)
+        ])
+
+    def get_events(self, **kwargs):
+        return [event['id'] for event in self.get_list('event', limit=0, **kwargs)['objects']]
+
+    def get_expected(self, ordering, user=None):
+        queryset = models.SerializedNodeEvent.objects.all()
+        if user is None:
+            queryset = queryset.filter(public=True)
+        else:
+            queryset = queryset.filter(django_models.Q(public=True) | django_models.Q(related_users=user))
+
+        key = lambda event: (getattr(event, ordering.lstrip('-').replace('related_nodes', 'related_node_names')), event.pk)
+        return [event.pk for event in sorted(queryset, key=key, reverse=ordering.startswith('-'))]
+
+    def test_read_list(self):
+        # Events related to users are only visible to these users.
+        self.assertEqual(self.get_events(), self.get_expected('-timestamp'))
+        self.assertEqual(len(self.get_events()), 36)
+
+        self.assertTrue(self.api_client.client.login(username='username0', password='password'))
+        self.assertEqual(self.get_events(), self.get_expected('-timestamp', self.users[0]))
+        self.assertEqual(len(self.get_events()), 40)
+
+        self.assertTrue(self.api_client.client.login(username='username1', password='password'))
+        self.assertEqual(self.get_events(), self.get_expected('-timestamp'))
+
+    def test_keyset_pagination(self):
+        self.assertTrue(self.api_client.client.login(username='username0', password='password'))
+
+        for ordering in ('-timestamp', 'timestamp', 'related_nodes', '-related_nodes'):
+            expected = self.get_expected(ordering, self.users[0])
+
+            # Follow next cursors through all pages.
+            pages = []
+            cursor = ''
+            while cursor is not None:
+                data = self.get_list('event', limit=7, order_by=ordering, cursor=cursor)
+                self.assertEqual(40, data['meta']['total_count'])
+                pages.append([event['id'] for event in data['objects']])
+                cursor = data['meta']['next_cursor']
+
+            self.assertEqual(expected, [pk for page in pages for pk in page], 'ordering=%s' % ordering)
+
+            # Follow previous cursors back to the first page.
+            cursor = data['meta']['previous_cursor']
+            for page in reversed(pages[:-1]):
+                data = self.get_list('event', limit=7, order_by=ordering, cursor=cursor)
+                self.assertEqual(page, [event['id'] for event in data['objects']], 'ordering=%s' % ordering)
+                cursor = data['meta']['previous_cursor']
+
+            self.assertEqual(None, cursor)
+
+    @django_test.override_settings(API_CACHE=True)
+    def test_cache_permissions(self):
+        cache.cache.clear()
+
+        # Responses are never shared between users.
+        self.assertTrue(self.api_client.client.login(username='username0', password='password'))
+        self.assertEqual(len(self.get_events()), 40)
+        self.assertEqual(len(self.get_events()), 40)
+
+        for username in ('superuser', 'username1', None):
+            if username is None:
+                self.api_client.client.logout()
+            else:
+                self.assertTrue(self.api_client.client.login(username=username, password='password'))
+            self.assertEqual(self.get_events(), self.get_expected('-timestamp'), 'username=%s' % username)
+
+    def get_response(self, **kwargs):
+        return self.api_client.get(self.resource_list_uri('event'), format='json', data={'limit': 0}, **kwargs)
+
+    @django_test.override_settings(API_CACHE=True)
+    def test_cache_conditional(self):
+        cache.cache.clear()
+
+        self.assertTrue(self.api_client.client.login(username='username0', password='password'))
+        response = self.get_response()
+        self.assertHttpOK(response)
+        etag = response['ETag']
+
+        response = self.get_response(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        # Tags are only matched once the user is known, so other users get full responses.
+        self.api_client.client.logout()
+        response = self.get_response(HTTP_IF_NONE_MATCH=etag)
+        self.assertHttpOK(response)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(self.deserialize(response)['objects']), 36)
+
+        # Error responses are not cached.
+        response = self.api_client.get(self.resource_list_uri('event'), format='json', data={'cursor': 'invalid'})
+        self.assertHttpBadRequest(response)
+        self.assertFalse(response.has_header('ETag'))
+
+    @django_test.override_settings(API_CACHE=True)
+    def test_cache_generations(self):
+        cache.cache.clear()
+
+        response = self.get_response()
+        etag = response['ETag']
+        self.assertEqual(len(self.deserialize(response)['objects']), 36)
+
+        # Without a generation change, the cached response is served.
+        mdl = models.SerializedNodeEvent.objects.get(pk=self.get_expected('-timestamp')[0])
+        mdl.pk = None
+        mdl.save()
+        response = self.get_response()
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(len(self.deserialize(response)['objects']), 36)
+
+        generations.bump('events')
+        response = self.get_response(HTTP_IF_NONE_MATCH=etag)
+        self.assertHttpOK(response)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(self.deserialize(response)['objects']), 37)
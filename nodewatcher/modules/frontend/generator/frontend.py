@@ -26,6 +26,7 @@ api.v1_api.register(resources.BuildResultFileResource())
 api.v1_api.register(resources.BuilderResource())
 api.v1_api.register(resources.BuildChannelResource())
 api.v1_api.register(resources.BuildVersionResource())
+api.v1_api.register(resources.DeviceResource())
 
 
 components.menus.get_menu('node_menu').add(components.MenuEntry(
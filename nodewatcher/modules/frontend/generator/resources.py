@@ -1,13 +1,16 @@
 from django.db import models as django_models
 
-from tastypie import fields
+from tastypie import exceptions, fields
 from tastypie import authorization as api_authorization, authentication as api_authentication
+from tastypie import resources as api_resources
 
 from nodewatcher.core import models as core_models
 from nodewatcher.core.frontend import api
 from nodewatcher.core.frontend.api import fields as api_fields
 from nodewatcher.core.generator import models as generator_models
+from nodewatcher.core.generator.cgm import catalogue as cgm_catalogue
 from nodewatcher.modules.frontend.list import resources
+from nodewatcher.utils import loader
 
 
 class BuildResultAuthorization(api_authorization.Authorization):
@@ -39,6 +42,7 @@ class BuildChannelResource(api.BaseResource):
         queryset = generator_models.BuildChannel.objects.all()
         list_allowed_methods = ('get',)
         detail_allowed_methods = ('get',)
+        cache_generations = ('generator',)
         fields = ('name', 'description', 'default')
 
 
@@ -50,6 +54,7 @@ class BuildVersionResource(api.BaseResource):
         queryset = generator_models.BuildVersion.objects.all()
         list_allowed_methods = ('get',)
         detail_allowed_methods = ('get',)
+        cache_generations = ('generator',)
         fields = ('name',)
 
 
@@ -63,6 +68,7 @@ class BuilderResource(api.BaseResource):
         queryset = generator_models.Builder.objects.all()
         list_allowed_methods = ('get',)
         detail_allowed_methods = ('get',)
+        cache_generations = ('generator',)
         fields = ('platform', 'architecture', 'version')
 
 
@@ -76,6 +82,7 @@ class BuildResultFileResource(api.BaseResource):
         queryset = generator_models.BuildResultFile.objects.all()
         list_allowed_methods = []
         detail_allowed_methods = ('get',)
+        cache_generations = ('generator',)
         # TODO: Authorization
 
 
@@ -108,11 +115,14 @@ class BuildResultResource(api.BaseResource):
         list_allowed_methods = ('get',)
         detail_allowed_methods = ('get',)
         max_limit = 5000
+        excludes = ('slot',)
         ordering = ('uuid', 'node', 'build_channel', 'builder', 'status', 'created')
+        keyset_fields = ('uuid', 'created')
         # TODO: How can we generate string from registry, without hardcoding registry relations?
         global_filter = ('uuid', 'node__config_core_generalconfig__name', 'build_channel__name', 'builder__version__name', 'status')
         authentication = api_authentication.SessionAuthentication()
         authorization = BuildResultAuthorization()
+        cache_generations = ('config', 'generator')
 
     def _after_apply_sorting(self, obj_list, options, order_by_args):
         # We want to augment sorting so that it is always sorted at the end by "uuid" to have a defined order
@@ -120,3 +130,66 @@ class BuildResultResource(api.BaseResource):
         # because SKIP and LIMIT works well for pagination only when all objects have a defined order.
         extended_order = list(order_by_args) + ['uuid']
         return obj_list.order_by(*extended_order)
+
+
+class DeviceMetadata(object):
+    """
+    Metadata of a device from the device catalogue.
+    """
+
+    def __init__(self, identifier=None, **kwargs):
+        self.identifier = identifier
+        self.__dict__.update(kwargs)
+
+
+class DeviceResource(api_resources.NamespacedModelMixin, api_resources.Resource):
+    """
+    Supported devices. Metadata is served from the device catalogue, which
+    is only computed once.
+    """
+
+    identifier = fields.CharField(attribute='identifier')
+    name = fields.CharField(attribute='name')
+    manufacturer = fields.CharField(attribute='manufacturer')
+    url = fields.CharField(attribute='url')
+    architecture = fields.CharField(attribute='architecture')
+    platforms = fields.ListField(attribute='platforms')
+    usb = fields.BooleanField(attribute='usb')
+    ports = fields.ListField(attribute='ports', use_in='detail')
+    radios = fields.ListField(attribute='radios', use_in='detail')
+    switches = fields.ListField(attribute='switches', use_in='detail')
+
+    class Meta:
+        resource_name = 'device'
+        object_class = DeviceMetadata
+        allowed_methods = ('get',)
+        detail_uri_name = 'identifier'
+        # The device catalogue never changes.
+        cache_generations = ()
+
+    def detail_uri_kwargs(self, bundle_or_obj):
+        if isinstance(bundle_or_obj, api_resources.Bundle):
+            obj = bundle_or_obj.obj
+        else:
+            obj = bundle_or_obj
+
+        return {self._meta.detail_uri_name: obj.identifier}
+
+    def get_catalogue(self):
+        # Ensure that all CGMs are loaded so that all devices are registered.
+        loader.load_modules('cgm')
+
+        return cgm_catalogue.get_catalogue()
+
+    def get_object_list(self, request):
+        return [DeviceMetadata(**metadata) for metadata in self.get_catalogue().get_metadata()]
+
+    def obj_get_list(self, bundle, **kwargs):
+        return self.get_object_list(bundle.request)
+
+    def obj_get(self, bundle, **kwargs):
+        metadata = self.get_catalogue().get_device_metadata(kwargs[self._meta.detail_uri_name])
+        if metadata is None:
+            raise exceptions.NotFound("Device not found.")
+
+        return DeviceMetadata(**metadata)
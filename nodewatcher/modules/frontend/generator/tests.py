@@ -143,6 +143,8 @@ class BuildResultResourceTest(test_runner.ResourceTestCase):
             u'created': build_result.created.isoformat().replace('+00:00', 'Z'),
             u'last_modified': build_result.last_modified.isoformat().replace('+00:00', 'Z'),
             u'status': build_result.status,
+            u'cached': build_result.cached,
+            u'started': None,
             # We manually construct URI to make sure it is like we assume it is.
             u'resource_uri': u'%s%s/' % (self.resource_list_uri('build_result'), build_result.uuid),
         }), json_build_result)
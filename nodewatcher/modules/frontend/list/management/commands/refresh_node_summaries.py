@@ -0,0 +1,22 @@
+from optparse import make_option
+
+from django.core.management import base
+
+from ... import models
+
+
+class Command(base.BaseCommand):
+    help = "Recomputes node summaries used for listing nodes."
+    requires_model_validation = True
+    option_list = base.BaseCommand.option_list + (
+        make_option(
+            '--batch-size',
+            dest='batch_size',
+            default=500,
+            type=int,
+            help='Number of nodes refreshed at once',
+        ),
+    )
+
+    def handle(self, *args, **options):
+        models.NodeSummary.objects.refresh_all(batch_size=options['batch_size'])
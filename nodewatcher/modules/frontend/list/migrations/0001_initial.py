@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_auto_20151018_0956'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NodeSummary',
+            fields=[
+                ('node', models.OneToOneField(related_name='summary', primary_key=True, serialize=False, to='core.Node')),
+                ('name', models.CharField(max_length=50, null=True, db_index=True)),
+                ('type', models.CharField(max_length=50, null=True, db_index=True)),
+                ('project', models.CharField(max_length=50, null=True, db_index=True)),
+                ('last_seen', models.DateTimeField(null=True, db_index=True)),
+                ('network_status', models.CharField(max_length=50, null=True, db_index=True)),
+                ('monitored', models.NullBooleanField()),
+                ('health', models.CharField(max_length=50, null=True, db_index=True)),
+            ],
+        ),
+    ]
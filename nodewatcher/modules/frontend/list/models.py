@@ -0,0 +1,190 @@
+from django import db, dispatch
+from django.db import models, transaction
+from django.db.models import signals as django_signals
+
+from nodewatcher.core import models as core_models
+from nodewatcher.core.registry import registration
+
+from ...administration.projects import models as project_models
+
+# Node summary columns and the registry item attributes they are computed from, indexed
+# by registration point namespace and registry identifier.
+SUMMARY_ITEMS = {
+    ('config', 'core.general'): {'name': 'name'},
+    ('config', 'core.type'): {'type': 'type'},
+    ('config', 'core.project'): {'project': 'project.name'},
+    ('monitoring', 'core.general'): {'last_seen': 'last_seen'},
+    ('monitoring', 'core.status'): {'network_status': 'network', 'monitored': 'monitored', 'health': 'health'},
+}
+
+
+class NodeSummaryManager(models.Manager):
+    def refresh(self, nodes, create=True):
+        """
+        Recomputes summaries of the given nodes from their registry items.
+
+        :param nodes: A list of nodes or their primary keys
+        :param create: Should missing summaries be created
+        """
+
+        pks = set([getattr(node, 'pk', node) for node in nodes])
+        if not pks:
+            return
+
+        queryset = core_models.Node.objects.filter(pk__in=pks).regpoint('config').registry_fields(
+            name='core.general#name',
+            type='core.type#type',
+            project='core.project#project.name',
+        ).regpoint('monitoring').registry_fields(
+            last_seen='core.general#last_seen',
+            network_status='core.status#network',
+            monitored='core.status#monitored',
+            health='core.status#health',
+        )
+
+        columns = [column for attributes in SUMMARY_ITEMS.values() for column in attributes]
+        summaries = dict([
+            (node.pk, dict([(column, getattr(node, column, None)) for column in columns]))
+            for node in queryset
+        ])
+
+        existing = set(self.filter(node__in=summaries.keys()).values_list('node', flat=True))
+        for pk in existing:
+            self.filter(node=pk).update(**summaries[pk])
+
+        missing = [pk for pk in summaries if pk not in existing]
+        if not missing or not create:
+            return
+
+        try:
+            with transaction.atomic():
+                self.bulk_create([self.model(node_id=pk, **summaries[pk]) for pk in missing])
+        except db.IntegrityError:
+            # Some summaries have been created concurrently, so they can now simply be updated.
+            self.refresh(missing)
+
+    def refresh_all(self, batch_size=500):
+        """
+        Recomputes summaries of all nodes.
+
+        :param batch_size: Number of nodes refreshed at once
+        """
+
+        pks = list(core_models.Node.objects.values_list('pk', flat=True))
+        for index in xrange(0, len(pks), batch_size):
+            self.refresh(pks[index:index + batch_size])
+
+        self.exclude(node__in=core_models.Node.objects.all()).delete()
+
+    def is_complete(self, batch_size=100):
+        """
+        Returns true if all nodes have summaries. Nodes may be created without
+        summaries, for example when loading fixtures or creating nodes in bulk,
+        so missing summaries are created here, a batch at a time.
+
+        :param batch_size: Maximum number of summaries created at once
+        """
+
+        missing = list(core_models.Node.objects.filter(summary__isnull=True).values_list('pk', flat=True)[:batch_size + 1])
+        if not missing:
+            return True
+
+        self.refresh(missing[:batch_size])
+        return len(missing) <= batch_size
+
+
+class NodeSummary(models.Model):
+    """
+    Denormalized summary of node configuration and monitoring data, which
+    enables listing, filtering and ordering nodes without joining all their
+    registry items. Summaries are updated whenever the registry items they are
+    computed from are saved.
+    """
+
+    node = models.OneToOneField(core_models.Node, primary_key=True, related_name='summary')
+    name = models.CharField(max_length=50, null=True, db_index=True)
+    type = models.CharField(max_length=50, null=True, db_index=True)
+    project = models.CharField(max_length=50, null=True, db_index=True)
+    last_seen = models.DateTimeField(null=True, db_index=True)
+    network_status = models.CharField(max_length=50, null=True, db_index=True)
+    monitored = models.NullBooleanField()
+    health = models.CharField(max_length=50, null=True, db_index=True)
+
+    objects = NodeSummaryManager()
+
+
+def get_summary_attributes(instance):
+    """
+    Returns summary columns and attributes for a registry item or None if the
+    item is not included in node summaries.
+
+    :param instance: Registry item instance
+    """
+
+    if not isinstance(instance, (registration.bases.NodeConfigRegistryItem, registration.bases.NodeMonitoringRegistryItem)):
+        return None
+
+    return SUMMARY_ITEMS.get((instance._registry.registration_point.namespace, instance._registry.registry_id), None)
+
+
+def get_attribute(instance, path):
+    for attribute in path.split('.'):
+        instance = getattr(instance, attribute, None)
+        if instance is None:
+            break
+
+    return instance
+
+
+@dispatch.receiver(django_signals.post_save, sender=core_models.Node)
+def node_summary_node_saved(sender, instance, created, raw=False, **kwargs):
+    """
+    Create summaries of new nodes.
+    """
+
+    if created and not raw:
+        NodeSummary.objects.refresh([instance])
+
+
+@dispatch.receiver(django_signals.post_save)
+def node_summary_item_saved(sender, instance, raw=False, **kwargs):
+    """
+    Update node summaries when registry items they are computed from change.
+    """
+
+    attributes = get_summary_attributes(instance)
+    if attributes is None or raw or instance.root_id is None:
+        return
+
+    values = dict([(column, get_attribute(instance, path)) for column, path in attributes.items()])
+    if not NodeSummary.objects.filter(node=instance.root_id).update(**values):
+        NodeSummary.objects.refresh([instance.root_id])
+
+
+@dispatch.receiver(django_signals.post_delete)
+def node_summary_item_deleted(sender, instance, **kwargs):
+    """
+    Update node summaries when registry items they are computed from are removed.
+    """
+
+    attributes = get_summary_attributes(instance)
+    if attributes is None or instance.root_id is None:
+        return
+
+    # Items are also removed when they are replaced by new items and when nodes are removed, so
+    # summaries are recomputed, but never created.
+    NodeSummary.objects.refresh([instance.root_id], create=False)
+
+
+@dispatch.receiver(django_signals.post_save, sender=project_models.Project)
+def node_summary_project_saved(sender, instance, created, raw=False, **kwargs):
+    """
+    Update node summaries when projects are renamed.
+    """
+
+    if created or raw:
+        return
+
+    NodeSummary.objects.filter(
+        node__in=project_models.ProjectConfig.objects.filter(project=instance).values('root'),
+    ).update(project=instance.name)
@@ -1,5 +1,7 @@
 from django.conf import urls
 from django.contrib.auth import models as auth_models
+from django.db.models import query
+from django.db.models.sql import constants
 
 from nodewatcher.core import models as core_models
 from nodewatcher.core.frontend import api
@@ -11,6 +13,107 @@ from tastypie import resources, utils
 from ...administration.status import models as status_models
 from ...administration.location import models as location_models
 
+from . import models
+
+# Node resource fields that can be filtered and ordered using node summaries and their summary columns.
+SUMMARY_COLUMNS = {
+    'uuid': 'node__uuid',
+    'name': 'name',
+    'type': 'type',
+    'project': 'project',
+    'last_seen': 'last_seen',
+    'status__network': 'network_status',
+    'status__monitored': 'monitored',
+    'status__health': 'health',
+}
+
+
+class SummaryQuerySet(object):
+    """
+    Nodes that are filtered, ordered and counted using node summaries. Only
+    the nodes that are sliced out, for example the nodes on the requested
+    page, are loaded with all their registry fields.
+    """
+
+    def __init__(self, summaries, nodes, count=None):
+        """
+        Class constructor.
+
+        :param summaries: Filtered and ordered node summaries queryset
+        :param nodes: Node queryset with registry fields
+        :param count: Optional number of summaries, if already known
+        """
+
+        self.summaries = summaries
+        self.nodes = nodes
+        self._count = count
+
+    @property
+    def query(self):
+        # Nodes are counted using their summaries.
+        return self.summaries.query
+
+    def count(self):
+        if self._count is None:
+            self._count = self.summaries.count()
+
+        return self._count
+
+    def filter(self, *args):
+        """
+        Filters nodes by the given filters on node fields, which must all be
+        available in node summaries.
+        """
+
+        def translate(q):
+            translated = query.Q()
+            translated.connector = q.connector
+            translated.negated = q.negated
+            for child in q.children:
+                if isinstance(child, query.Q):
+                    translated.children.append(translate(child))
+                    continue
+
+                filter_expr, value = child
+                bits = filter_expr.split('__')
+                lookup = bits.pop() if len(bits) > 1 and bits[-1] in constants.QUERY_TERMS else 'exact'
+                translated.children.append(('%s__%s' % (SUMMARY_COLUMNS['__'.join(bits)], lookup), value))
+
+            return translated
+
+        return SummaryQuerySet(self.summaries.filter(*[translate(q) for q in args]), self.nodes)
+
+    def order_by(self, *field_names):
+        """
+        Orders nodes by the given fields. When some fields are not available in
+        node summaries, a node queryset ordered by these fields is returned.
+        """
+
+        columns = []
+        for field_name in field_names:
+            descending = field_name.startswith('-')
+            column = SUMMARY_COLUMNS.get(field_name.lstrip('-'), None)
+            if column is None:
+                return self.nodes.filter(pk__in=self.summaries.values('node')).order_by(*field_names)
+
+            columns.append('-%s' % column if descending else column)
+
+        return SummaryQuerySet(self.summaries.order_by(*columns), self.nodes, self._count)
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+
+        pks = list(self.summaries[key].values_list('node', flat=True))
+        nodes = dict([(node.pk, node) for node in self.nodes.filter(pk__in=pks)])
+        return [nodes[pk] for pk in pks if pk in nodes]
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __len__(self):
+        return self.count()
+
 
 class NodeResource(api.BaseResource):
     class Meta:
@@ -67,6 +170,12 @@ class NodeResource(api.BaseResource):
             'type',
             'project',
         )
+        keyset_fields = (
+            'uuid',
+            'name',
+            'project',
+            'last_seen',
+        )
 
     def base_urls(self):
         base_urls = super(NodeResource, self).base_urls()
@@ -83,6 +192,57 @@ class NodeResource(api.BaseResource):
         extended_order = list(order_by_args) + ['uuid']
         return obj_list.order_by(*extended_order)
 
+    def _get_summary_filters(self, request, applicable_filters):
+        """
+        Returns node summary filters equivalent to the given filters or None if
+        they cannot be applied to node summaries.
+        """
+
+        if getattr(request, 'GET', {}).get('distance', None):
+            return None
+
+        filters = []
+        for filter_expr, value in applicable_filters.items():
+            bits = filter_expr.split('__')
+            lookup = bits.pop() if len(bits) > 1 and bits[-1] in constants.QUERY_TERMS else 'exact'
+            column = SUMMARY_COLUMNS.get('__'.join(bits), None)
+            if column is None:
+                return None
+
+            filters.append(query.Q(**{'%s__%s' % (column, lookup): value}))
+
+        f = getattr(request, 'GET', {}).get('filter', None)
+        if f and getattr(self._meta, 'global_filter', None):
+            if any([field not in SUMMARY_COLUMNS for field in self._meta.global_filter]):
+                return None
+
+            qs = [query.Q(**{'%s__icontains' % SUMMARY_COLUMNS[field]: f}) for field in self._meta.global_filter]
+            filter_query = qs[0]
+            for q in qs[1:]:
+                filter_query |= q
+            filters.append(filter_query)
+
+        return filters
+
+    def apply_filters(self, request, applicable_filters):
+        # Filter and count nodes using node summaries when possible, so that the expensive
+        # registry query is only executed for nodes on the requested page.
+        filters = self._get_summary_filters(request, applicable_filters)
+        if filters is None or not models.NodeSummary.objects.is_complete():
+            return super(NodeResource, self).apply_filters(request, applicable_filters)
+
+        summaries = models.NodeSummary.objects.all()
+        if getattr(request, 'GET', {}).get('maintainer', None):
+            summaries = summaries.filter(node__in=self._before_apply_filters(request, core_models.Node.objects.all()))
+
+        nonfiltered_count = summaries.count()
+        summaries = summaries.filter(*filters).order_by('node')
+
+        filtered_queryset = SummaryQuerySet(summaries, self.get_object_list(request))
+        filtered_queryset._nonfiltered_count = nonfiltered_count
+
+        return filtered_queryset
+
     def _before_apply_filters(self, request, queryset):
         # Used by MyNodesComponent. We use _before_apply_filters so that queryset is modified before count
         # for _nonfiltered_count is taken, so that maintainer filter is not exposed through dataTables.
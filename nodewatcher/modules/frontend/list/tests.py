@@ -20,7 +20,7 @@ from nodewatcher.modules.administration.projects import models as project_models
 from nodewatcher.modules.administration.status import models as status_models
 from nodewatcher.modules.administration.types import models as type_models
 
-from . import resources
+from . import models, resources
 
 
 class NodeResourceTest(test_runner.ResourceTestCase):
@@ -520,6 +520,57 @@ class NodeResourceTest(test_runner.ResourceTestCase):
 
         self.assertEqual(schema, data)
 
+    def test_node_summary(self):
+        for i, node in enumerate(self.nodes[0:5]):
+            summary = models.NodeSummary.objects.get(node=node)
+            self.assertEqual(summary.name, 'Node %s' % i)
+            self.assertEqual(summary.type, self.types[i % len(self.types)])
+            self.assertEqual(summary.project, self.projects[i % len(self.projects)].name)
+            self.assertEqual(summary.last_seen, self.initial_time + datetime.timedelta(seconds=i))
+            self.assertEqual(summary.network_status, self.monitoring_network[i % len(self.monitoring_network)])
+
+        general = self.nodes[0].config.core.general()
+        general.name = 'Renamed node'
+        general.save()
+        self.assertEqual(models.NodeSummary.objects.get(node=self.nodes[0]).name, 'Renamed node')
+
+        data = self.get_list('node', name='Renamed node')
+        self.assertEqual([self.nodes[0].uuid], [node['uuid'] for node in data['objects']])
+
+        general.name = 'Node 0'
+        general.save()
+
+    def test_keyset_pagination(self):
+        for ordering, key in (
+            ('name', lambda node: (node.config.core.general().name, node.uuid)),
+            ('-last_seen', lambda node: (node.monitoring.core.general().last_seen, node.uuid)),
+        ):
+            expected = [node.uuid for node in sorted(self.nodes, key=key, reverse=ordering.startswith('-'))]
+
+            # Follow next cursors through all pages.
+            pages = []
+            cursor = ''
+            while cursor is not None:
+                data = self.get_list('node', limit=7, order_by=ordering, cursor=cursor)
+                self.assertEqual(45, data['meta']['total_count'])
+                pages.append([node['uuid'] for node in data['objects']])
+                cursor = data['meta']['next_cursor']
+
+            self.assertEqual(expected, [uuid for page in pages for uuid in page], 'ordering=%s' % ordering)
+            self.assertEqual(None, data['meta']['next'])
+
+            # Follow previous cursors back to the first page.
+            cursor = data['meta']['previous_cursor']
+            for page in reversed(pages[:-1]):
+                data = self.get_list('node', limit=7, order_by=ordering, cursor=cursor)
+                self.assertEqual(page, [node['uuid'] for node in data['objects']], 'ordering=%s' % ordering)
+                cursor = data['meta']['previous_cursor']
+
+            self.assertEqual(None, cursor)
+
+        # Cursors are not supported when ordering by registered choices.
+        self.assertHttpBadRequest(self.api_client.get(self.resource_list_uri('node'), format='json', data={'order_by': 'type', 'cursor': ''}))
+
     def test_get_detail(self):
         for i, node in enumerate(self.nodes[0:5]):
             data = self.get_detail('node', node.uuid)
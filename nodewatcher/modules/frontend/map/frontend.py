@@ -1,8 +1,8 @@
 from django.core import urlresolvers
 
-from nodewatcher.core.frontend import components
+from nodewatcher.core.frontend import api, components
 
-from . import views
+from . import resources, views
 
 
 class MapComponent(components.FrontendComponent):
@@ -16,6 +16,8 @@ class MapComponent(components.FrontendComponent):
 
 components.pool.register(MapComponent)
 
+api.v1_api.register(resources.MapResource())
+
 
 components.menus.get_menu('main_menu').add(components.MenuEntry(
     label=components.ugettext_lazy("Map"),
@@ -0,0 +1,74 @@
+from tastypie import exceptions, fields, resources
+
+from nodewatcher.core.frontend import api
+
+from . import tiles
+
+# Maximum number of tiles a single view is assembled from. Views that would require more tiles
+# are assembled from tiles of lower zoom levels.
+MAX_TILES = 100
+
+
+class MapView(object):
+    """
+    Node clusters and links visible within a bounding box at a zoom level.
+    """
+
+    def __init__(self, zoom=None, bbox=None, nodes=None, links=None):
+        self.zoom = zoom
+        self.bbox = bbox
+        self.nodes = nodes or []
+        self.links = links or []
+
+
+class MapResource(api.CachedResourceMixin, resources.NamespacedModelMixin, resources.Resource):
+    """
+    Map view at a zoom level, given as the identifier. The visible area is
+    given by the `bbox` query parameter as `west,south,east,north` in
+    degrees. Nodes are clustered at low zoom levels, where each cluster has
+    an identifier, the number of nodes and their average location. Links
+    between clusters are merged and only carry the number of merged links.
+    """
+
+    zoom = fields.IntegerField(attribute='zoom')
+    bbox = fields.ListField(attribute='bbox')
+    nodes = fields.ListField(attribute='nodes')
+    links = fields.ListField(attribute='links')
+
+    class Meta:
+        resource_name = 'map'
+        object_class = MapView
+        list_allowed_methods = ()
+        detail_allowed_methods = ('get',)
+        detail_uri_name = 'zoom'
+
+    def detail_uri_kwargs(self, bundle_or_obj):
+        if isinstance(bundle_or_obj, resources.Bundle):
+            obj = bundle_or_obj.obj
+        else:
+            obj = bundle_or_obj
+
+        return {self._meta.detail_uri_name: obj.zoom}
+
+    def obj_get(self, bundle, **kwargs):
+        try:
+            zoom = int(kwargs[self._meta.detail_uri_name])
+            if not 0 <= zoom <= tiles.MAX_ZOOM:
+                raise ValueError
+        except ValueError:
+            raise exceptions.BadRequest("Invalid zoom level: '%s'" % kwargs[self._meta.detail_uri_name])
+
+        bbox = bundle.request.GET.get('bbox', '-180,-90,180,90')
+        try:
+            west, south, east, north = [float(value) for value in bbox.split(',')]
+            if west > east or south > north:
+                raise ValueError
+        except ValueError:
+            raise exceptions.BadRequest("Invalid bounding box: '%s'" % bbox)
+
+        # Views that wrap around the world are limited to a single copy of it.
+        west, east = max(west, -180.0), min(east, 180.0)
+        south, north = max(south, -tiles.MAX_LATITUDE), min(north, tiles.MAX_LATITUDE)
+
+        nodes, links = tiles.get_view(west, south, east, north, tiles.get_tiling_zoom(west, south, east, north, zoom, MAX_TILES))
+        return MapView(zoom=zoom, bbox=[west, south, east, north], nodes=nodes, links=links)
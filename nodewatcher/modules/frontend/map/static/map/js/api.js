@@ -5,6 +5,7 @@
 
     var nodeExtenders = [];
     var linkExtenders = [];
+    var layer = null;
 
     $.nodewatcher.map = {};
 
@@ -16,22 +17,40 @@
         linkExtenders.push(extender);
     };
 
+    $.nodewatcher.map.clusterIcon = function(count) {
+        var size = count < 10 ? "small" : (count < 100 ? "medium" : "large");
+
+        return L.divIcon({
+            'html': "<div><span>" + count + "</span></div>",
+            'className': "marker-cluster marker-cluster-" + size,
+            'iconSize': L.point(40, 40),
+        });
+    };
+
+    // Replaces nodes and links shown on the map. Nodes may be clusters of
+    // nodes, which are shown with the number of nodes they contain.
     $.nodewatcher.map.extend = function(map, nodes, links) {
+        var nodesLayer = L.layerGroup();
+
         $.each(nodeExtenders, function(index, extender) {
             $.each(nodes, function(nodeIndex, node) {
                 node.marker = extender(node);
             });
         });
 
-        var cluster = new L.MarkerClusterGroup({spiderfyDistanceMultiplier: 3, maxClusterRadius: 20,
-            disableClusteringAtZoom: 13});
-
         $.each(nodes, function(index, node) {
-            if (node.marker)
-                cluster.addLayer(node.marker);
-        });
+            if (!node.marker)
+                return;
 
-        map.addLayer(cluster);
+            if (node.count > 1) {
+                node.marker.setIcon($.nodewatcher.map.clusterIcon(node.count));
+                node.marker.on('click', function() {
+                    map.setView(node.marker.getLatLng(), map.getZoom() + 2);
+                });
+            }
+
+            nodesLayer.addLayer(node.marker);
+        });
 
         $.each(linkExtenders, function(index, extender) {
             $.each(links, function(index, link) {
@@ -45,7 +64,11 @@
 
         $.each(links, function(index, link) {
             if (link.line)
-                link.line.addTo(map);
+                nodesLayer.addLayer(link.line);
         });
+
+        if (layer)
+            map.removeLayer(layer);
+        layer = nodesLayer.addTo(map);
     };
 })(jQuery);
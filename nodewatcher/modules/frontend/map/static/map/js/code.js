@@ -1,41 +1,67 @@
 (function ($) {
+    // Maximum margin (in pixels) loaded around the visible area of the map.
+    var MAX_MARGIN = 256;
+    // Delay (in milliseconds) after which failed requests are retried.
+    var RETRY_DELAY = 30000;
+
     $(window).on('map:init', function (e) {
         var detail = e.originalEvent ? e.originalEvent.detail : e.detail;
         var map = detail.map;
+        var request = null;
+        var retry = null;
 
         // TODO: Some kind of loading indicator
 
-        $.ajax({
-            'url': "/api/v1/stream/?format=json&tags__module=topology&limit=1",
-        }).done(function(data) {
-            var streamId = data.objects[0].id;
-            var latestTimestamp = moment(data.objects[0].latest_datapoint).unix();
-            $.ajax({
-                'url': "/api/v1/stream/" + streamId + "/?format=json&reverse=true&limit=1&start_exclusive=" + latestTimestamp,
+        function load() {
+            // Load a bit more than is visible, so that links leaving the view are shown as well. The
+            // margin is limited, so that views on large screens do not grow even larger.
+            var size = map.getSize();
+            var bounds = map.getBounds().pad(Math.min(0.25, MAX_MARGIN / Math.max(size.x, size.y, 1)));
+
+            if (request)
+                request.abort();
+            clearTimeout(retry);
+
+            request = $.ajax({
+                'url': "/api/v1/map/" + map.getZoom() + "/",
+                'data': {
+                    'format': 'json',
+                    'bbox': [bounds.getWest(), bounds.getSouth(), bounds.getEast(), bounds.getNorth()].join(','),
+                },
             }).done(function(data) {
-                var graph = data.datapoints[0].v;
                 var nodes = [];
                 var edges = [];
                 var nodeIndex = {};
 
-                $.each(graph.v, function(index, vertex) {
+                $.each(data.nodes, function(index, node) {
                     nodes.push({
                         'index': index,
-                        'data': vertex,
+                        'count': node.count,
+                        'data': node.data,
                     });
-                    nodeIndex[vertex.i] = index;
+                    nodeIndex[node.id] = index;
                 });
 
-                $.each(graph.e, function(index, edge) {
+                $.each(data.links, function(index, link) {
                     edges.push({
-                        'source': nodeIndex[edge.f],
-                        'target': nodeIndex[edge.t],
-                        'data': edge,
+                        'source': nodeIndex[link.source],
+                        'target': nodeIndex[link.target],
+                        'data': link.data,
                     });
                 });
 
                 $.nodewatcher.map.extend(map, nodes, edges);
+            }).fail(function (xhr, status) {
+                // Requests are aborted when the map moves again before they complete.
+                if (status === 'abort')
+                    return;
+
+                // Keep showing what has been loaded so far and try again later.
+                retry = setTimeout(load, RETRY_DELAY);
             });
-        });
+        }
+
+        map.on('moveend', load);
+        load();
     });
 })(jQuery);
@@ -0,0 +1,129 @@
+import datetime
+import unittest
+
+from django import test as django_test
+from django.core import cache
+from django.utils import timezone
+
+from nodewatcher.core import models as core_models
+from nodewatcher.modules.administration.location import models as location_models
+from nodewatcher.modules.monitor.topology import models as topology_models
+
+from . import tiles
+
+
+class TilesTestCase(unittest.TestCase):
+    def test_to_tile(self):
+        self.assertEqual(tiles.to_tile(0, 0, 0), (0.5, 0.5))
+        self.assertEqual(tiles.to_tile(90, 0, 2), (3.0, 2.0))
+
+        x, y = tiles.to_tile(-180, tiles.MAX_LATITUDE, 1)
+        self.assertEqual(x, 0)
+        self.assertAlmostEqual(y, 0)
+
+        # Locations outside the projection are clamped to the last tile.
+        x, y = tiles.to_tile(180, -90, 2)
+        self.assertEqual((int(x), int(y)), (3, 3))
+        x, y = tiles.to_tile(-200, 90, 2)
+        self.assertEqual((int(x), int(y)), (0, 0))
+
+    def test_get_tiles(self):
+        self.assertEqual(tiles.get_tiles(-180, -90, 180, 90, 0), [(0, 0)])
+        self.assertEqual(sorted(tiles.get_tiles(-180, -90, 180, 90, 1)), [(0, 0), (0, 1), (1, 0), (1, 1)])
+        self.assertEqual(tiles.get_tiles(10, 40, 11, 41, 2), [(2, 1)])
+        self.assertEqual(sorted(tiles.get_tiles(-10, 40, 100, 41, 2)), [(1, 1), (2, 1), (3, 1)])
+
+    def test_get_tiling_zoom(self):
+        # Small views are covered by tiles of the requested zoom level.
+        self.assertEqual(tiles.get_tiling_zoom(10, 40, 11, 41, 10, 100), 10)
+        self.assertEqual(tiles.get_tiling_zoom(-180, -90, 180, 90, 3, 100), 3)
+
+        # Large views are covered by tiles of lower zoom levels.
+        self.assertEqual(tiles.get_tiling_zoom(-180, -90, 180, 90, 10, 100), 3)
+        self.assertEqual(tiles.get_tiling_zoom(-180, -90, 180, 90, 10, 1), 0)
+        self.assertEqual(tiles.get_tiling_zoom(-180, -90, 180, 90, 10, 3), 0)
+        self.assertEqual(tiles.get_tiling_zoom(-180, -90, 180, 90, 10, 4), 1)
+
+
+class ComputeTileTestCase(django_test.TestCase):
+    def setUp(self):
+        cache.cache.clear()
+
+        self.nodes = {}
+        for name, longitude, latitude in (('a', 10.0, 40.0), ('b', 10.1, 40.1), ('c', 60.0, 40.0), ('d', -100.0, 40.0)):
+            node = core_models.Node()
+            node.save()
+            node.config.core.location(
+                create=location_models.LocationConfig,
+                address='Location %s' % name,
+                city='Ljubljana',
+                country='SI',
+                timezone='Europe/Ljubljana',
+                altitude=0,
+                geolocation='POINT(%f %f)' % (longitude, latitude),
+            )
+            self.nodes[name] = node.pk
+
+        self.store({'n': 'node-c'})
+
+    def store(self, attributes, timestamp=None):
+        nodes = self.nodes
+        topology_models.TopologySnapshot.objects.store(
+            timestamp or timezone.now(),
+            dict([(nodes['a'], {'n': 'node-a'}), (nodes['b'], {'n': 'node-b'}), (nodes['c'], attributes), (nodes['d'], {})]),
+            [
+                {'f': nodes['a'], 't': nodes['c'], 'lq': 1.0},
+                {'f': nodes['b'], 't': nodes['c'], 'lq': 0.5},
+                {'f': nodes['a'], 't': nodes['b']},
+                {'f': nodes['d'], 't': nodes['a']},
+            ],
+        )
+
+    def test_clustered(self):
+        tile = tiles.compute_tile(2, 1, 2, tiles.TopologyIndex())
+
+        ab = tiles.get_cluster_key(10.0, 40.0, 2)
+        c = tiles.get_cluster_key(60.0, 40.0, 2)
+        d = tiles.get_cluster_key(-100.0, 40.0, 2)
+        self.assertEqual(ab, tiles.get_cluster_key(10.1, 40.1, 2))
+
+        # Nodes outside the tile are not included, while clusters of a single node carry its attributes.
+        self.assertEqual(sorted(tile['nodes'], key=lambda node: node['id']), sorted([
+            {'id': ab, 'count': 2, 'data': {'l': [(10.0 + 10.1) / 2, (40.0 + 40.1) / 2]}},
+            {'id': c, 'count': 1, 'data': {'i': self.nodes['c'], 'n': 'node-c', 'l': [60.0, 40.0]}},
+        ], key=lambda node: node['id']))
+
+        # Links between clusters are merged, while links within clusters are not included.
+        self.assertEqual(sorted([(link['source'], link['target'], link['data']['count']) for link in tile['links']]), sorted([
+            tuple(sorted((ab, c))) + (2,),
+            tuple(sorted((ab, d))) + (1,),
+        ]))
+
+    def test_unclustered(self):
+        zoom = tiles.CLUSTERING_MAX_ZOOM + 1
+        x, y = tiles.to_tile(10.0, 40.0, zoom)
+        tile = tiles.compute_tile(int(x), int(y), zoom, tiles.TopologyIndex())
+
+        self.assertEqual(tile['nodes'], [
+            {'id': self.nodes['a'], 'count': 1, 'data': {'i': self.nodes['a'], 'n': 'node-a', 'l': [10.0, 40.0]}},
+        ])
+
+        # Links between nodes are not merged and carry their attributes.
+        nodes = self.nodes
+        self.assertEqual(sorted([(link['source'], link['target'], link['data'].get('lq', None)) for link in tile['links']]), sorted([
+            (nodes['a'], nodes['c'], 1.0),
+            (nodes['a'], nodes['b'], None),
+            (nodes['d'], nodes['a'], None),
+        ]))
+
+    def test_get_tile(self):
+        tile = tiles.get_tile(2, 1, 2)
+
+        # Cached tiles are only computed once.
+        with self.assertNumQueries(1):
+            self.assertEqual(tiles.get_tile(2, 1, 2), tile)
+
+        # Tiles are computed again once a new topology snapshot is stored.
+        self.store({'n': 'renamed'}, timezone.now() + datetime.timedelta(seconds=1))
+        c = tiles.get_cluster_key(60.0, 40.0, 2)
+        self.assertEqual([node['data']['n'] for node in tiles.get_tile(2, 1, 2)['nodes'] if node['id'] == c], ['renamed'])
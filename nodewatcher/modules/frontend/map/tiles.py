@@ -0,0 +1,317 @@
+import math
+
+from django.conf import settings
+from django.contrib.gis import geos
+from django.core import cache
+
+from nodewatcher.modules.administration.location import models as location_models
+from nodewatcher.modules.monitor.topology import models as topology_models
+from nodewatcher.utils import generations
+
+# Highest zoom level at which nodes are clustered.
+CLUSTERING_MAX_ZOOM = getattr(settings, 'MAP_CLUSTERING_MAX_ZOOM', 12)
+# Number of clustering grid cells along each side of a tile.
+CLUSTERING_GRID = getattr(settings, 'MAP_CLUSTERING_GRID', 4)
+# Time (in seconds) for which computed tiles are cached. Tiles are invalidated earlier
+# when node configuration changes or a topology snapshot is stored.
+TILE_CACHE_TIMEOUT = getattr(settings, 'MAP_TILE_CACHE_TIMEOUT', 3600)
+# Time (in seconds) for which computed tiles are cached when the cache is not shared by all
+# processes, as configuration changes in other processes are then not seen.
+TILE_LOCAL_CACHE_TIMEOUT = getattr(settings, 'MAP_TILE_LOCAL_CACHE_TIMEOUT', 60)
+
+# Highest supported zoom level.
+MAX_ZOOM = 20
+# Latitude limit of the Web Mercator projection.
+MAX_LATITUDE = 85.0511287798
+
+# Cache key of a computed tile.
+TILE_KEY = 'nodewatcher.map.tile.%s.%s.%s.%s'
+
+
+def to_tile(longitude, latitude, zoom):
+    """
+    Returns fractional Web Mercator tile coordinates of a location.
+
+    :param longitude: Longitude in degrees
+    :param latitude: Latitude in degrees
+    :param zoom: Zoom level
+    """
+
+    latitude = math.radians(max(-MAX_LATITUDE, min(MAX_LATITUDE, latitude)))
+    scale = 2 ** zoom
+    x = (longitude + 180.0) / 360.0 * scale
+    y = (1.0 - math.log(math.tan(latitude) + 1.0 / math.cos(latitude)) / math.pi) / 2.0 * scale
+
+    return min(max(x, 0), scale - 1e-9), min(max(y, 0), scale - 1e-9)
+
+
+def get_tile_bounds(x, y, zoom):
+    """
+    Returns the bounding box of a tile as a tuple (west, south, east, north).
+
+    :param x: Tile column
+    :param y: Tile row
+    :param zoom: Zoom level
+    """
+
+    scale = 2 ** zoom
+
+    def to_latitude(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2.0 * row / scale))))
+
+    return x * 360.0 / scale - 180.0, to_latitude(y + 1), (x + 1) * 360.0 / scale - 180.0, to_latitude(y)
+
+
+def get_tiles(west, south, east, north, zoom):
+    """
+    Returns coordinates of tiles covering a bounding box.
+
+    :param west: Western longitude of the bounding box
+    :param south: Southern latitude of the bounding box
+    :param east: Eastern longitude of the bounding box
+    :param north: Northern latitude of the bounding box
+    :param zoom: Zoom level
+    """
+
+    min_x, min_y = to_tile(west, north, zoom)
+    max_x, max_y = to_tile(east, south, zoom)
+
+    return [
+        (x, y)
+        for x in xrange(int(min_x), int(max_x) + 1)
+        for y in xrange(int(min_y), int(max_y) + 1)
+    ]
+
+
+def get_tiling_zoom(west, south, east, north, zoom, max_tiles):
+    """
+    Returns the zoom level of tiles a view is assembled from. This is the
+    requested zoom level, unless the view would be covered by more tiles than
+    allowed. Lower zoom levels are then used, so that large views are covered
+    by fewer tiles, where nodes may be clustered more coarsely.
+
+    :param west: Western longitude of the bounding box
+    :param south: Southern latitude of the bounding box
+    :param east: Eastern longitude of the bounding box
+    :param north: Northern latitude of the bounding box
+    :param zoom: Requested zoom level
+    :param max_tiles: Maximum number of tiles
+    """
+
+    while zoom > 0:
+        min_x, min_y = to_tile(west, north, zoom)
+        max_x, max_y = to_tile(east, south, zoom)
+        if (int(max_x) - int(min_x) + 1) * (int(max_y) - int(min_y) + 1) <= max_tiles:
+            break
+
+        zoom -= 1
+
+    return zoom
+
+
+def get_cluster_key(longitude, latitude, zoom):
+    """
+    Returns the key of the cluster a location belongs to at a zoom level.
+    Clusters are cells of a grid that divides each tile into equal parts,
+    except at zoom levels where clustering is disabled.
+
+    :param longitude: Longitude in degrees
+    :param latitude: Latitude in degrees
+    :param zoom: Zoom level
+    """
+
+    x, y = to_tile(longitude, latitude, zoom)
+    return '%s:%d:%d' % (zoom, int(x * CLUSTERING_GRID), int(y * CLUSTERING_GRID))
+
+
+class TopologyIndex(object):
+    """
+    Latest topology graph indexed for computing tiles. It is only loaded when
+    a tile needs to be computed.
+    """
+
+    def __init__(self):
+        # Timestamp of the latest topology snapshot, which identifies the graph.
+        self.timestamp = topology_models.TopologySnapshot.objects.get_latest_timestamp()
+        self._vertices = None
+        self._edges = None
+        self._locations = {}
+
+    def load(self):
+        if self._vertices is not None:
+            return
+
+        timestamp, graph = topology_models.TopologySnapshot.objects.get_graph(self.timestamp)
+        graph = graph or {'v': [], 'e': []}
+
+        self._vertices = dict([(vertex['i'], vertex) for vertex in graph['v']])
+        self._edges = {}
+        for edge in graph['e']:
+            self._edges.setdefault(edge['f'], []).append(edge)
+            self._edges.setdefault(edge['t'], []).append(edge)
+
+    def get_vertex(self, node):
+        self.load()
+        return self._vertices.get(node, {})
+
+    def get_edges(self, nodes):
+        """
+        Returns edges of the given nodes.
+
+        :param nodes: A list of node primary keys
+        """
+
+        self.load()
+
+        edges = {}
+        for node in nodes:
+            for edge in self._edges.get(node, []):
+                edges[id(edge)] = edge
+
+        return edges.values()
+
+    def get_locations(self, nodes):
+        """
+        Returns locations of the given nodes as a dictionary of (longitude,
+        latitude) tuples. Nodes without a location are omitted.
+
+        :param nodes: A list of node primary keys
+        """
+
+        missing = [node for node in nodes if node not in self._locations]
+        if missing:
+            self._locations.update(dict([
+                (node, location.coords)
+                for node, location in location_models.LocationConfig.geo_objects.filter(
+                    root__in=missing,
+                    geolocation__isnull=False,
+                ).values_list('root_id', 'geolocation')
+            ]))
+
+        return dict([(node, self._locations[node]) for node in nodes if node in self._locations])
+
+
+def compute_tile(x, y, zoom, topology):
+    """
+    Computes node clusters and links of a tile. Clusters of a single node and
+    nodes at zoom levels without clustering carry the node's topology
+    attributes. Links between clusters are merged and carry the number of
+    merged links, while links between nodes carry their topology attributes.
+
+    :param x: Tile column
+    :param y: Tile row
+    :param zoom: Zoom level
+    :param topology: Topology index
+    :return: A dictionary with a list of clusters under 'nodes' and a list
+      of links under 'links'
+    """
+
+    # Nodes are selected by their bounding box, so that the spatial index can be used.
+    west, south, east, north = get_tile_bounds(x, y, zoom)
+    locations = location_models.LocationConfig.geo_objects.filter(
+        geolocation__bboverlaps=geos.Polygon.from_bbox((west, south, east, north)),
+    ).values_list('root_id', 'geolocation')
+
+    clustered = zoom <= CLUSTERING_MAX_ZOOM
+    clusters = {}
+    for node, location in locations:
+        longitude, latitude = location.coords
+        tile_x, tile_y = to_tile(longitude, latitude, zoom)
+        if (int(tile_x), int(tile_y)) != (x, y):
+            # Nodes on the tile border belong to a single tile.
+            continue
+
+        key = get_cluster_key(longitude, latitude, zoom) if clustered else node
+        cluster = clusters.setdefault(key, {'id': key, 'nodes': [], 'longitude': 0.0, 'latitude': 0.0})
+        cluster['nodes'].append(node)
+        cluster['longitude'] += longitude
+        cluster['latitude'] += latitude
+
+    nodes = []
+    for cluster in clusters.values():
+        count = len(cluster['nodes'])
+        data = dict(topology.get_vertex(cluster['nodes'][0])) if count == 1 else {}
+        data['l'] = [cluster['longitude'] / count, cluster['latitude'] / count]
+        nodes.append({'id': cluster['id'], 'count': count, 'data': data})
+
+    members = [node for cluster in clusters.values() for node in cluster['nodes']]
+    edges = topology.get_edges(members)
+    locations = topology.get_locations(set([edge['f'] for edge in edges] + [edge['t'] for edge in edges]))
+
+    links = {}
+    for edge in edges:
+        if edge['f'] not in locations or edge['t'] not in locations:
+            continue
+
+        if not clustered:
+            links[(edge['f'], edge['t'], repr(sorted(edge.items())))] = {
+                'source': edge['f'],
+                'target': edge['t'],
+                'data': edge,
+            }
+            continue
+
+        source = get_cluster_key(*locations[edge['f']], zoom=zoom)
+        target = get_cluster_key(*locations[edge['t']], zoom=zoom)
+        if source == target:
+            # Links within a cluster are not shown.
+            continue
+
+        source, target = sorted((source, target))
+        link = links.setdefault((source, target), {'source': source, 'target': target, 'data': {'count': 0}})
+        link['data']['count'] += 1
+
+    return {
+        'nodes': nodes,
+        'links': links.values(),
+    }
+
+
+def get_tile(x, y, zoom, topology=None):
+    """
+    Returns node clusters and links of a tile, computing them only when they
+    are not cached.
+
+    :param x: Tile column
+    :param y: Tile row
+    :param zoom: Zoom level
+    :param topology: Optional topology index, which is shared between tiles
+    """
+
+    # Tiles are identified by the topology snapshot they were computed from, as snapshots are
+    # stored by another process.
+    topology = topology or TopologyIndex()
+    config, = generations.get(('config',))
+    key = TILE_KEY % (zoom, x, y, '%s.%s' % (config, topology.timestamp.isoformat() if topology.timestamp else None))
+    tile = cache.cache.get(key)
+    if tile is None:
+        tile = compute_tile(x, y, zoom, topology)
+        cache.cache.set(key, tile, TILE_CACHE_TIMEOUT if generations.is_shared() else min(TILE_CACHE_TIMEOUT, TILE_LOCAL_CACHE_TIMEOUT))
+
+    return tile
+
+
+def get_view(west, south, east, north, zoom):
+    """
+    Returns node clusters and links visible within a bounding box, assembled
+    from tiles covering it. Links are only included when both of their ends
+    are visible.
+
+    :param west: Western longitude of the bounding box
+    :param south: Southern latitude of the bounding box
+    :param east: Eastern longitude of the bounding box
+    :param north: Northern latitude of the bounding box
+    :param zoom: Zoom level
+    """
+
+    topology = TopologyIndex()
+    nodes = {}
+    links = {}
+    for x, y in get_tiles(west, south, east, north, zoom):
+        tile = get_tile(x, y, zoom, topology)
+        for node in tile['nodes']:
+            nodes[node['id']] = node
+        for link in tile['links']:
+            links[(link['source'], link['target'], repr(sorted(link['data'].items())))] = link
+
+    return nodes.values(), [link for link in links.values() if link['source'] in nodes and link['target'] in nodes]
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import json_field.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredStatistics',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('name', models.CharField(unique=True, max_length=100)),
+                ('header', json_field.fields.JSONField(default='null', help_text='Enter a valid JSON object', null=True)),
+                ('statistics', json_field.fields.JSONField(default='null', help_text='Enter a valid JSON object', null=True)),
+                ('generations', models.CharField(max_length=255, blank=True)),
+                ('updated', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,122 @@
+import datetime
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+import json_field
+
+from nodewatcher.utils import generations
+
+# Maximum age (in seconds) of stored statistics of resources that do not declare their own
+# refresh interval. Statistics are refreshed earlier when their invalidation triggers change.
+REFRESH_INTERVAL = getattr(settings, 'STATISTICS_REFRESH_INTERVAL', 3600)
+
+
+class StoredStatisticsManager(models.Manager):
+    def refresh(self, resource):
+        """
+        Computes statistics of a resource and stores them.
+
+        :param resource: Statistics resource instance
+        :return: Stored statistics instance
+        """
+
+        # Generations are taken before computing, so that changes made while computing
+        # cause another refresh.
+        current = get_generations(resource)
+        stored, created = self.update_or_create(
+            name=resource.get_name(),
+            defaults={
+                'header': resource.get_header(),
+                'statistics': list(resource.get_statistics()),
+                'generations': current,
+                'updated': timezone.now(),
+            },
+        )
+        generations.bump('statistics')
+
+        return stored
+
+    def get_current(self, resource):
+        """
+        Returns stored statistics of a resource. Stale statistics are returned
+        as well, as they are recomputed by the periodic refresh task, so
+        statistics are only computed here when none have been stored yet.
+
+        :param resource: Statistics resource instance
+        """
+
+        try:
+            return self.get(name=resource.get_name())
+        except self.model.DoesNotExist:
+            return self.refresh(resource)
+
+    def refresh_stale(self, resources):
+        """
+        Refreshes stored statistics of resources which are stale.
+
+        :param resources: A list of statistics resource instances
+        :return: Number of refreshed resources
+        """
+
+        stored = dict([(item.name, item) for item in self.filter(name__in=[resource.get_name() for resource in resources])])
+        refreshed = 0
+        for resource in resources:
+            item = stored.get(resource.get_name(), None)
+            if item is None or item.is_stale(resource):
+                self.refresh(resource)
+                refreshed += 1
+
+        return refreshed
+
+
+def get_generations(resource):
+    """
+    Returns the current generations of invalidation triggers of a resource
+    in the form they are stored in.
+
+    :param resource: Statistics resource instance
+    """
+
+    return '.'.join([str(generation) for generation in generations.get(resource.get_triggers())])
+
+
+class StoredStatistics(models.Model):
+    """
+    Precomputed statistics of a statistics resource.
+    """
+
+    name = models.CharField(max_length=100, unique=True)
+    header = json_field.JSONField(null=True)
+    statistics = json_field.JSONField(null=True)
+    # Generations of invalidation triggers at the time statistics were computed.
+    generations = models.CharField(max_length=255, blank=True)
+    updated = models.DateTimeField()
+
+    objects = StoredStatisticsManager()
+
+    def is_stale(self, resource):
+        """
+        Returns true if stored statistics should be recomputed, because one of
+        the resource's invalidation triggers has changed or because they are
+        older than the resource's refresh interval.
+
+        Triggers are only checked when generations are shared by all processes,
+        as they are changed in other processes than the one refreshing the
+        statistics. Otherwise, statistics are refreshed based on their age
+        only, using the default interval for resources without one.
+
+        :param resource: Statistics resource instance
+        """
+
+        interval = resource.get_refresh_interval()
+        if not generations.is_shared():
+            interval = interval or REFRESH_INTERVAL
+        elif self.generations != get_generations(resource):
+            return True
+
+        if interval is not None and timezone.now() - self.updated >= datetime.timedelta(seconds=interval):
+            return True
+
+        return False
@@ -1,5 +1,8 @@
 from tastypie import resources, fields
 
+from nodewatcher.core.frontend import api
+
+from . import models
 from .pool import pool
 
 
@@ -10,6 +13,11 @@ class StatisticsResource(object):
 
     name = None
     description = None
+    # Generation scopes (see nodewatcher.utils.generations) whose changes invalidate
+    # stored statistics.
+    triggers = ()
+    # Maximum age (in seconds) of stored statistics. None uses the default interval.
+    refresh_interval = None
 
     def get_name(self):
         """
@@ -18,6 +26,24 @@ class StatisticsResource(object):
 
         return self.name
 
+    def get_triggers(self):
+        """
+        Returns generation scopes whose changes invalidate stored statistics.
+        """
+
+        return self.triggers
+
+    def get_refresh_interval(self):
+        """
+        Returns the maximum age (in seconds) of stored statistics or None if
+        they should only be refreshed when triggers change.
+        """
+
+        if self.refresh_interval is None:
+            return models.REFRESH_INTERVAL
+
+        return self.refresh_interval
+
     def get_header(self):
         """
         Returns header data, which should describe the used fields somehow.
@@ -42,16 +68,57 @@ class StatisticsResource(object):
         return self.get_statistics()
 
 
-class StatisticsPoolResource(resources.NamespacedModelMixin, resources.Resource):
+class StoredStatisticsView(object):
+    """
+    Stored statistics of a statistics resource.
+    """
+
+    def __init__(self, resource=None, stored=None):
+        self.resource = resource
+        self.stored = stored
+
+    def get_name(self):
+        return self.resource.get_name()
+
+    @property
+    def name(self):
+        return self.resource.name
+
+    @property
+    def description(self):
+        return self.resource.description
+
+    @property
+    def header(self):
+        return self.stored.header if self.stored is not None else None
+
+    @property
+    def statistics(self):
+        return self.stored.statistics if self.stored is not None else None
+
+    @property
+    def updated(self):
+        return self.stored.updated if self.stored is not None else None
+
+
+class StatisticsPoolResource(api.CachedResourceMixin, resources.NamespacedModelMixin, resources.Resource):
+    """
+    Statistics of registered statistics resources. Statistics are served from
+    storage, where they are refreshed periodically, and `updated` is the time
+    at which they were computed.
+    """
+
     name = fields.CharField(attribute='name')
     description = fields.CharField(attribute='description')
+    updated = fields.DateTimeField(attribute='updated', null=True)
     header = fields.DictField(attribute='header', use_in='detail')
     statistics = fields.ListField(attribute='statistics', use_in='detail')
 
     class Meta:
         resource_name = 'statistics'
-        object_class = StatisticsResource
+        object_class = StoredStatisticsView
         allowed_methods = ('get',)
+        cache_generations = ('statistics',)
 
     def detail_uri_kwargs(self, bundle_or_obj):
         kwargs = {}
@@ -64,10 +131,15 @@ class StatisticsPoolResource(resources.NamespacedModelMixin, resources.Resource)
         return kwargs
 
     def get_object_list(self, request):
-        return pool.get_all_resources()
+        resources = pool.get_all_resources()
+        stored = models.StoredStatistics.objects.filter(name__in=[resource.get_name() for resource in resources])
+        stored = dict([(item.name, item) for item in stored])
+
+        return [StoredStatisticsView(resource, stored.get(resource.get_name(), None)) for resource in resources]
 
     def obj_get_list(self, bundle, **kwargs):
         return self.get_object_list(bundle.request)
 
     def obj_get(self, bundle, **kwargs):
-        return pool.get_resource(kwargs['pk'])
+        resource = pool.get_resource(kwargs['pk'])
+        return StoredStatisticsView(resource, models.StoredStatistics.objects.get_current(resource))
@@ -0,0 +1,25 @@
+import datetime
+
+from nodewatcher import celery
+from nodewatcher.core.frontend import components
+
+from . import models
+from .pool import pool
+
+# Register the periodic schedule.
+celery.app.conf.CELERYBEAT_SCHEDULE['nodewatcher.modules.frontend.statistics.tasks.refresh_statistics'] = {
+    'task': 'nodewatcher.modules.frontend.statistics.tasks.refresh_statistics',
+    'schedule': datetime.timedelta(minutes=1),
+}
+
+
+@celery.app.task(queue='monitor', bind=True)
+def refresh_statistics(self):
+    """
+    Recomputes stored statistics of registered resources which are stale.
+    """
+
+    # Statistics resources are registered by frontend modules.
+    components.pool.discover_components()
+
+    models.StoredStatistics.objects.refresh_stale(pool.get_all_resources())
@@ -0,0 +1,157 @@
+import datetime
+import shutil
+import tempfile
+
+from django import test as django_test
+from django.utils import timezone
+
+from django_datastream import test_runner
+
+from nodewatcher.utils import generations
+
+from . import models, resources
+from .pool import pool
+
+
+class TestStatistics(resources.StatisticsResource):
+    description = "Test statistics."
+
+    def __init__(self, name='test', triggers=('test.statistics',), refresh_interval=60):
+        self.name = name
+        self.triggers = triggers
+        self.refresh_interval = refresh_interval
+        self.computed = 0
+
+    def get_header(self):
+        return {'count': "Count"}
+
+    def get_statistics(self):
+        self.computed += 1
+        return [{'count': self.computed}]
+
+
+class StoredStatisticsTestCase(django_test.TestCase):
+    def setUp(self):
+        # Triggers are only checked when generations are shared by all processes.
+        self.cache_location = tempfile.mkdtemp()
+        self.cache_settings = self.settings(CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': self.cache_location,
+            },
+        })
+        self.cache_settings.enable()
+
+    def tearDown(self):
+        self.cache_settings.disable()
+        shutil.rmtree(self.cache_location)
+
+    def age(self, resource, seconds):
+        models.StoredStatistics.objects.filter(name=resource.get_name()).update(
+            updated=timezone.now() - datetime.timedelta(seconds=seconds),
+        )
+
+    def test_is_stale(self):
+        resource = TestStatistics()
+        stored = models.StoredStatistics.objects.refresh(resource)
+        self.assertFalse(stored.is_stale(resource))
+
+        generations.bump('test.statistics')
+        self.assertTrue(stored.is_stale(resource))
+
+        stored = models.StoredStatistics.objects.refresh(resource)
+        self.assertFalse(stored.is_stale(resource))
+
+        stored.updated -= datetime.timedelta(seconds=59)
+        self.assertFalse(stored.is_stale(resource))
+        stored.updated -= datetime.timedelta(seconds=1)
+        self.assertTrue(stored.is_stale(resource))
+
+    def test_not_shared(self):
+        with self.settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            resource = TestStatistics()
+            stored = models.StoredStatistics.objects.refresh(resource)
+
+            # Without a shared cache, changes in other processes are not seen, so statistics are
+            # only refreshed based on their age.
+            generations.bump('test.statistics')
+            self.assertFalse(stored.is_stale(resource))
+
+            stored.updated -= datetime.timedelta(seconds=60)
+            self.assertTrue(stored.is_stale(resource))
+
+    def test_refresh_stale(self):
+        first = TestStatistics('first', ('test.statistics.first',))
+        second = TestStatistics('second', ('test.statistics.second',))
+
+        self.assertEqual(models.StoredStatistics.objects.refresh_stale([first, second]), 2)
+        self.assertEqual(models.StoredStatistics.objects.refresh_stale([first, second]), 0)
+
+        generations.bump('test.statistics.first')
+        self.assertEqual(models.StoredStatistics.objects.refresh_stale([first, second]), 1)
+        self.assertEqual((first.computed, second.computed), (2, 1))
+
+        self.age(second, 60)
+        self.assertEqual(models.StoredStatistics.objects.refresh_stale([first, second]), 1)
+        self.assertEqual((first.computed, second.computed), (2, 2))
+        self.assertEqual(models.StoredStatistics.objects.get(name='second').statistics, [{'count': 2}])
+
+    def test_get_current(self):
+        resource = TestStatistics()
+
+        # Statistics are computed when none have been stored yet.
+        self.assertEqual(models.StoredStatistics.objects.get_current(resource).statistics, [{'count': 1}])
+
+        # Stale statistics are served until they are refreshed by the periodic task.
+        generations.bump('test.statistics')
+        self.age(resource, 60)
+        self.assertEqual(models.StoredStatistics.objects.get_current(resource).statistics, [{'count': 1}])
+        self.assertEqual(resource.computed, 1)
+
+
+class StatisticsPoolResourceTest(test_runner.ResourceTestCase):
+    namespace = 'api'
+
+    def setUp(self):
+        super(StatisticsPoolResourceTest, self).setUp()
+
+        self.resource = TestStatistics()
+        pool.register(self.resource)
+
+    def tearDown(self):
+        pool.unregister(self.resource)
+
+        super(StatisticsPoolResourceTest, self).tearDown()
+
+    def get_statistics(self):
+        return dict([(statistics['name'], statistics) for statistics in self.get_list('statistics')['objects']])
+
+    def test_get_list(self):
+        # Listing statistics does not compute them.
+        self.assertEqual(self.get_statistics()['test'], {
+            u'name': u'test',
+            u'description': u'Test statistics.',
+            u'updated': None,
+            u'resource_uri': self.resource_detail_uri('statistics', 'test'),
+        })
+        self.assertEqual(self.resource.computed, 0)
+
+        stored = models.StoredStatistics.objects.refresh(self.resource)
+        self.assertEqual(self.get_statistics()['test']['updated'], stored.updated.isoformat().replace('+00:00', 'Z'))
+
+    def test_get_detail(self):
+        data = self.get_detail('statistics', 'test')
+        stored = models.StoredStatistics.objects.get(name='test')
+        self.assertEqual(data, {
+            u'name': u'test',
+            u'description': u'Test statistics.',
+            u'updated': stored.updated.isoformat().replace('+00:00', 'Z'),
+            u'header': {u'count': u'Count'},
+            u'statistics': [{u'count': 1}],
+            u'resource_uri': self.resource_detail_uri('statistics', 'test'),
+        })
+
+        # Stored statistics are served without computing them again.
+        models.StoredStatistics.objects.filter(name='test').update(updated=stored.updated - datetime.timedelta(hours=1))
+        self.assertEqual(self.get_detail('statistics', 'test')['statistics'], [{u'count': 1}])
+        self.assertEqual(self.resource.computed, 1)
@@ -1,8 +1,8 @@
 from django.core import urlresolvers
 
-from nodewatcher.core.frontend import components
+from nodewatcher.core.frontend import api, components
 
-from . import views
+from . import resources, views
 
 
 class TopologyComponent(components.FrontendComponent):
@@ -17,6 +17,9 @@ class TopologyComponent(components.FrontendComponent):
 components.pool.register(TopologyComponent)
 
 
+api.v1_api.register(resources.TopologyResource())
+
+
 components.menus.get_menu('main_menu').add(components.MenuEntry(
     label=components.ugettext_lazy("Network Topology"),
     url=urlresolvers.reverse_lazy('TopologyComponent:topology'),
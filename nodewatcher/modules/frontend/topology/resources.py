@@ -0,0 +1,96 @@
+import calendar
+import datetime
+
+from django.utils import timezone
+
+from tastypie import exceptions, fields, resources
+
+from nodewatcher.core.frontend import api
+from nodewatcher.modules.monitor.topology import models as topology_models
+
+# Identifier of the latest topology graph.
+LATEST = 'latest'
+
+
+class TopologyGraph(object):
+    """
+    Network topology graph at a point in time.
+    """
+
+    def __init__(self, timestamp=None, keyframe=False, vertices=None, edges=None):
+        self.timestamp = timestamp
+        self.keyframe = keyframe
+        self.vertices = vertices or []
+        self.edges = edges or []
+
+
+def to_timestamp(value):
+    """
+    Converts seconds since the epoch to a timezone-aware datetime instance.
+
+    :param value: Seconds since the epoch as a string
+    :return: Datetime instance
+    """
+
+    try:
+        return datetime.datetime.utcfromtimestamp(int(value)).replace(tzinfo=timezone.utc)
+    except ValueError:
+        raise exceptions.BadRequest("Invalid timestamp: '%s'" % value)
+
+
+class TopologyResource(api.CachedResourceMixin, resources.NamespacedModelMixin, resources.Resource):
+    """
+    Network topology history. Listing returns the timestamps of stored
+    snapshots, optionally limited by `start` and `end` query parameters, and
+    the detail endpoint reconstructs the graph at the given timestamp (in
+    seconds since the epoch) or at the latest snapshot.
+    """
+
+    timestamp = fields.DateTimeField(attribute='timestamp')
+    keyframe = fields.BooleanField(attribute='keyframe', use_in='list')
+    vertices = fields.ListField(attribute='vertices', use_in='detail')
+    edges = fields.ListField(attribute='edges', use_in='detail')
+
+    class Meta:
+        resource_name = 'topology'
+        object_class = TopologyGraph
+        allowed_methods = ('get',)
+        cache_generations = ('monitoring',)
+
+    def detail_uri_kwargs(self, bundle_or_obj):
+        kwargs = {}
+
+        if isinstance(bundle_or_obj, resources.Bundle):
+            obj = bundle_or_obj.obj
+        else:
+            obj = bundle_or_obj
+
+        kwargs[self._meta.detail_uri_name] = calendar.timegm(obj.timestamp.utctimetuple()) if obj.timestamp else LATEST
+        return kwargs
+
+    def get_object_list(self, request):
+        snapshots = topology_models.TopologySnapshot.objects.order_by('timestamp')
+        if 'start' in request.GET:
+            snapshots = snapshots.filter(timestamp__gte=to_timestamp(request.GET['start']))
+        if 'end' in request.GET:
+            snapshots = snapshots.filter(timestamp__lt=to_timestamp(request.GET['end']))
+
+        return [
+            TopologyGraph(timestamp=timestamp, keyframe=keyframe)
+            for timestamp, keyframe in snapshots.values_list('timestamp', 'keyframe')
+        ]
+
+    def obj_get_list(self, bundle, **kwargs):
+        return self.get_object_list(bundle.request)
+
+    def obj_get(self, bundle, **kwargs):
+        if kwargs['pk'] == LATEST:
+            timestamp = None
+        else:
+            timestamp = to_timestamp(kwargs['pk'])
+
+        timestamp, graph = topology_models.TopologySnapshot.objects.get_graph(timestamp)
+        if graph is None:
+            raise exceptions.NotFound("No topology snapshot found.")
+
+        return TopologyGraph(timestamp=timestamp, vertices=graph['v'], edges=graph['e'])
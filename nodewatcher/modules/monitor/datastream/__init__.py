@@ -0,0 +1 @@
+default_app_config = 'nodewatcher.modules.monitor.datastream.apps.DatastreamConfig'
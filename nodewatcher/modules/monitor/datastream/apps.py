@@ -0,0 +1,6 @@
+from django import apps
+
+
+class DatastreamConfig(apps.AppConfig):
+    name = 'nodewatcher.modules.monitor.datastream'
+    label = 'monitor_datastream'
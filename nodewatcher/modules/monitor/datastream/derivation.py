@@ -0,0 +1,286 @@
+import calendar
+import collections
+import datetime
+
+from django.utils import timezone
+
+import numpy
+
+from django_datastream import datastream
+
+# Derivation state that can be carried over between invocations, so that datapoints
+# may be processed in multiple batches.
+DerivationState = collections.namedtuple('DerivationState', ['timestamp', 'value'])
+
+# Value downsamplers that can be computed from derived datapoints.
+VALUE_DOWNSAMPLERS = ('mean', 'sum', 'min', 'max', 'count')
+# Time downsamplers that can be computed from derived datapoints.
+TIME_DOWNSAMPLERS = ('mean', 'first', 'last')
+
+
+def to_seconds(timestamps):
+    """
+    Converts timestamps to an array of seconds since the epoch.
+
+    :param timestamps: An iterable of datetime instances
+    :return: NumPy array of seconds
+    """
+
+    return numpy.array(
+        [calendar.timegm(ts.utctimetuple()) + ts.microsecond / 1e6 for ts in timestamps],
+        dtype=numpy.float64,
+    )
+
+
+def from_seconds(seconds):
+    """
+    Converts seconds since the epoch to a timezone-aware datetime instance.
+
+    :param seconds: Seconds since the epoch
+    :return: Datetime instance
+    """
+
+    return datetime.datetime.utcfromtimestamp(seconds).replace(tzinfo=timezone.utc)
+
+
+def to_values(values):
+    """
+    Converts values to an array of floats, where missing values are NaN.
+
+    :param values: An iterable of numeric values or None
+    :return: NumPy array of values
+    """
+
+    return numpy.array([numpy.nan if value is None else value for value in values], dtype=numpy.float64)
+
+
+def counter_reset(values, state=None):
+    """
+    Computes the counter reset stream. A reset is emitted for every value which
+    is lower than the previous value. Missing values are ignored.
+
+    :param values: Array of counter values
+    :param state: Optional state from the previous invocation
+    :return: A tuple (indices, state), where indices are positions of values at
+      which a reset has been detected
+    """
+
+    valid = numpy.flatnonzero(~numpy.isnan(values))
+    if not len(valid):
+        return valid, state
+
+    current = values[valid]
+    previous = numpy.empty_like(current)
+    previous[1:] = current[:-1]
+    previous[0] = state.value if state is not None else numpy.nan
+
+    # Comparisons with NaN are always false, so the first value only causes a reset
+    # when there is a previous state.
+    with numpy.errstate(invalid='ignore'):
+        resets = valid[previous > current]
+
+    return resets, DerivationState(None, current[-1])
+
+
+def counter_derivative(timestamps, values, resets=None, max_value=None, state=None):
+    """
+    Computes the derivative of a monotonically increasing counter. The semantics
+    are the same as for the datastream 'counter_derivative' operator:
+
+    * a missing value produces a missing derivative and clears the state,
+    * a reset clears the state, so no derivative is computed over it,
+    * a decreasing value is treated as an overflow when the maximum value is
+      known, otherwise no derivative is computed,
+    * no derivative is computed for zero time difference.
+
+    Resets are applied before any values with the same timestamp.
+
+    :param timestamps: Array of value timestamps in seconds, sorted
+    :param values: Array of counter values, where missing values are NaN
+    :param resets: Optional array of reset timestamps in seconds, sorted
+    :param max_value: Optional maximum counter value
+    :param state: Optional state from the previous invocation
+    :return: A tuple (indices, derivatives, state), where indices are positions of
+      values for which a derivative datapoint is produced and derivatives are the
+      corresponding values, NaN meaning a missing value
+    """
+
+    count = len(values)
+    if not count:
+        return numpy.array([], dtype=numpy.intp), numpy.array([], dtype=numpy.float64), state
+
+    previous_t = numpy.empty(count, dtype=numpy.float64)
+    previous_v = numpy.empty(count, dtype=numpy.float64)
+    previous_t[1:] = timestamps[:-1]
+    previous_v[1:] = values[:-1]
+    if state is not None:
+        previous_t[0] = state.timestamp
+        previous_v[0] = state.value
+    else:
+        previous_t[0] = numpy.nan
+        previous_v[0] = numpy.nan
+
+    missing = numpy.isnan(values)
+    # Without a previous value the state is empty, so there is nothing to derive from.
+    valid = ~missing & ~numpy.isnan(previous_v)
+
+    if resets is not None and len(resets):
+        # A reset between the previous and the current value clears the state.
+        before = numpy.searchsorted(resets, previous_t, side='right')
+        after = numpy.searchsorted(resets, timestamps, side='right')
+        valid &= before == after
+
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        vdelta = values - previous_v
+        overflow = valid & (previous_v > values)
+        if max_value is not None:
+            vdelta[overflow] = max_value - previous_v[overflow] + values[overflow]
+        else:
+            valid &= ~overflow
+
+        tdelta = timestamps - previous_t
+        valid &= tdelta != 0
+
+        derivatives = vdelta / tdelta
+
+    # Missing values are carried over to the derived stream.
+    indices = numpy.flatnonzero(valid | missing)
+    derivatives = derivatives[indices]
+    derivatives[missing[indices]] = numpy.nan
+
+    if missing[-1]:
+        state = None
+    else:
+        state = DerivationState(timestamps[-1], values[-1])
+
+    if state is not None and resets is not None and len(resets) and resets[-1] > timestamps[-1]:
+        state = None
+
+    return indices, derivatives, state
+
+
+def downsample(timestamps, values, granularity, value_downsamplers=None, time_downsamplers=None):
+    """
+    Downsamples derived datapoints into granularity intervals.
+
+    :param timestamps: Array of datapoint timestamps in seconds, sorted
+    :param values: Array of datapoint values, where missing values are NaN
+    :param granularity: Granularity to downsample into
+    :param value_downsamplers: Optional list of value downsamplers
+    :param time_downsamplers: Optional list of time downsamplers
+    :return: A list of datapoints in the same format as returned by `get_data`
+    """
+
+    if not len(timestamps):
+        return []
+
+    value_downsamplers = [
+        downsampler for downsampler in value_downsamplers or VALUE_DOWNSAMPLERS if downsampler in VALUE_DOWNSAMPLERS
+    ]
+    time_downsamplers = [
+        downsampler for downsampler in time_downsamplers or TIME_DOWNSAMPLERS if downsampler in TIME_DOWNSAMPLERS
+    ]
+
+    duration = granularity.duration_in_seconds()
+    buckets, inverse = numpy.unique(numpy.floor(timestamps / duration).astype(numpy.int64), return_inverse=True)
+
+    present = ~numpy.isnan(values)
+    filled = numpy.where(present, values, 0.0)
+    counts = numpy.bincount(inverse, weights=present, minlength=len(buckets))
+    sums = numpy.bincount(inverse, weights=filled, minlength=len(buckets))
+    t_counts = numpy.bincount(inverse, minlength=len(buckets))
+    t_sums = numpy.bincount(inverse, weights=timestamps, minlength=len(buckets))
+
+    with numpy.errstate(invalid='ignore'):
+        minimums = numpy.full(len(buckets), numpy.inf)
+        numpy.minimum.at(minimums, inverse[present], values[present])
+        maximums = numpy.full(len(buckets), -numpy.inf)
+        numpy.maximum.at(maximums, inverse[present], values[present])
+
+    # Timestamps are sorted, so the first and last datapoint of each bucket are at its boundaries.
+    starts = numpy.searchsorted(inverse, numpy.arange(len(buckets)), side='left')
+    ends = numpy.searchsorted(inverse, numpy.arange(len(buckets)), side='right') - 1
+
+    datapoints = []
+    for bucket in xrange(len(buckets)):
+        time = {}
+        for downsampler in time_downsamplers:
+            if downsampler == 'mean':
+                seconds = t_sums[bucket] / t_counts[bucket]
+            elif downsampler == 'first':
+                seconds = timestamps[starts[bucket]]
+            else:
+                seconds = timestamps[ends[bucket]]
+
+            time[datastream.TIME_DOWNSAMPLERS[downsampler]] = from_seconds(seconds)
+
+        value = {}
+        for downsampler in value_downsamplers:
+            if downsampler == 'count':
+                value[datastream.VALUE_DOWNSAMPLERS[downsampler]] = int(counts[bucket])
+                continue
+
+            if not counts[bucket]:
+                result = None
+            elif downsampler == 'mean':
+                result = float(sums[bucket] / counts[bucket])
+            elif downsampler == 'sum':
+                result = float(sums[bucket])
+            elif downsampler == 'min':
+                result = float(minimums[bucket])
+            else:
+                result = float(maximums[bucket])
+
+            value[datastream.VALUE_DOWNSAMPLERS[downsampler]] = result
+
+        datapoints.append({'t': time, 'v': value})
+
+    return datapoints
+
+
+def _get_source_data(stream_id, granularity, start, end):
+    timestamps = []
+    values = []
+    for datapoint in datastream.get_data(stream_id=stream_id, granularity=granularity, start=start, end=end):
+        timestamps.append(datapoint['t'])
+        values.append(datapoint['v'])
+
+    return to_seconds(timestamps), to_values(values)
+
+
+def get_rate_datapoints(stream, granularity, start, end):
+    """
+    Computes datapoints of a 'counter_derivative' derived stream directly from
+    its source streams. This may be used while the derived stream itself is
+    still pending backprocessing.
+
+    :param stream: Derived stream descriptor
+    :param granularity: Granularity
+    :param start: Time span start
+    :param end: Time span end
+    :return: A list of datapoints
+    """
+
+    derived_from = stream.derived_from
+    reset_stream_id, data_stream_id = derived_from['stream_ids']
+    max_value = derived_from['args'].get('max_value', None)
+
+    timestamps, values = _get_source_data(data_stream_id, stream.highest_granularity, start, end)
+    resets, _ = _get_source_data(reset_stream_id, stream.highest_granularity, start, end)
+    indices, derivatives, _ = counter_derivative(timestamps, values, resets, max_value)
+    timestamps = timestamps[indices]
+
+    if granularity == stream.highest_granularity:
+        return [
+            {'t': from_seconds(seconds), 'v': None if numpy.isnan(value) else float(value)}
+            for seconds, value in zip(timestamps, derivatives)
+        ]
+
+    visualization = stream.tags.get('visualization', {})
+    return downsample(
+        timestamps,
+        derivatives,
+        granularity,
+        value_downsamplers=visualization.get('value_downsamplers', None),
+        time_downsamplers=visualization.get('time_downsamplers', None),
+    )
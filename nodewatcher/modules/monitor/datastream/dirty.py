@@ -0,0 +1,120 @@
+import collections
+import heapq
+
+from django_datastream import datastream
+
+from . import models
+
+
+class DirtyStreamTracker(object):
+    """
+    A wrapper around the datastream API which records all streams that have
+    received new datapoints, so that only those need to be downsampled.
+    """
+
+    def __init__(self, stream):
+        """
+        Class constructor.
+
+        :param stream: Stream API instance to wrap
+        """
+
+        self._stream = stream
+        self._appended = collections.Counter()
+        self._derived = {}
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+    def ensure_stream(self, query_tags, tags, value_downsamplers, highest_granularity, derive_from=None, derive_op=None,
+                      derive_args=None, value_type=None, value_type_options=None):
+        """
+        Creates a stream and returns its identifier. Derived streams are recorded
+        together with their source streams.
+        """
+
+        stream_id = self._stream.ensure_stream(
+            query_tags,
+            tags,
+            value_downsamplers,
+            highest_granularity,
+            derive_from=derive_from,
+            derive_op=derive_op,
+            derive_args=derive_args,
+            value_type=value_type,
+            value_type_options=value_type_options,
+        )
+
+        if derive_from:
+            self._derived[stream_id] = [source['stream'] for source in derive_from]
+
+        return stream_id
+
+    def append(self, stream_id, value, timestamp=None, check_timestamp=True):
+        """
+        Appends a datapoint into the stream and marks the stream as dirty.
+        """
+
+        result = self._stream.append(stream_id, value, timestamp=timestamp, check_timestamp=check_timestamp)
+        self._appended[stream_id] += 1
+        return result
+
+    def get_dirty_streams(self):
+        """
+        Returns all streams that have received new datapoints. Derived streams
+        are dirty whenever any of their source streams are dirty.
+
+        :return: A dictionary mapping stream identifiers to the number of datapoints
+        """
+
+        dirty = collections.Counter(self._appended)
+
+        # Derived streams may themselves be sources of other derived streams.
+        changed = True
+        while changed:
+            changed = False
+            for stream_id, sources in self._derived.items():
+                if stream_id in dirty:
+                    continue
+
+                count = max([dirty.get(source, 0) for source in sources])
+                if count:
+                    dirty[stream_id] = count
+                    changed = True
+
+        return dict(dirty)
+
+
+def partition_streams(streams, partitions):
+    """
+    Partitions dirty streams so that the total backlog of each partition is
+    approximately the same.
+
+    :param streams: A list of (stream_id, latest_datapoint, backlog) tuples
+    :param partitions: Number of partitions
+    :return: A list of partitions, each being a list of stream tuples
+    """
+
+    result = [[] for _ in xrange(partitions)]
+    heap = [(0, index) for index in xrange(partitions)]
+
+    # Assign streams with the largest backlog first, always to the least loaded partition.
+    for stream in sorted(streams, key=lambda stream: stream[2], reverse=True):
+        load, index = heapq.heappop(heap)
+        result[index].append(stream)
+        heapq.heappush(heap, (load + max(stream[2], 1), index))
+
+    return result
+
+
+def downsample_streams(streams, until):
+    """
+    Downsamples the given dirty streams.
+
+    :param streams: A list of (stream_id, latest_datapoint, backlog) tuples
+    :param until: Timestamp until which to downsample
+    """
+
+    for stream_id, latest_datapoint, backlog in streams:
+        datastream.downsample_streams(query_tags={'stream_id': stream_id}, until=until)
+        models.DirtyStream.objects.downsampled(stream_id, latest_datapoint, until)
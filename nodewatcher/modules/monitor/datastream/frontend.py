@@ -2,17 +2,19 @@ import datetime
 
 from django.utils import timezone
 
-from tastypie import resources
+from tastypie import resources as tastypie_resources
 
 from django_datastream import urls
 
 from nodewatcher.core.frontend import api, components
 from nodewatcher.core.registry import exceptions as registry_exceptions
 
+from . import resources
+
 
 def register_resource(resource):
     # We have to make a resource which is namespaced for resource_uri to be correctly generated.
-    class Resource(resources.NamespacedModelMixin, resource.__class__):
+    class Resource(api.CachedResourceMixin, tastypie_resources.NamespacedModelMixin, resource.__class__):
         pass
 
     api.v1_api.register(Resource())
@@ -20,6 +22,8 @@ def register_resource(resource):
 for resource in urls.v1_api._registry.values():
     register_resource(resource)
 
+api.v1_api.register(resources.NodeGraphsResource())
+
 
 def extra_context(context):
     # Get the node's local timezone using the location schema.
@@ -0,0 +1,145 @@
+import calendar
+import datetime
+
+from django.core import cache
+from django.utils import timezone
+
+from django_datastream import datastream
+
+from . import derivation
+
+# Default number of datapoints per stream that should be returned for a time span.
+DEFAULT_POINTS = 300
+# Maximum number of datapoints per stream that may be requested for a time span.
+MAX_POINTS = 1000
+# Default time span of returned datapoints.
+DEFAULT_SPAN = datetime.timedelta(days=1)
+# Datapoints older than this are considered stable as they have already been downsampled.
+STABLE_AGE = datetime.timedelta(days=2)
+# Cache timeout for stable datapoints.
+STABLE_CACHE_TIMEOUT = 24 * 60 * 60
+# Cache timeout for recent datapoints, which may still change.
+RECENT_CACHE_TIMEOUT = 60
+
+
+def get_granularity(start, end, points):
+    """
+    Chooses the highest granularity at which the given time span contains at
+    most the given number of datapoints.
+
+    :param start: Time span start
+    :param end: Time span end
+    :param points: Maximum number of datapoints
+    :return: Granularity
+    """
+
+    span = (end - start).total_seconds()
+
+    # Granularities are ordered from the highest to the lowest one.
+    granularity = datastream.Granularity.values[-1]
+    for candidate in reversed(datastream.Granularity.values):
+        if span / candidate.duration_in_seconds() > points:
+            break
+
+        granularity = candidate
+
+    return granularity
+
+
+def get_bucket(granularity, start, end):
+    """
+    Expands a time span to whole granularity intervals, so that slightly
+    different time spans share the same cached datapoints.
+
+    :param granularity: Granularity
+    :param start: Time span start
+    :param end: Time span end
+    :return: A tuple (start, end) of the expanded time span
+    """
+
+    bucket_start = granularity.round_timestamp(start)
+    bucket_end = granularity.round_timestamp(end)
+    if bucket_end < end:
+        bucket_end += datetime.timedelta(seconds=granularity.duration_in_seconds())
+
+    return bucket_start, bucket_end
+
+
+def get_datapoints(stream, granularity, start, end):
+    """
+    Returns datapoints of a stream, using the cache when possible.
+
+    :param stream: Stream descriptor
+    :param granularity: Granularity
+    :param start: Time span start
+    :param end: Time span end
+    :return: A list of datapoints
+    """
+
+    start, end = get_bucket(granularity, start, end)
+
+    # Rates of streams which are still waiting to be backprocessed are computed from
+    # their source counters, so that graphs are available immediately.
+    derived_from = getattr(stream, 'derived_from', None)
+    if stream.pending_backprocess and derived_from and derived_from['op'] == 'counter_derivative':
+        return derivation.get_rate_datapoints(stream, granularity, start, end)
+
+    key = 'nodewatcher.datastream.graphs.%s.%s.%d.%d' % (
+        stream.id,
+        granularity.key,
+        calendar.timegm(start.utctimetuple()),
+        calendar.timegm(end.utctimetuple()),
+    )
+
+    datapoints = cache.cache.get(key)
+    if datapoints is not None:
+        return datapoints
+
+    # Value downsamplers are the ones rendered by the node graphs frontend, which renders
+    # returned datapoints directly. Mean values are always included when available.
+    visualization = stream.tags.get('visualization', {})
+    value_downsamplers = list(visualization.get('value_downsamplers', []))
+    if 'mean' in stream.value_downsamplers and 'mean' not in value_downsamplers:
+        value_downsamplers.append('mean')
+
+    datapoints = list(datastream.get_data(
+        stream_id=stream.id,
+        granularity=granularity,
+        start=start,
+        end=end,
+        value_downsamplers=value_downsamplers or None,
+        time_downsamplers=visualization.get('time_downsamplers', None),
+    ))
+
+    if end < timezone.now() - STABLE_AGE:
+        timeout = STABLE_CACHE_TIMEOUT
+    else:
+        timeout = RECENT_CACHE_TIMEOUT
+
+    cache.cache.set(key, datapoints, timeout)
+    return datapoints
+
+
+def get_node_graphs(node, start, end, points=DEFAULT_POINTS):
+    """
+    Returns all streams of a node that are part of the initial visualization set
+    together with their datapoints at a granularity appropriate for the given
+    time span.
+
+    :param node: Node instance
+    :param start: Time span start
+    :param end: Time span end
+    :param points: Maximum number of datapoints per stream
+    :return: A tuple (granularity, streams), where streams is a list of stream
+      descriptors with an additional `datapoints` attribute
+    """
+
+    granularity = get_granularity(start, end, points)
+
+    streams = []
+    for tags in datastream.find_streams({'node': node.pk, 'visualization': {'initial_set': True}}):
+        stream = datastream.Stream(tags)
+        stream.datapoints = get_datapoints(stream, granularity, start, end)
+        streams.append(stream)
+
+    return granularity, streams
@@ -1,3 +1,5 @@
+from optparse import make_option
+
 from django.core.management import base
 
 from ... import tasks
@@ -6,6 +8,15 @@ from ... import tasks
 class Command(base.BaseCommand):
     help = "Requests the datastream backend to perform downsampling."
     requires_model_validation = True
+    option_list = base.BaseCommand.option_list + (
+        make_option(
+            '--all',
+            action='store_true',
+            dest='all',
+            default=False,
+            help='Downsample all streams instead of only the ones that have received new datapoints',
+        ),
+    )
 
     def handle(self, *args, **options):
-        tasks.run_downsampling()
+        tasks.run_downsampling(full=options['all'])
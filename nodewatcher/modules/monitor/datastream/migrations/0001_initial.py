@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirtyStream',
+            fields=[
+                ('stream_id', models.CharField(max_length=36, serialize=False, primary_key=True)),
+                ('backlog', models.PositiveIntegerField(default=0)),
+                ('latest_datapoint', models.DateTimeField()),
+                ('due', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
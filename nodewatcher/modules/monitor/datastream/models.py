@@ -1,4 +1,8 @@
-from django import dispatch
+import collections
+import datetime
+
+from django import db, dispatch
+from django.db import models as django_models, transaction
 from django.db.models import signals as django_signals
 from django.utils.translation import gettext_noop
 
@@ -12,6 +16,121 @@ from nodewatcher.core.monitor import models
 from . import base, fields
 from .pool import pool
 
+# Number of seconds that the datastream backend waits before it considers recently
+# appended datapoints to be safe for downsampling.
+DOWNSAMPLE_SAFETY_MARGIN = 10
+
+
+def get_next_downsample(latest_datapoint, until):
+    """
+    Computes when a stream will next require downsampling, after it has been
+    downsampled until a given timestamp.
+
+    :param latest_datapoint: Timestamp of the latest datapoint in the stream
+    :param until: Timestamp until which the stream has been downsampled
+    :return: Timestamp when the stream should be downsampled again or None in
+      case all of the stream's datapoints have already been downsampled
+    """
+
+    until -= datetime.timedelta(seconds=DOWNSAMPLE_SAFETY_MARGIN)
+
+    # Granularities are ordered from the highest to the lowest one. The first
+    # granularity which still has an open window containing the latest datapoint
+    # determines when downsampling will next produce new datapoints.
+    for granularity in datastream.Granularity.values[1:]:
+        window_start = granularity.round_timestamp(until)
+        if latest_datapoint >= window_start:
+            return window_start + datetime.timedelta(seconds=granularity.duration_in_seconds())
+
+    return None
+
+
+class DirtyStreamManager(django_models.Manager):
+    def mark(self, streams, timestamp):
+        """
+        Marks streams as having received new datapoints.
+
+        :param streams: A dictionary mapping stream identifiers to the number of
+          datapoints that have been appended
+        :param timestamp: Timestamp of the appended datapoints
+        """
+
+        if not streams:
+            return
+
+        existing = set(self.filter(stream_id__in=streams.keys()).values_list('stream_id', flat=True))
+
+        # Group updates by the number of appended datapoints to minimize the number of queries.
+        updates = collections.defaultdict(list)
+        for stream_id in existing:
+            updates[streams[stream_id]].append(stream_id)
+
+        for count, stream_ids in updates.items():
+            self.filter(stream_id__in=stream_ids).update(
+                backlog=django_models.F('backlog') + count,
+                latest_datapoint=timestamp,
+                due=timestamp,
+            )
+
+        missing = dict([(stream_id, count) for stream_id, count in streams.items() if stream_id not in existing])
+        if not missing:
+            return
+
+        try:
+            with transaction.atomic():
+                self.bulk_create([
+                    self.model(stream_id=stream_id, backlog=count, latest_datapoint=timestamp, due=timestamp)
+                    for stream_id, count in missing.items()
+                ])
+        except db.IntegrityError:
+            # Some streams have been marked concurrently, so they can now simply be updated.
+            self.mark(missing, timestamp)
+
+    def pending(self, until):
+        """
+        Returns a list of streams that require downsampling.
+
+        :param until: Timestamp until which downsampling will be performed
+        :return: A list of (stream_id, latest_datapoint, backlog) tuples
+        """
+
+        return list(self.filter(due__lte=until).values_list('stream_id', 'latest_datapoint', 'backlog'))
+
+    def downsampled(self, stream_id, latest_datapoint, until):
+        """
+        Records that a stream has been downsampled. In case the stream has received
+        new datapoints in the meantime, the stream is kept dirty.
+
+        :param stream_id: Stream identifier
+        :param latest_datapoint: Timestamp of the latest datapoint as obtained
+          before downsampling
+        :param until: Timestamp until which the stream has been downsampled
+        """
+
+        streams = self.filter(stream_id=stream_id, latest_datapoint=latest_datapoint)
+        due = get_next_downsample(latest_datapoint, until)
+        if due is None:
+            streams.delete()
+        else:
+            streams.update(backlog=0, due=due)
+
+
+class DirtyStream(django_models.Model):
+    """
+    A stream that has received datapoints which have not yet been fully
+    downsampled.
+    """
+
+    stream_id = django_models.CharField(max_length=36, primary_key=True)
+    backlog = django_models.PositiveIntegerField(default=0)
+    latest_datapoint = django_models.DateTimeField()
+    due = django_models.DateTimeField(db_index=True)
+
+    objects = DirtyStreamManager()
+
+    def __repr__(self):
+        return '<DirtyStream \'%s\'>' % self.stream_id
+
 
 class RegistryItemStreams(base.StreamsBase):
     """
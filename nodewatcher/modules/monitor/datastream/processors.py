@@ -1,13 +1,14 @@
 import datetime
 
 from django.db.models import signals as model_signals
+from django.utils import timezone
 
 from django_datastream import datastream
 
 from nodewatcher.core.monitor import processors as monitor_processors
 from nodewatcher.core.registry import registration
 
-from . import exceptions
+from . import dirty, exceptions, models, writebehind
 from .pool import pool
 
 
@@ -56,16 +57,39 @@ class TrackRegistryModels(monitor_processors.NodeProcessor):
 
 
 class DatastreamBase(object):
-    def process_context(self, context):
+    def process_context(self, context, key=None):
         """
         Processes streams.
 
         :param context: Current context
+        :param key: Optional key identifying the source of datapoints, so that
+          their writes are kept in order
         """
 
         # Use the same timestamp for all datapoints of this node.
         now = datetime.datetime.utcnow()
 
+        if writebehind.ENABLED and not writebehind.is_congested():
+            # Record operations and leave writing to the write-behind consumer.
+            recorder = writebehind.WriteBehindStream()
+            self.insert_items(context, recorder, now)
+            writebehind.enqueue(recorder, now, key)
+            return
+
+        # Track streams which receive new datapoints, so they can be downsampled.
+        tracker = dirty.DirtyStreamTracker(datastream)
+        self.insert_items(context, tracker, now)
+        models.DirtyStream.objects.mark(tracker.get_dirty_streams(), timezone.make_aware(now, timezone.utc))
+
+    def insert_items(self, context, stream, timestamp):
+        """
+        Inserts all items with registered stream descriptors.
+
+        :param context: Current context
+        :param stream: Stream API instance
+        :param timestamp: Datapoint timestamp
+        """
+
         processed_items = set()
         for items in context.datastream.values():
             if isinstance(items, dict):
@@ -82,7 +106,7 @@ class DatastreamBase(object):
 
                 try:
                     descriptor = pool.get_descriptor(item)
-                    descriptor.insert_to_stream(datastream, timestamp=now)
+                    descriptor.insert_to_stream(stream, timestamp=timestamp)
                     pool.clear_descriptor(item)
                 except exceptions.StreamDescriptorNotRegistered:
                     continue
@@ -102,7 +126,7 @@ class NodeDatastream(DatastreamBase, monitor_processors.NodeProcessor):
         :return: A (possibly) modified context
         """
 
-        self.process_context(context)
+        self.process_context(context, str(node.uuid))
         return context
 
 
@@ -148,17 +172,18 @@ class MaintenanceBackprocess(monitor_processors.NetworkProcessor):
         return context, nodes
 
 
-def _maintenance_downsample_worker(worker_id, num_workers):
+def _maintenance_downsample_worker(streams, until):
     """
     Helper function proxy that can be called by the worker pool.
     """
 
-    datastream.downsample_streams(filter_stream=lambda stream: stream.id % num_workers == worker_id)
+    dirty.downsample_streams(streams, until)
 
 
 class MaintenanceDownsample(monitor_processors.NetworkProcessor):
     """
-    Datastream downsampling maintenance processor.
+    Datastream downsampling maintenance processor. Only streams that have received
+    new datapoints are downsampled.
     """
 
     requires_transaction = False
@@ -173,13 +198,27 @@ class MaintenanceDownsample(monitor_processors.NetworkProcessor):
         :return: A (possibly) modified context and a (possibly) modified set of nodes
         """
 
-        # Downsample streams using multiple workers in parallel.
+        until = timezone.now()
+        streams = models.DirtyStream.objects.pending(until)
+        if not streams:
+            self.logger.info("No streams need downsampling.")
+            return context, nodes
+
+        # Downsample streams using multiple workers in parallel, distributing the streams
+        # among workers based on the number of datapoints that each stream has received.
         results = []
         workers = self.get_worker_pool()
         num_workers = workers._processes
-        self.logger.info("Downsampling streams with %d workers..." % num_workers)
-        for worker in xrange(num_workers):
-            results.append(workers.apply_async(_maintenance_downsample_worker, [worker, num_workers]))
+        self.logger.info("Downsampling %d streams (%d datapoints) with %d workers..." % (
+            len(streams),
+            sum([backlog for stream_id, latest_datapoint, backlog in streams]),
+            num_workers,
+        ))
+        for partition in dirty.partition_streams(streams, num_workers):
+            if not partition:
+                continue
+
+            results.append(workers.apply_async(_maintenance_downsample_worker, [partition, until]))
 
         for result in results:
             result.get()
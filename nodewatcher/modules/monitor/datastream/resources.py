@@ -0,0 +1,113 @@
+import datetime
+
+from django.utils import timezone
+
+from tastypie import bundle as tastypie_bundle, exceptions, fields, resources
+
+from django_datastream import resources as datastream_resources, serializers
+
+from nodewatcher.core import models as core_models
+from nodewatcher.core.frontend import api
+
+from . import graphs
+
+QUERY_POINTS = 'points'
+
+
+class NodeGraphs(object):
+    """
+    Initial set of graphs for a node.
+    """
+
+    def __init__(self, node=None, granularity=None, start=None, end=None, streams=None):
+        self.node = node
+        self.granularity = granularity
+        self.start = start
+        self.end = end
+        self.streams = streams or []
+
+
+class NodeGraphsResource(api.CachedResourceMixin, resources.NamespacedModelMixin, datastream_resources.BaseResource):
+    """
+    Returns all streams in the initial visualization set of a node together
+    with their datapoints, so that node graphs can be rendered with a single
+    request.
+    """
+
+    node = fields.CharField(attribute='node', readonly=True)
+    granularity = fields.CharField(attribute='granularity', readonly=True)
+    start = fields.DateTimeField(attribute='start', readonly=True)
+    end = fields.DateTimeField(attribute='end', readonly=True)
+    streams = fields.ListField(attribute='streams', readonly=True)
+
+    class Meta:
+        resource_name = 'node_graphs'
+        object_class = NodeGraphs
+        list_allowed_methods = ()
+        detail_allowed_methods = ('get',)
+        serializer = serializers.DatastreamSerializer()
+
+    def detail_uri_kwargs(self, bundle_or_obj):
+        kwargs = {}
+
+        if isinstance(bundle_or_obj, tastypie_bundle.Bundle):
+            kwargs[self._meta.detail_uri_name] = bundle_or_obj.obj.node
+        else:
+            kwargs[self._meta.detail_uri_name] = bundle_or_obj.node
+
+        return kwargs
+
+    def _get_timestamp(self, request, name, default):
+        if name not in request.GET:
+            return default
+
+        try:
+            return datetime.datetime.utcfromtimestamp(int(request.GET[name])).replace(tzinfo=timezone.utc)
+        except ValueError:
+            raise datastream_resources.InvalidRange("Invalid timestamp: '%s'" % request.GET[name])
+
+    def _get_points(self, request):
+        try:
+            points = int(request.GET.get(QUERY_POINTS, graphs.DEFAULT_POINTS))
+        except ValueError:
+            raise exceptions.BadRequest("Invalid number of points: '%s'" % request.GET[QUERY_POINTS])
+
+        if points <= 0:
+            raise exceptions.BadRequest("Number of points must be a positive integer.")
+
+        return min(points, graphs.MAX_POINTS)
+
+    def obj_get(self, bundle, **kwargs):
+        try:
+            node = core_models.Node.objects.get(pk=kwargs['pk'])
+        except (core_models.Node.DoesNotExist, ValueError):
+            raise exceptions.NotFound("Node '%s' not found." % kwargs['pk'])
+
+        request = bundle.request
+        end = self._get_timestamp(request, datastream_resources.QUERY_END, timezone.now())
+        start = self._get_timestamp(request, datastream_resources.QUERY_START, end - graphs.DEFAULT_SPAN)
+        if start >= end:
+            raise datastream_resources.InvalidRange("Time range start must be before its end.")
+
+        granularity, streams = graphs.get_node_graphs(node, start, end, self._get_points(request))
+
+        return NodeGraphs(
+            node=str(node.pk),
+            granularity=granularity.name,
+            start=start,
+            end=end,
+            streams=[
+                {
+                    'id': stream.id,
+                    'tags': stream.tags,
+                    'value_type': stream.value_type,
+                    'value_downsamplers': stream.value_downsamplers,
+                    'time_downsamplers': stream.time_downsamplers,
+                    'highest_granularity': stream.highest_granularity.name,
+                    'earliest_datapoint': stream.earliest_datapoint,
+                    'latest_datapoint': stream.latest_datapoint,
+                    'datapoints': stream.datapoints,
+                }
+                for stream in streams
+            ],
+        )
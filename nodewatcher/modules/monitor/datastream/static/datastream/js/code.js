@@ -1,15 +1,407 @@
 (function ($) {
+    // Series types used to render supported visualizations. Keys are value downsampler keys in datapoints.
+    function getSeriesTypes(visualization) {
+        var downsamplers = visualization.value_downsamplers || [];
+        var has = function (downsampler) {return _.contains(downsamplers, downsampler);};
+
+        if (visualization.type === 'line' && has('min') && has('max') && !has('mean')) {
+            return {'main': [{'type': 'areasplinerange', 'keys': ['l', 'u']}], 'range': [], 'flag': []};
+        }
+        else if (visualization.type === 'line' && has('mean')) {
+            var range = [];
+            if (has('min') && has('max')) range = [{'type': 'areasplinerange', 'keys': ['l', 'u']}];
+            else if (has('max')) range = [{'type': 'areasplinerange', 'keys': ['m', 'u']}];
+            else if (has('min')) range = [{'type': 'areasplinerange', 'keys': ['l', 'm']}];
+
+            return {'main': [{'type': 'spline', 'keys': ['m']}], 'range': range, 'flag': []};
+        }
+        else if (visualization.type === 'stack' && has('mean')) {
+            return {'main': [{'type': 'areaspline', 'keys': ['m']}], 'range': [], 'flag': []};
+        }
+        else if (visualization.type === 'event') {
+            return {'main': [], 'range': [], 'flag': [{'type': 'flags', 'keys': ['c']}]};
+        }
+
+        return null;
+    }
+
+    function parseFloatValue(value) {
+        // Missing values have to be null and not NaN, so that Highcharts renders them as gaps.
+        return value == null ? null : parseFloat(value);
+    }
+
+    // Stream is "with" another stream when all its "with" tags match tags of the other stream. Such
+    // streams are rendered in the same chart.
+    function isWith(stream, other) {
+        var visualization = stream.tags.visualization;
+        var otherVisualization = other.tags.visualization;
+
+        if (stream.id === other.id || !visualization.with) return false;
+
+        for (var key in visualization.with) {
+            if (!visualization.with.hasOwnProperty(key)) continue;
+            if (!_.isEqual(visualization.with[key], other.tags[key])) return false;
+        }
+
+        // Events can be displayed alongside any stream.
+        if (visualization.type === 'event' || otherVisualization.type === 'event') return true;
+
+        return visualization.minimum === otherVisualization.minimum && visualization.maximum === otherVisualization.maximum && visualization.unit === otherVisualization.unit;
+    }
+
+    // Groups streams into charts. Streams which are "with" some other streams but those are not "with" them
+    // back (like events) do not get their own charts, but are added to all matching charts.
+    function groupStreams(streams) {
+        var charts = [];
+
+        function matchingCharts(stream) {
+            return _.filter(charts, function (chart) {
+                return _.every(chart, function (other) {return isWith(other, stream) || isWith(stream, other);});
+            });
+        }
+
+        _.each(streams, function (stream) {
+            var withMultiple = _.some(streams, function (other) {return isWith(stream, other) && !isWith(other, stream);});
+            if (!withMultiple && !matchingCharts(stream).length) charts.push([stream]);
+        });
+        _.each(streams, function (stream) {
+            _.each(matchingCharts(stream), function (chart) {chart.push(stream);});
+        });
+
+        return charts;
+    }
+
+    function getYAxisTitle(stream) {
+        // Event streams do not have units, so their axis is prefixed not to match any other axis by accident.
+        if (stream.tags.visualization.type === 'event') return 'Event: ' + stream.tags.visualization.label;
+
+        var title = [];
+        if (stream.tags.unit_description) title.push(stream.tags.unit_description);
+        if (stream.tags.unit) title.push("[" + stream.tags.unit + "]");
+
+        return title.join(" ");
+    }
+
+    // Converts datapoints of a stream into data of its series.
+    function convertDatapoints(stream, datapoints) {
+        var data = {
+            'main': _.map(stream.types.main, function () {return [];}),
+            'range': _.map(stream.types.range, function () {return [];}),
+            'flag': _.map(stream.types.flag, function () {return [];})
+        };
+
+        _.each(datapoints, function (datapoint) {
+            var t = moment.utc(_.isObject(datapoint.t) ? datapoint.t.m : datapoint.t).valueOf();
+            var value = function (key) {return _.isObject(datapoint.v) ? datapoint.v[key] : datapoint.v;};
+
+            _.each(['main', 'range'], function (kind) {
+                _.each(stream.types[kind], function (type, i) {
+                    data[kind][i].push([t].concat(_.map(type.keys, function (key) {return parseFloatValue(value(key));})));
+                });
+            });
+            _.each(stream.types.flag, function (type, i) {
+                if (value('c') > 0) {
+                    data.flag[i].push({'x': t, 'title': stream.tags.visualization.label, 'text': stream.tags.visualization.message});
+                }
+            });
+        });
+
+        return data;
+    }
+
+    // Renders node graphs from the batched node graphs endpoint. Initial datapoints of all streams are
+    // fetched with one request and changing the viewport of any chart loads datapoints of all charts
+    // with one request as well.
+    function NodeGraphs(element, source) {
+        var self = this;
+
+        self.$element = $(element);
+        self.source = source;
+        self.charts = [];
+        self.request = null;
+    }
+
+    // start and end arguments are in milliseconds. Callback is called with null if loading failed.
+    NodeGraphs.prototype.load = function (start, end, callback) {
+        var self = this;
+
+        var data = {};
+        // Using != on purpose.
+        if (start != null && end != null) {
+            data = {
+                'start': Math.floor(start / 1000),
+                'end': Math.ceil(end / 1000)
+            };
+        }
+
+        // Only the latest viewport is rendered.
+        if (self.request) self.request.abort();
+
+        self.request = $.ajax({
+            'dataType': 'json',
+            'url': self.source,
+            'data': data
+        }).done(function (graphs) {
+            self.request = null;
+            callback(graphs);
+        }).fail(function (jqXHR, textStatus) {
+            self.request = null;
+            // Aborted requests are superseded by a later one.
+            if (textStatus !== 'abort') callback(null);
+        });
+    };
+
+    NodeGraphs.prototype.start = function () {
+        var self = this;
+
+        self.load(null, null, function (graphs) {
+            // Do nothing on errors, Ajax errors should be handled globally.
+            if (graphs) self.render(graphs);
+        });
+    };
+
+    NodeGraphs.prototype.render = function (graphs) {
+        var self = this;
+
+        var streams = [];
+        _.each(graphs.streams, function (stream) {
+            if (!(stream.tags && stream.tags.visualization)) return;
+
+            stream.types = getSeriesTypes(stream.tags.visualization);
+            if (!stream.types) {
+                console.warn("Unsupported visualization of stream '" + stream.id + "'", stream.tags.visualization);
+                return;
+            }
+
+            streams.push(stream);
+        });
+
+        // Navigators span all datapoints of all streams, so that any viewport can be selected.
+        var timestamps = _.map(_.compact(_.flatten(_.map(streams, function (stream) {return [stream.earliest_datapoint, stream.latest_datapoint];}))), function (timestamp) {return moment.utc(timestamp).valueOf();});
+        var extremes = timestamps.length ? [_.min(timestamps), _.max(timestamps)] : null;
+
+        // Removes existing content (like loading message).
+        self.$element.empty();
+
+        _.each(groupStreams(streams), function (chartStreams) {
+            self.charts.push(self.createChart(chartStreams, extremes));
+        });
+        self.update(graphs);
+    };
+
+    NodeGraphs.prototype.createChart = function (streams, extremes) {
+        var self = this;
+
+        var highcharts = new Highcharts.StockChart({
+            'chart': {
+                'zoomType': 'x',
+                'borderRadius': 10,
+                'renderTo': $('<div/>').addClass('chart').appendTo(self.$element).get(0)
+            },
+            'credits': {
+                'enabled': false
+            },
+            'navigator': {
+                'enabled': true,
+                'adaptToUpdatedData': false,
+                'series': {
+                    'id': 'navigator',
+                    'data': []
+                },
+                'yAxis': {
+                    'showRects': false
+                }
+            },
+            'scrollbar': {
+                'enabled': true,
+                'liveRedraw': false
+            },
+            'legend': {
+                'enabled': true,
+                'verticalAlign': 'bottom',
+                'floating': false,
+                'padding': 5
+            },
+            'tooltip': {
+                'valueDecimals': 2,
+                'shared': true
+            },
+            'rangeSelector': {
+                'buttonTheme': {
+                    'width': 50
+                },
+                'buttons': [
+                    {'type': 'day', 'count': 1, 'text': "day"},
+                    {'type': 'week', 'count': 1, 'text': "week"},
+                    {'type': 'month', 'count': 1, 'text': "month"},
+                    {'type': 'year', 'count': 1, 'text': "year"},
+                    {'type': 'all', 'text': "all"}
+                ],
+                'inputEnabled': false
+            },
+            'xAxis': {
+                'id': 'x-axis',
+                'ordinal': false,
+                'events': {
+                    'afterSetExtremes': function (event) {
+                        // Only viewports changed by the user are loaded, datapoints of all charts are then updated together.
+                        if (event.trigger !== 'syncing') self.setViewport(event.min, event.max, highcharts);
+                    }
+                }
+            },
+            'yAxis': [],
+            'plotOptions': {
+                'series': {
+                    'marker': {
+                        'enabled': true,
+                        'radius': 3
+                    },
+                    'dataGrouping': {
+                        'enabled': false
+                    }
+                },
+                // areaspline type is used only for stacked streams.
+                'areaspline': {
+                    'stacking': 'normal'
+                }
+            },
+            'series': []
+        });
+
+        _.each(streams, function (stream) {
+            var title = getYAxisTitle(stream);
+            var event = stream.tags.visualization.type === 'event';
+            var yAxis = highcharts.get('y-axis-' + title);
+
+            if (!yAxis) {
+                highcharts.addAxis({
+                    'id': 'y-axis-' + title,
+                    // Event axes are only used to position flags.
+                    'title': {'text': event ? null : title},
+                    'labels': {'enabled': !event},
+                    'showEmpty': false,
+                    'min': stream.tags.visualization.minimum,
+                    'max': stream.tags.visualization.maximum,
+                    'showRects': !event
+                // Do not redraw.
+                }, false, false);
+            }
+
+            // The first series of a stream, other series are linked to it.
+            var first = null;
+            _.each(['range', 'main', 'flag'], function (kind) {
+                _.each(stream.types[kind], function (type, i) {
+                    var options = {
+                        'id': kind + '-' + i + '-' + stream.id,
+                        'name': stream.tags.title,
+                        // Has to be undefined and cannot be null.
+                        'linkedTo': first ? first.options.id : undefined,
+                        'yAxis': 'y-axis-' + title,
+                        'type': type.type,
+                        'data': []
+                    };
+
+                    if (kind === 'flag') {
+                        _.extend(options, {
+                            'showInLegend': false,
+                            'showRects': false,
+                            'color': 'black',
+                            'shape': 'squarepin',
+                            'zIndex': 100
+                        });
+                    }
+                    else {
+                        _.extend(options, {
+                            'color': first ? first.color : null,
+                            'showRects': !first,
+                            'visible': !stream.tags.visualization.hidden,
+                            'tooltip': {
+                                'pointFormat': kind === 'range' ?
+                                    '<span style="color:{series.color}">{series.name} min/max</span>: <b>{point.low}</b> - <b>{point.high}</b><br/>' :
+                                    '<span style="color:{series.color}">{series.name} mean</span>: <b>{point.y}</b><br/>'
+                            }
+                        });
+                        if (kind === 'range') {
+                            _.extend(options, {
+                                'lineWidth': 0,
+                                'fillOpacity': 0.3
+                            });
+                        }
+                    }
+
+                    // Do not redraw.
+                    var series = highcharts.addSeries(options, false);
+                    first = first || series;
+                });
+            });
+        });
+
+        // Navigator data is padded with empty points at the extremes of all datapoints, so that viewports
+        // outside of loaded datapoints can be selected.
+        if (extremes) highcharts.get('navigator').setData([[extremes[0], null], [extremes[1], null]], false);
+
+        return {'highcharts': highcharts, 'streams': streams, 'hasNavigatorData': false};
+    };
+
+    NodeGraphs.prototype.update = function (graphs) {
+        var self = this;
+
+        var datapoints = {};
+        _.each(graphs.streams, function (stream) {
+            datapoints[stream.id] = stream.datapoints;
+        });
+
+        _.each(self.charts, function (chart) {
+            _.each(chart.streams, function (stream) {
+                var data = convertDatapoints(stream, datapoints[stream.id] || []);
+
+                _.each(['main', 'range', 'flag'], function (kind) {
+                    _.each(data[kind], function (series, i) {
+                        // Do not redraw.
+                        chart.highcharts.get(kind + '-' + i + '-' + stream.id).setData(series, false);
+                    });
+                });
+
+                // Navigator shows the first loaded series of the first stream with datapoints.
+                var series = data.main[0] || data.range[0];
+                if (!chart.hasNavigatorData && series && series.length) {
+                    var navigator = chart.highcharts.get('navigator');
+                    var padding = navigator.options.data || [];
+                    navigator.setData(_.first(padding, 1).concat(series, _.rest(padding, 1)), false);
+                    chart.hasNavigatorData = true;
+                }
+            });
+
+            // Changed datapoints can change extremes, but those changes should not load datapoints again.
+            chart.highcharts.get('x-axis').eventArgs = {'trigger': 'syncing'};
+            chart.highcharts.redraw(false);
+        });
+    };
+
+    // start and end arguments are in milliseconds.
+    NodeGraphs.prototype.setViewport = function (start, end, origin) {
+        var self = this;
+
+        // We use == and not === to test for both null and undefined.
+        if (start == null || end == null) return;
+
+        _.each(self.charts, function (chart) {
+            if (chart.highcharts !== origin) chart.highcharts.get('x-axis').setExtremes(start, end, true, false, {'trigger': 'syncing'});
+            chart.highcharts.showLoading("Loading data from server...");
+        });
+
+        self.load(start, end, function (graphs) {
+            if (graphs) self.update(graphs);
+
+            _.each(self.charts, function (chart) {
+                chart.highcharts.hideLoading();
+            });
+        });
+    };
+
     $(document).ready(function () {
-        var $nodeGraphs = $('.node-graphs');
-        $nodeGraphs.datastream({
-            'streamListUri': $nodeGraphs.data('source'),
-            'streamListParams': {
-                'tags__visualization__initial_set': true,
-                'tags__node': $nodeGraphs.data('node'),
-                // More streams per page.
-                'limit': 500
-            },
-            'timezoneOffset': parseInt($nodeGraphs.data('timezone'))
+        $('.node-graphs').each(function (i, element) {
+            new NodeGraphs(element, $(element).data('graphs-source')).start();
         });
     });
 })(jQuery);
@@ -1,12 +1,50 @@
+import datetime
+import logging
+
 from celery import task
 
+from django.utils import timezone
+
 from django_datastream import datastream
 
+from . import dirty, models, writebehind
+
+logger = logging.getLogger(__name__)
+
 
 @task.task()
-def run_downsampling():
+def run_downsampling(full=False):
     """
     Executes the `downsample_streams` API method on the datastream backend
-    as some backends need this to be executed periodically.
+    as some backends need this to be executed periodically. Unless a full
+    downsampling is requested, only streams that have received new datapoints
+    are downsampled.
+
+    :param full: Should all streams be downsampled
+    """
+
+    if full:
+        datastream.downsample_streams()
+    else:
+        until = timezone.now()
+        dirty.downsample_streams(models.DirtyStream.objects.pending(until), until)
+
+
+@task.task()
+def write_datapoints(operations, timestamp):
     """
-    datastream.downsample_streams()
+    Executes datastream operations queued by processors when write-behind is
+    enabled and marks the affected streams as dirty.
+
+    :param operations: A list of operations recorded by `WriteBehindStream`
+    :param timestamp: Timestamp of the recorded datapoints
+    """
+
+    tracker = dirty.DirtyStreamTracker(datastream)
+    writebehind.execute(operations, tracker)
+    models.DirtyStream.objects.mark(tracker.get_dirty_streams(), timezone.make_aware(timestamp, timezone.utc))
+
+    logger.debug("Executed %d datastream operations with a delay of %s." % (
+        len(operations),
+        datetime.datetime.utcnow() - timestamp,
+    ))
@@ -1,9 +1,15 @@
+import datetime
+import unittest
+
+import pytz
+
 from django import test as django_test
 from django.conf import settings
 
 import django_datastream
+from datastream import exceptions as ds_exceptions
 
-from . import base, exceptions, fields
+from . import base, derivation, dirty, exceptions, fields, graphs, models, writebehind
 from .pool import pool
 
 
@@ -117,3 +123,180 @@ class RegistryTestCase(django_test.TestCase):
         pool.unregister(DummyModel)
         with self.assertRaises(exceptions.StreamDescriptorNotRegistered):
             pool.unregister(DummyModel)
+
+
+class DummyDatastream(object):
+    def __init__(self, stale=()):
+        self.appended = []
+        self.stale = stale
+
+    def ensure_stream(self, query_tags, tags, value_downsamplers, highest_granularity, **kwargs):
+        return tags['name']
+
+    def append(self, stream_id, value, timestamp=None, check_timestamp=True):
+        if stream_id in self.stale:
+            raise ds_exceptions.InvalidTimestamp
+        self.appended.append((stream_id, value))
+
+
+class DirtyStreamsTestCase(unittest.TestCase):
+    def test_tracker(self):
+        stream = DummyDatastream()
+        tracker = dirty.DirtyStreamTracker(stream)
+
+        tracker.ensure_stream({}, {'name': 'uptime'}, [], None)
+        tracker.ensure_stream({}, {'name': 'reboots'}, [], None, derive_from=[{'name': 'reset', 'stream': 'uptime'}])
+        tracker.ensure_stream({}, {'name': 'rate'}, [], None, derive_from=[{'name': 'reset', 'stream': 'reboots'}, {'name': None, 'stream': 'bytes'}])
+        tracker.ensure_stream({}, {'name': 'other'}, [], None, derive_from=[{'name': None, 'stream': 'unrelated'}])
+        tracker.append('uptime', 1)
+        tracker.append('uptime', 2)
+
+        self.assertEqual(stream.appended, [('uptime', 1), ('uptime', 2)])
+        self.assertEqual(tracker.get_dirty_streams(), {'uptime': 2, 'reboots': 2, 'rate': 2})
+
+    def test_partition(self):
+        streams = [('a', None, 10), ('b', None, 1), ('c', None, 1), ('d', None, 5), ('e', None, 4)]
+        partitions = dirty.partition_streams(streams, 2)
+
+        self.assertEqual(sorted([sum([backlog for _, _, backlog in partition]) for partition in partitions]), [10, 11])
+        self.assertEqual(sorted(sum(partitions, [])), sorted(streams))
+
+    def test_next_downsample(self):
+        until = datetime.datetime(2015, 10, 1, 12, 30, 25, tzinfo=pytz.utc)
+
+        # Datapoint in the currently open 10-second window.
+        self.assertEqual(
+            models.get_next_downsample(datetime.datetime(2015, 10, 1, 12, 30, 12, tzinfo=pytz.utc), until),
+            datetime.datetime(2015, 10, 1, 12, 30, 20, tzinfo=pytz.utc),
+        )
+        # Datapoint in the currently open hourly window.
+        self.assertEqual(
+            models.get_next_downsample(datetime.datetime(2015, 10, 1, 12, 5, 0, tzinfo=pytz.utc), until),
+            datetime.datetime(2015, 10, 1, 13, 0, 0, tzinfo=pytz.utc),
+        )
+        # Datapoint from a day that has already been closed.
+        self.assertIsNone(
+            models.get_next_downsample(datetime.datetime(2015, 9, 30, 23, 0, 0, tzinfo=pytz.utc), until)
+        )
+
+
+class WriteBehindTestCase(unittest.TestCase):
+    def test_execute(self):
+        recorder = writebehind.WriteBehindStream()
+
+        uptime = recorder.ensure_stream({}, {'name': 'uptime'}, [], None)
+        recorder.ensure_stream({}, {'name': 'reboots'}, [], None, derive_from=[{'name': 'reset', 'stream': uptime}])
+        recorder.append(uptime, 1)
+        recorder.append(uptime, 2)
+
+        self.assertEqual(len(recorder.operations), 4)
+
+        stream = DummyDatastream()
+        tracker = dirty.DirtyStreamTracker(stream)
+        writebehind.execute(recorder.operations, tracker)
+
+        self.assertEqual(stream.appended, [('uptime', 1), ('uptime', 2)])
+        self.assertEqual(tracker.get_dirty_streams(), {'uptime': 2, 'reboots': 2})
+
+    def test_execute_stale(self):
+        recorder = writebehind.WriteBehindStream()
+
+        uptime = recorder.ensure_stream({}, {'name': 'uptime'}, [], None)
+        stale = recorder.ensure_stream({}, {'name': 'stale'}, [], None)
+        recorder.append(stale, 1)
+        recorder.append(uptime, 2)
+
+        stream = DummyDatastream(stale=['stale'])
+        tracker = dirty.DirtyStreamTracker(stream)
+        writebehind.execute(recorder.operations, tracker)
+
+        # Stale datapoints do not prevent the rest of the batch from being written.
+        self.assertEqual(stream.appended, [('uptime', 2)])
+        self.assertEqual(tracker.get_dirty_streams(), {'uptime': 1})
+
+    def test_queue(self):
+        self.assertEqual(writebehind.get_queue('node'), writebehind.get_queue('node'))
+        self.assertIn(writebehind.get_queue(None), writebehind.get_queues())
+
+
+class GraphsTestCase(unittest.TestCase):
+    def test_granularity(self):
+        end = datetime.datetime(2015, 10, 1, 12, 0, 0, tzinfo=pytz.utc)
+        Granularity = django_datastream.datastream.Granularity
+
+        self.assertEqual(graphs.get_granularity(end - datetime.timedelta(days=1), end, 300), Granularity.Minutes10)
+        self.assertEqual(graphs.get_granularity(end - datetime.timedelta(hours=1), end, 300), Granularity.Minutes)
+        self.assertEqual(graphs.get_granularity(end - datetime.timedelta(minutes=1), end, 300), Granularity.Seconds)
+        self.assertEqual(graphs.get_granularity(end - datetime.timedelta(days=3650), end, 300), Granularity.Days)
+
+    def test_bucket(self):
+        Granularity = django_datastream.datastream.Granularity
+
+        self.assertEqual(
+            graphs.get_bucket(
+                Granularity.Hours,
+                datetime.datetime(2015, 10, 1, 10, 15, 0, tzinfo=pytz.utc),
+                datetime.datetime(2015, 10, 1, 12, 5, 0, tzinfo=pytz.utc),
+            ),
+            (
+                datetime.datetime(2015, 10, 1, 10, 0, 0, tzinfo=pytz.utc),
+                datetime.datetime(2015, 10, 1, 13, 0, 0, tzinfo=pytz.utc),
+            )
+        )
+
+
+class DerivationTestCase(unittest.TestCase):
+    def test_counter_reset(self):
+        values = derivation.to_values([10, 20, None, 5, 15, 3])
+        resets, state = derivation.counter_reset(values)
+
+        self.assertEqual(list(resets), [3, 5])
+        self.assertEqual(state.value, 3)
+
+        resets, state = derivation.counter_reset(derivation.to_values([1, 2]), state)
+        self.assertEqual(list(resets), [0])
+
+    def test_counter_derivative(self):
+        timestamps = derivation.numpy.array([0, 10, 20, 30, 30, 40, 50, 60, 70], dtype=float)
+        values = derivation.to_values([0, 100, 300, 400, 500, None, 100, 50, 150])
+        resets = derivation.numpy.array([65], dtype=float)
+
+        indices, derivatives, state = derivation.counter_derivative(timestamps, values, resets)
+
+        # Zero time difference is skipped, a missing value is carried over and breaks the
+        # sequence, a decrease without a maximum value is skipped and the reset clears the state.
+        self.assertEqual(list(indices), [1, 2, 3, 5])
+        self.assertEqual(list(derivatives[:3]), [10.0, 20.0, 10.0])
+        self.assertTrue(derivation.numpy.isnan(derivatives[3]))
+        self.assertEqual(state, derivation.DerivationState(70, 150))
+
+        # Overflow is handled when the maximum value is known.
+        indices, derivatives, state = derivation.counter_derivative(
+            derivation.numpy.array([80, 90], dtype=float),
+            derivation.to_values([250, 10]),
+            max_value=255,
+            state=state,
+        )
+
+        self.assertEqual(list(indices), [0, 1])
+        self.assertEqual(list(derivatives), [10.0, 1.5])
+
+    def test_downsample(self):
+        Granularity = django_datastream.datastream.Granularity
+        timestamps = derivation.numpy.array([0, 30, 60, 90, 120], dtype=float)
+        values = derivation.to_values([1, 3, None, 4, 8])
+
+        datapoints = derivation.downsample(
+            timestamps,
+            values,
+            Granularity.Minutes,
+            value_downsamplers=['mean', 'max', 'count'],
+            time_downsamplers=['first'],
+        )
+
+        self.assertEqual([datapoint['v'] for datapoint in datapoints], [
+            {'m': 2.0, 'u': 3.0, 'c': 2},
+            {'m': 4.0, 'u': 4.0, 'c': 1},
+            {'m': 8.0, 'u': 8.0, 'c': 1},
+        ])
+        self.assertEqual(datapoints[1]['t'], {'a': datetime.datetime(1970, 1, 1, 0, 1, 0, tzinfo=pytz.utc)})
@@ -0,0 +1,210 @@
+import logging
+import time
+import zlib
+
+from django.conf import settings
+
+from datastream import exceptions as ds_exceptions
+
+from nodewatcher import celery
+
+# Should datapoints be written to the datastream by a separate consumer.
+ENABLED = getattr(settings, 'DATASTREAM_WRITE_BEHIND', False)
+# Celery queue used for datastream writes. Batches must be executed in the order they were queued,
+# so each queue must be consumed by a single worker process.
+QUEUE = getattr(settings, 'DATASTREAM_WRITE_BEHIND_QUEUE', 'datastream')
+# Number of queues among which batches are partitioned by node. Batches of the same node always
+# use the same queue, so that they are executed in order.
+PARTITIONS = getattr(settings, 'DATASTREAM_WRITE_BEHIND_PARTITIONS', 1)
+# Number of queued batches at which processors fall back to synchronous writes.
+MAX_BACKLOG = getattr(settings, 'DATASTREAM_WRITE_BEHIND_MAX_BACKLOG', 5000)
+# Interval (in seconds) after which the queue backlog is checked again.
+BACKLOG_CHECK_INTERVAL = 30
+
+logger = logging.getLogger(__name__)
+
+# Last known queue backlog and the time it was checked, per process.
+_backlog = {'size': 0, 'checked': None}
+
+
+class PendingStream(object):
+    """
+    Reference to a stream that will be created when the recorded operations
+    are executed.
+    """
+
+    def __init__(self, index):
+        self.index = index
+
+    def __repr__(self):
+        return '<PendingStream %d>' % self.index
+
+
+class WriteBehindStream(object):
+    """
+    A stand-in for the datastream API which records all operations, so that
+    they can be executed later by a separate consumer.
+    """
+
+    def __init__(self):
+        """
+        Class constructor.
+        """
+
+        self.operations = []
+
+    def ensure_stream(self, query_tags, tags, value_downsamplers, highest_granularity, derive_from=None, derive_op=None,
+                      derive_args=None, value_type=None, value_type_options=None):
+        """
+        Records stream creation and returns a reference to the future stream.
+        """
+
+        reference = PendingStream(len(self.operations))
+        self.operations.append(('ensure_stream', (query_tags, tags, value_downsamplers, highest_granularity), {
+            'derive_from': derive_from,
+            'derive_op': derive_op,
+            'derive_args': derive_args,
+            'value_type': value_type,
+            'value_type_options': value_type_options,
+        }))
+
+        return reference
+
+    def append(self, stream_id, value, timestamp=None, check_timestamp=True):
+        """
+        Records appending a datapoint into the stream.
+        """
+
+        self.operations.append(('append', (stream_id, value), {
+            'timestamp': timestamp,
+            'check_timestamp': check_timestamp,
+        }))
+
+    def delete_streams(self, query_tags=None):
+        """
+        Records stream removal.
+        """
+
+        self.operations.append(('delete_streams', (query_tags,), {}))
+
+
+def execute(operations, stream):
+    """
+    Executes recorded operations against the datastream API.
+
+    :param operations: A list of operations recorded by `WriteBehindStream`
+    :param stream: Stream API instance
+    """
+
+    references = {}
+
+    def resolve(stream_id):
+        if isinstance(stream_id, PendingStream):
+            return references[stream_id.index]
+        return stream_id
+
+    for index, (operation, args, kwargs) in enumerate(operations):
+        if operation == 'ensure_stream':
+            if kwargs['derive_from']:
+                kwargs = dict(kwargs, derive_from=[
+                    dict(source, stream=resolve(source['stream'])) for source in kwargs['derive_from']
+                ])
+
+            try:
+                references[index] = stream.ensure_stream(*args, **kwargs)
+            except ds_exceptions.InconsistentStreamConfiguration:
+                if not kwargs['derive_from']:
+                    raise
+
+                # Source streams of a derived stream have changed, drop the existing stream
+                # and re-create it. This is done synchronously by DynamicSumField.
+                stream.delete_streams(args[0])
+                references[index] = stream.ensure_stream(*args, **kwargs)
+        elif operation == 'append':
+            try:
+                stream.append(resolve(args[0]), args[1], **kwargs)
+            except ds_exceptions.InvalidTimestamp:
+                # A newer datapoint has already been written, for example synchronously while
+                # the queue was congested. Skip it, so the rest of the batch is still written.
+                logger.warning("Skipping datapoint for stream '%s' older than its latest datapoint." % resolve(args[0]))
+        else:
+            getattr(stream, operation)(*args, **kwargs)
+
+
+def get_queues():
+    """
+    Returns the names of all write-behind queues.
+    """
+
+    if PARTITIONS <= 1:
+        return [QUEUE]
+
+    return ['%s-%d' % (QUEUE, partition) for partition in xrange(PARTITIONS)]
+
+
+def get_queue(key):
+    """
+    Returns the write-behind queue for batches with the given partitioning key.
+
+    :param key: Partitioning key, for example node UUID
+    """
+
+    queues = get_queues()
+    return queues[zlib.crc32(key or '') % len(queues)]
+
+
+def get_backlog():
+    """
+    Returns the number of batches waiting in the write-behind queues.
+
+    :return: Number of queued batches or None when it cannot be determined
+    """
+
+    try:
+        with celery.app.connection() as connection:
+            backlog = 0
+            for queue in get_queues():
+                _, size, _ = connection.default_channel.queue_declare(queue=queue, passive=True)
+                backlog += size
+            return backlog
+    except Exception:
+        logger.exception("Unable to determine datastream write-behind queue backlog.")
+        return None
+
+
+def is_congested():
+    """
+    Checks whether the write-behind queue has too large a backlog, so that
+    processors should write synchronously. The backlog is only checked once
+    per `BACKLOG_CHECK_INTERVAL`.
+
+    :return: True if the queue is congested
+    """
+
+    now = time.time()
+    if _backlog['checked'] is None or now - _backlog['checked'] >= BACKLOG_CHECK_INTERVAL:
+        _backlog['checked'] = now
+        size = get_backlog()
+        if size is not None:
+            _backlog['size'] = size
+            if size >= MAX_BACKLOG:
+                logger.warning("Datastream write-behind queue backlog is %d batches, writing synchronously." % size)
+
+    return _backlog['size'] >= MAX_BACKLOG
+
+
+def enqueue(recorder, timestamp, key=None):
+    """
+    Queues recorded operations for execution by the consumer.
+
+    :param recorder: A `WriteBehindStream` instance
+    :param timestamp: Timestamp of the recorded datapoints
+    :param key: Partitioning key, batches with the same key are executed in order
+    """
+
+    if not recorder.operations:
+        return
+
+    from . import tasks
+
+    tasks.write_datapoints.apply_async(args=(recorder.operations, timestamp), queue=get_queue(key))
@@ -0,0 +1,238 @@
+import collections
+import json
+import zlib
+
+# Key under which edge source vertex identifiers are stored.
+EDGE_FROM = 'f'
+# Key under which edge destination vertex identifiers are stored.
+EDGE_TO = 't'
+
+
+class TopologyState(object):
+    """
+    Topology graph state in compact form. Vertices are identified by integers,
+    which are assigned in order of first appearance and are stable until the
+    next keyframe.
+    """
+
+    def __init__(self):
+        """
+        Class constructor.
+        """
+
+        # Vertex UUIDs, indexed by vertex identifier.
+        self.ids = []
+        self.index = {}
+        # Vertex attributes, indexed by vertex identifier.
+        self.vertices = {}
+        # A list of (source identifier, destination identifier, attributes) tuples.
+        self.edges = []
+
+    def get_id(self, uuid):
+        """
+        Returns the integer identifier of a vertex, assigning a new one if needed.
+
+        :param uuid: Vertex UUID
+        :return: Vertex identifier
+        """
+
+        try:
+            return self.index[uuid]
+        except KeyError:
+            self.index[uuid] = len(self.ids)
+            self.ids.append(uuid)
+            return self.index[uuid]
+
+    def derive(self, vertices, edges):
+        """
+        Creates a new state from a graph, reusing vertex identifiers of this state.
+
+        :param vertices: A dictionary mapping vertex UUIDs to their attributes
+        :param edges: A list of edge dictionaries with source and destination UUIDs
+        :return: New state instance
+        """
+
+        state = TopologyState()
+        state.ids = list(self.ids)
+        state.index = dict(self.index)
+
+        for uuid, attributes in vertices.iteritems():
+            state.vertices[state.get_id(str(uuid))] = dict(attributes)
+
+        for edge in edges:
+            attributes = dict(edge)
+            source = state.get_id(str(attributes.pop(EDGE_FROM)))
+            destination = state.get_id(str(attributes.pop(EDGE_TO)))
+            state.edges.append((source, destination, attributes))
+
+        return state
+
+    def to_graph(self):
+        """
+        Returns the graph in the format used by topology consumers, with vertices
+        and edges referenced by their UUIDs.
+
+        :return: A dictionary with vertices under 'v' and edges under 'e'
+        """
+
+        vertices = []
+        for vertex_id, attributes in sorted(self.vertices.iteritems()):
+            vertex = dict(attributes)
+            vertex['i'] = self.ids[vertex_id]
+            vertices.append(vertex)
+
+        edges = []
+        for source, destination, attributes in self.edges:
+            edge = dict(attributes)
+            edge[EDGE_FROM] = self.ids[source]
+            edge[EDGE_TO] = self.ids[destination]
+            edges.append(edge)
+
+        return {'v': vertices, 'e': edges}
+
+    def encode_keyframe(self):
+        """
+        Encodes the whole state.
+
+        :return: Encoded keyframe
+        """
+
+        return {
+            'ids': self.ids,
+            'v': [[vertex_id, attributes] for vertex_id, attributes in sorted(self.vertices.iteritems())],
+            'e': encode_edges(self.edges),
+        }
+
+    def encode_delta(self, state):
+        """
+        Encodes the difference between this state and a state derived from it.
+
+        :param state: New state
+        :return: Encoded delta
+        """
+
+        added_vertices = [
+            [vertex_id, attributes] for vertex_id, attributes in sorted(state.vertices.iteritems())
+            if self.vertices.get(vertex_id) != attributes
+        ]
+        removed_vertices = sorted(set(self.vertices) - set(state.vertices))
+
+        # Edges are matched by value, so edges with changed attributes are removed and added again.
+        available = collections.defaultdict(list)
+        for index, edge in enumerate(self.edges):
+            available[edge_key(edge)].append(index)
+
+        added_edges = []
+        for edge in state.edges:
+            matching = available.get(edge_key(edge))
+            if matching:
+                matching.pop()
+            else:
+                added_edges.append(edge)
+
+        removed_edges = sorted([index for indices in available.itervalues() for index in indices])
+
+        return {
+            'ids': state.ids[len(self.ids):],
+            'v+': added_vertices,
+            'v-': removed_vertices,
+            'e+': encode_edges(added_edges),
+            'e-': removed_edges,
+        }
+
+    def apply(self, data):
+        """
+        Applies an encoded keyframe or delta to this state.
+
+        :param data: Encoded keyframe or delta
+        """
+
+        self.ids.extend(data['ids'])
+        self.index = dict((uuid, vertex_id) for vertex_id, uuid in enumerate(self.ids))
+
+        for vertex_id in data.get('v-', []):
+            del self.vertices[vertex_id]
+        for vertex_id, attributes in data.get('v', []) + data.get('v+', []):
+            self.vertices[vertex_id] = attributes
+
+        if 'e-' in data:
+            removed = set(data['e-'])
+            self.edges = [edge for index, edge in enumerate(self.edges) if index not in removed]
+        self.edges.extend(decode_edges(data.get('e', data.get('e+'))))
+
+
+def edge_key(edge):
+    """
+    Returns a hashable key which identifies an edge by value.
+
+    :param edge: A (source, destination, attributes) tuple
+    :return: Edge key
+    """
+
+    source, destination, attributes = edge
+    return source, destination, json.dumps(attributes, sort_keys=True)
+
+
+def encode_edges(edges):
+    """
+    Encodes edges as columns. Source and destination identifiers are stored
+    under their own keys and each attribute has its own column, where missing
+    attributes are stored as nulls.
+
+    :param edges: A list of (source, destination, attributes) tuples
+    :return: A dictionary of columns
+    """
+
+    names = sorted(set([name for _, _, attributes in edges for name in attributes]))
+    columns = {
+        EDGE_FROM: [source for source, _, _ in edges],
+        EDGE_TO: [destination for _, destination, _ in edges],
+    }
+    for name in names:
+        columns['@%s' % name] = [attributes.get(name, None) for _, _, attributes in edges]
+
+    return columns
+
+
+def decode_edges(columns):
+    """
+    Decodes columns produced by `encode_edges`.
+
+    :param columns: A dictionary of columns
+    :return: A list of (source, destination, attributes) tuples
+    """
+
+    attribute_columns = [(name[1:], column) for name, column in columns.iteritems() if name.startswith('@')]
+
+    edges = []
+    for index, (source, destination) in enumerate(zip(columns[EDGE_FROM], columns[EDGE_TO])):
+        attributes = {}
+        for name, column in attribute_columns:
+            if column[index] is not None:
+                attributes[name] = column[index]
+
+        edges.append((source, destination, attributes))
+
+    return edges
+
+
+def pack(data):
+    """
+    Serializes an encoded keyframe or delta into its binary form.
+
+    :param data: Encoded keyframe or delta
+    :return: Binary string
+    """
+
+    return zlib.compress(json.dumps(data, separators=(',', ':')))
+
+
+def unpack(data):
+    """
+    Deserializes a binary keyframe or delta.
+
+    :param data: Binary string
+    :return: Encoded keyframe or delta
+    """
+
+    return json.loads(zlib.decompress(bytes(data)))
@@ -0,0 +1,124 @@
+import datetime
+
+from django.conf import settings
+from django.db import models
+
+from . import encoding
+
+# Interval after which a new keyframe is stored instead of a delta.
+KEYFRAME_INTERVAL = getattr(settings, 'TOPOLOGY_KEYFRAME_INTERVAL', datetime.timedelta(hours=1))
+# Age after which topology snapshots are removed.
+RETENTION = getattr(settings, 'TOPOLOGY_RETENTION', datetime.timedelta(days=30))
+
+
+class TopologySnapshotManager(models.Manager):
+    def get_state(self, timestamp=None):
+        """
+        Reconstructs the topology state at the given time from the last keyframe
+        and any following deltas.
+
+        :param timestamp: Optional timestamp, defaults to the latest snapshot
+        :return: A tuple (state, keyframe, latest), where keyframe and latest are the
+          snapshots the state was reconstructed from; the state is None when there
+          are no snapshots
+        """
+
+        keyframes = self.filter(keyframe=True)
+        if timestamp is not None:
+            keyframes = keyframes.filter(timestamp__lte=timestamp)
+
+        try:
+            keyframe = keyframes.latest('timestamp')
+        except self.model.DoesNotExist:
+            return None, None, None
+
+        snapshots = self.filter(timestamp__gte=keyframe.timestamp)
+        if timestamp is not None:
+            snapshots = snapshots.filter(timestamp__lte=timestamp)
+
+        state = encoding.TopologyState()
+        latest = None
+        for snapshot in snapshots.order_by('timestamp', 'pk'):
+            # Deltas following the keyframe are applied in order.
+            if snapshot.keyframe and snapshot.pk != keyframe.pk:
+                continue
+
+            state.apply(encoding.unpack(snapshot.data))
+            latest = snapshot
+
+        return state, keyframe, latest
+
+    def store(self, timestamp, vertices, edges):
+        """
+        Stores a topology snapshot. A keyframe is stored when the last one is too
+        old, otherwise only the difference from the previous snapshot.
+
+        :param timestamp: Snapshot timestamp
+        :param vertices: A dictionary mapping vertex UUIDs to their attributes
+        :param edges: A list of edge dictionaries with source and destination UUIDs
+        :return: Stored snapshot
+        """
+
+        previous, keyframe, _ = self.get_state()
+
+        if previous is None or timestamp - keyframe.timestamp >= KEYFRAME_INTERVAL:
+            state = encoding.TopologyState().derive(vertices, edges)
+            return self.create(timestamp=timestamp, keyframe=True, data=encoding.pack(state.encode_keyframe()))
+
+        state = previous.derive(vertices, edges)
+        return self.create(timestamp=timestamp, keyframe=False, data=encoding.pack(previous.encode_delta(state)))
+
+    def get_graph(self, timestamp=None):
+        """
+        Returns the topology graph at the given time.
+
+        :param timestamp: Optional timestamp, defaults to the latest snapshot
+        :return: A tuple (timestamp, graph), both None when there are no snapshots
+        """
+
+        state, keyframe, latest = self.get_state(timestamp)
+        if state is None:
+            return None, None
+
+        return latest.timestamp, state.to_graph()
+
+    def get_latest_timestamp(self):
+        """
+        Returns the timestamp of the latest snapshot or None when there are no
+        snapshots.
+        """
+
+        return self.order_by('-timestamp').values_list('timestamp', flat=True).first()
+
+    def expire(self, before):
+        """
+        Removes snapshots older than the given time. Snapshots are only removed up
+        to the last keyframe before that time, so that the state can still be
+        reconstructed at any retained time.
+
+        :param before: Timestamp before which snapshots are removed
+        """
+
+        try:
+            keyframe = self.filter(keyframe=True, timestamp__lte=before).latest('timestamp')
+        except self.model.DoesNotExist:
+            return
+
+        self.filter(timestamp__lt=keyframe.timestamp).delete()
+
+
+class TopologySnapshot(models.Model):
+    """
+    Compact snapshot of the network topology. Keyframes contain the whole
+    graph, while other snapshots contain only the difference from the
+    previous snapshot.
+    """
+
+    timestamp = models.DateTimeField(db_index=True)
+    keyframe = models.BooleanField(default=False)
+    data = models.BinaryField()
+
+    objects = TopologySnapshotManager()
+
+    def __repr__(self):
+        return '<TopologySnapshot %s%s>' % (self.timestamp, ' keyframe' if self.keyframe else '')
@@ -1,50 +1,16 @@
-from django.utils.translation import gettext_noop
-
-from django_datastream import datastream
+from django.utils import timezone
 
 from nodewatcher.core import models as core_models
 from nodewatcher.core.monitor import processors as monitor_processors, models as monitor_models
-from nodewatcher.modules.monitor.datastream import base as ds_base, fields as ds_fields
-from nodewatcher.modules.monitor.datastream.pool import pool as ds_pool
 
-from . import base as tp_base
+from . import base as tp_base, models as tp_models
 from .pool import pool as tp_pool
 
 
-class TopologyStreams(ds_base.StreamsBase):
-    topology = ds_fields.GraphField(tags={
-        'title': gettext_noop("Network topology"),
-        'description': gettext_noop("Network topology."),
-        'visualization': {
-            'type': 'graph',
-            'initial_set': True,
-        }
-    })
-
-    def get_stream_query_tags(self):
-        return {'module': 'topology'}
-
-    def get_stream_tags(self):
-        return {'module': 'topology'}
-
-    def get_stream_highest_granularity(self):
-        return datastream.Granularity.Minutes
-
-
-class TopologyStreamsData(object):
-    def __init__(self, vertices, edges):
-        self.topology = {
-            'v': [dict(i=uuid, **attrs) for uuid, attrs in vertices.iteritems()],
-            'e': edges,
-        }
-
-ds_pool.register(TopologyStreamsData, TopologyStreams)
-
-
 class Topology(monitor_processors.NetworkProcessor):
     """
-    Processor that stores the current overall network topology as a graph
-    into datastream.
+    Processor that stores the current overall network topology as a compact
+    graph snapshot.
     """
 
     def process(self, context, nodes):
@@ -102,7 +68,6 @@ class Topology(monitor_processors.NetworkProcessor):
 
             vertices[node.pk] = data
 
-        # Prepare graph for datastream processor
-        context.datastream.topology = TopologyStreamsData(vertices, edges)
+        tp_models.TopologySnapshot.objects.store(timezone.now(), vertices, edges)
 
         return context, nodes
@@ -0,0 +1,22 @@
+import datetime
+
+from django.utils import timezone
+
+from nodewatcher import celery
+
+from . import models
+
+# Register the periodic schedule.
+celery.app.conf.CELERYBEAT_SCHEDULE['nodewatcher.modules.monitor.topology.tasks.cleanup'] = {
+    'task': 'nodewatcher.modules.monitor.topology.tasks.cleanup',
+    'schedule': datetime.timedelta(hours=1),
+}
+
+
+@celery.app.task(queue='monitor', bind=True)
+def cleanup(self):
+    """
+    Cleanup old topology snapshots.
+    """
+
+    models.TopologySnapshot.objects.expire(timezone.now() - models.RETENTION)
@@ -0,0 +1,69 @@
+import unittest
+
+from . import encoding
+
+
+class EncodingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.vertices = {
+            'a': {'n': 'node-a'},
+            'b': {'n': 'node-b'},
+            'c': {},
+        }
+        self.edges = [
+            {'f': 'a', 't': 'b', 'lq': 1.0},
+            {'f': 'b', 't': 'a', 'lq': 0.5},
+            {'f': 'b', 't': 'c'},
+        ]
+
+    def assertGraphEqual(self, state, vertices, edges):
+        graph = state.to_graph()
+
+        self.assertEqual(dict((vertex.pop('i'), vertex) for vertex in graph['v']), vertices)
+        key = lambda edge: sorted(edge.items())
+        self.assertEqual(sorted(graph['e'], key=key), sorted(edges, key=key))
+
+    def test_keyframe(self):
+        state = encoding.TopologyState().derive(self.vertices, self.edges)
+        data = encoding.pack(state.encode_keyframe())
+
+        restored = encoding.TopologyState()
+        restored.apply(encoding.unpack(data))
+
+        self.assertEqual(restored.ids, state.ids)
+        self.assertGraphEqual(restored, self.vertices, self.edges)
+
+    def test_delta(self):
+        previous = encoding.TopologyState().derive(self.vertices, self.edges)
+
+        vertices = {
+            'a': {'n': 'node-a'},
+            'b': {'n': 'renamed'},
+            'd': {'n': 'node-d'},
+        }
+        edges = [
+            {'f': 'a', 't': 'b', 'lq': 1.0},
+            {'f': 'b', 't': 'a', 'lq': 0.75},
+            {'f': 'a', 't': 'd'},
+        ]
+        state = previous.derive(vertices, edges)
+        delta = encoding.unpack(encoding.pack(previous.encode_delta(state)))
+
+        # Only new vertices receive new identifiers and unchanged items are not stored.
+        self.assertEqual(delta['ids'], ['d'])
+        self.assertEqual(len(delta['v+']), 2)
+        self.assertEqual(len(delta['v-']), 1)
+        self.assertEqual(len(delta['e+']['f']), 2)
+        self.assertEqual(len(delta['e-']), 2)
+
+        restored = encoding.TopologyState()
+        restored.apply(previous.encode_keyframe())
+        restored.apply(delta)
+
+        self.assertGraphEqual(restored, vertices, edges)
+
+    def test_empty_delta(self):
+        previous = encoding.TopologyState().derive(self.vertices, self.edges)
+        delta = previous.encode_delta(previous.derive(self.vertices, self.edges))
+
+        self.assertEqual(delta, {'ids': [], 'v+': [], 'v-': [], 'e+': {'f': [], 't': []}, 'e-': []})
@@ -1,9 +1,166 @@
 import base64
+import hashlib
 import io
 import os
 
+from django.conf import settings
+
+from nodewatcher.core.generator import connection
 from nodewatcher.core.generator.cgm import base as cgm_base, exceptions as cgm_exceptions
 
+# Should builds start from root filesystems with packages already installed, which are kept
+# on the builders, instead of installing all packages on every build.
+WARM_CACHE = getattr(settings, 'OPENWRT_BUILDER_WARM_CACHE', False)
+# Maximum number of pre-staged root filesystems kept for each profile in each build slot.
+WARM_CACHE_SIZE = getattr(settings, 'OPENWRT_BUILDER_WARM_CACHE_SIZE', 4)
+# Directory (relative to the imagebuilder) holding pre-staged root filesystems.
+WARM_CACHE_PATH = 'warm'
+
+# Builds an image in steps, so that the root filesystem can be restored from or stored into
+# the warm cache after packages are installed and before the node's files are applied.
+# Arguments: profile, files path, packages, base to restore, base to store, cache directory
+# and the number of bases to keep.
+WARM_BUILD_SCRIPT = """
+set -e
+profile="$1"; files="$2"; packages="$3"; base="$4"; store="$5"; cache="$6"; keep="$7"
+
+target_dir=$(make -s --no-print-directory --eval='nw-target-dir: ; @echo $(TARGET_DIR)' nw-target-dir)
+rm -rf "$target_dir" bin
+mkdir -p "$target_dir" bin tmp dl
+
+if [ -n "$base" ]; then
+    echo "Restoring pre-staged root filesystem $base."
+    cp -a "$base/root/." "$target_dir/"
+    touch "$base"
+else
+    make package_index
+fi
+
+# Only packages missing from the restored root filesystem are installed.
+make package_install USER_PROFILE="$profile" USER_PACKAGES="$packages"
+
+if [ -n "$store" ]; then
+    echo "Storing pre-staged root filesystem $store."
+    rm -rf "$store.tmp"
+    mkdir -p "$store.tmp"
+    cp -a "$target_dir" "$store.tmp/root"
+    printf '%s' "$packages" > "$store.tmp/packages"
+    rm -rf "$store"
+    mv "$store.tmp" "$store"
+
+    # Remove least recently used root filesystems.
+    ls -1t "$cache" | grep -v '\\.tmp$' | tail -n +$((keep + 1)) | while read name; do
+        rm -rf "$cache/$name"
+    done
+fi
+
+make copy_files USER_FILES="$files"
+make package_postinst USER_PROFILE="$profile" USER_PACKAGES="$packages"
+make build_image USER_PROFILE="$profile"
+"""
+
+
+def get_warm_cache_key(result, profile, packages):
+    """
+    Returns the checksum identifying a pre-staged root filesystem with the
+    given packages installed.
+
+    :param result: Destination build result
+    :param profile: Device OpenWRT profile
+    :param packages: A list of packages
+    """
+
+    return hashlib.sha256('\n'.join([
+        result.builder.version.name,
+        profile['name'],
+        ' '.join(sorted(set(packages))),
+    ])).hexdigest()
+
+
+def find_warm_base(builder, result, profile, packages):
+    """
+    Finds the pre-staged root filesystem with most of the given packages
+    installed and no other packages. Root filesystems whose package sets
+    do not match their checksums are ignored.
+
+    :param builder: Builder connection
+    :param result: Destination build result
+    :param profile: Device OpenWRT profile
+    :param packages: A list of packages
+    :return: Path of the root filesystem relative to the imagebuilder or None
+    """
+
+    cache_path = os.path.join(WARM_CACHE_PATH, profile['name'])
+    try:
+        names = builder.list_dir(cache_path)
+    except IOError:
+        return None
+
+    packages = set(packages)
+    best, best_size = None, -1
+    for name in names:
+        if name.endswith('.tmp'):
+            continue
+
+        try:
+            base_packages = builder.read_result_file(os.path.join(cache_path, name, 'packages')).split()
+        except IOError:
+            continue
+
+        if get_warm_cache_key(result, profile, base_packages) != name:
+            continue
+
+        base_packages = set(base_packages)
+        if base_packages <= packages and len(base_packages) > best_size:
+            best, best_size = os.path.join(cache_path, name), len(base_packages)
+
+    return best
+
+
+def build_image_warm(builder, result, profile, temp_path, packages):
+    """
+    Runs the build system, reusing a pre-staged root filesystem from the
+    warm cache when one is available.
+
+    :param builder: Builder connection
+    :param result: Destination build result
+    :param profile: Device OpenWRT profile
+    :param temp_path: Path to the node's files
+    :param packages: A list of packages
+    :return: Build log
+    """
+
+    cache_path = os.path.join(WARM_CACHE_PATH, profile['name'])
+    key = get_warm_cache_key(result, profile, packages)
+    base = find_warm_base(builder, result, profile, packages)
+
+    # Store a new root filesystem unless there already is one with exactly the same packages.
+    store = None
+    if base is None or os.path.basename(base) != key:
+        store = os.path.join(cache_path, key)
+
+    args = [
+        profile['name'],
+        temp_path,
+        ' '.join(packages),
+        base or '',
+        store or '',
+        cache_path,
+        str(WARM_CACHE_SIZE),
+    ]
+
+    try:
+        return builder.call('sh', '-c', WARM_BUILD_SCRIPT, 'warm-build', *args)
+    except cgm_exceptions.BuildError:
+        if base is None:
+            raise
+
+    # The pre-staged root filesystem may be broken, so remove it and retry without it.
+    builder.call('rm', '-rf', base)
+    args[3] = ''
+    args[4] = os.path.join(cache_path, key)
+    return builder.call('sh', '-c', WARM_BUILD_SCRIPT, 'warm-build', *args)
+
 
 def build_image(result, profile):
     """
@@ -11,20 +168,22 @@ def build_image(result, profile):
 
     :param result: Destination build result
     :param profile: Device OpenWRT profile
-    :return: A list of output firmware files
+    :return: A list of (filename, build artifact) tuples
     """
 
     cfg = result.config
 
-    with result.builder.connect() as builder:
+    with result.builder.connect(slot=result.slot) as builder:
         temp_path = builder.create_tempdir()
+        # All files are staged in a single batch, relative to the temporary directory.
+        files = connection.FileBatch()
 
         # Prepare configuration files.
-        cfg_path = os.path.join(temp_path, 'etc', 'config')
+        cfg_path = os.path.join('etc', 'config')
         for fname, content in cfg.items():
             if fname.startswith('_'):
                 continue
-            builder.write_file(os.path.join(cfg_path, fname), content)
+            files.add_file(os.path.join(cfg_path, fname), content)
 
         # Prepare user account files.
         from . import crypt
@@ -37,26 +196,26 @@ def build_image(result, profile):
                 )
 
             passwd.write('%(username)s:%(password)s:%(uid)d:%(gid)d:%(username)s:%(home)s:%(shell)s\n' % account)
-        builder.write_file(os.path.join(temp_path, 'etc', 'passwd'), passwd.getvalue().encode('ascii'))
+        files.add_file(os.path.join('etc', 'passwd'), passwd.getvalue().encode('ascii'))
 
         # Prepare the banner file if configured.
         if cfg.get('_banner', None):
             banner = io.StringIO()
             banner.write(cfg['_banner'])
-            builder.write_file(os.path.join(temp_path, 'etc', 'banner'), banner.getvalue().encode('ascii'))
+            files.add_file(os.path.join('etc', 'banner'), banner.getvalue().encode('ascii'))
 
         # Prepare the sysctl configuration.
         if cfg.get('_sysctl', None):
             sysctl = io.StringIO()
             for key, value in cfg['_sysctl'].items():
                 sysctl.write('%s=%s\n' % (key, value))
-            builder.write_file(os.path.join(temp_path, 'etc', 'sysctl.conf'), sysctl.getvalue().encode('ascii'))
+            files.add_file(os.path.join('etc', 'sysctl.conf'), sysctl.getvalue().encode('ascii'))
 
         # Prepare the routing table mappings.
         tables = io.StringIO()
         for identifier, name in cfg['_routing_tables'].items():
             tables.write('%s\t%s\n' % (identifier, name))
-        builder.write_file(os.path.join(temp_path, 'etc', 'iproute2', 'rt_tables'), tables.getvalue().encode('ascii'))
+        files.add_file(os.path.join('etc', 'iproute2', 'rt_tables'), tables.getvalue().encode('ascii'))
 
         # Prepare the crypto objects.
         ssh_authorized_keys = io.StringIO()
@@ -74,37 +233,41 @@ def build_image(result, profile):
             else:
                 content = content.encode('ascii')
 
-            builder.write_file(os.path.join(temp_path, crypto_object['path'][1:]), content)
+            files.add_file(crypto_object['path'][1:], content)
 
-        builder.write_file(
-            os.path.join(temp_path, 'etc', 'dropbear', 'authorized_keys'),
+        files.add_directory(os.path.join('etc', 'dropbear'), 0755)
+        files.add_file(
+            os.path.join('etc', 'dropbear', 'authorized_keys'),
             ssh_authorized_keys.getvalue().encode('ascii'),
             mode=0600,
         )
 
-        builder.chmod(os.path.join(temp_path, 'etc', 'dropbear'), 0755)
-
         # Prepare any custom files.
         for path, custom_file in cfg['_files'].items():
             if path[0] == '/':
                 path = path[1:]
 
-            builder.write_file(
-                os.path.join(temp_path, path),
+            files.add_file(
+                path,
                 custom_file['content'].encode('utf8'),
                 mode=custom_file['mode'],
             )
 
-        # Clean the build first to prevent accidentally taking build results from a previous build.
-        builder.call('make', 'clean')
+        builder.write_files(temp_path, files)
 
-        # Run the build system and wait for its completion.
-        result.build_log = builder.call(
-            'make', 'image',
-            'PROFILE=%s' % profile["name"],
-            'FILES=%s' % temp_path,
-            'PACKAGES=%s' % " ".join(cfg['_packages'])
-        )
+        if WARM_CACHE:
+            result.build_log = build_image_warm(builder, result, profile, temp_path, cfg['_packages'])
+        else:
+            # Clean the build first to prevent accidentally taking build results from a previous build.
+            builder.call('make', 'clean')
+
+            # Run the build system and wait for its completion.
+            result.build_log = builder.call(
+                'make', 'image',
+                'PROFILE=%s' % profile["name"],
+                'FILES=%s' % temp_path,
+                'PACKAGES=%s' % " ".join(cfg['_packages'])
+            )
 
         # Determine the location of output files.
         output_locations = builder.list_dir('bin')
@@ -115,7 +278,7 @@ def build_image(result, profile):
             for output_location in output_locations:
                 try:
                     fw_files.append(
-                        (fw_file, builder.read_result_file(os.path.join('bin', output_location, fw_file)))
+                        (fw_file, builder.stream_result_file(os.path.join('bin', output_location, fw_file)))
                     )
                     break
                 except IOError:
@@ -1,3 +1,4 @@
+import bisect
 import collections
 
 import apt_pkg
@@ -43,20 +44,32 @@ class UCISection(object):
         self.__dict__['_typ'] = typ
         self.__dict__['_managed_by'] = managed_by
         self.__dict__['_values'] = collections.OrderedDict()
+        # Root that indexes this section, the index key and sequence number are set
+        # when the section is added to a root.
+        self.__dict__['_indexed_by'] = None
+        self.__dict__['_index_key'] = None
+        self.__dict__['_sequence'] = None
 
     def __setattr__(self, name, value):
         """
         Sets a configuration attribute.
         """
 
+        old_value = self._values.get(name, None)
         self._values[name] = value
 
+        if self._indexed_by is not None:
+            self._indexed_by.update_index(self, name, old_value, value)
+
     def __delattr__(self, name):
         """
         Deletes a configuration attribute.
         """
 
-        del self._values[name]
+        old_value = self._values.pop(name)
+
+        if self._indexed_by is not None:
+            self._indexed_by.update_index(self, name, old_value, None)
 
     def __getattr__(self, name):
         """
@@ -155,12 +168,90 @@ class UCISection(object):
         return output
 
 
+class UCISectionIndex(object):
+    """
+    Index of sections of a single type by the value of an attribute. Sections
+    are kept in order of their creation.
+    """
+
+    def __init__(self, attribute, sections):
+        """
+        Class constructor.
+
+        :param attribute: Attribute name
+        :param sections: Sections to index
+        """
+
+        self.attribute = attribute
+        self._buckets = {}
+        # Sections with values that cannot be hashed are compared on lookup.
+        self._unhashable = []
+
+        for section in sections:
+            self.add(section, getattr(section, attribute, None))
+
+    def _get_bucket(self, value, create=False):
+        try:
+            if create:
+                return self._buckets.setdefault(value, [])
+            return self._buckets.get(value, [])
+        except TypeError:
+            return self._unhashable
+
+    def add(self, section, value):
+        """
+        Adds a section to the index.
+
+        :param section: Section instance
+        :param value: Attribute value
+        """
+
+        bisect.insort(self._get_bucket(value, create=True), (section._sequence, section))
+
+    def remove(self, section, value):
+        """
+        Removes a section from the index.
+
+        :param section: Section instance
+        :param value: Previous attribute value
+        """
+
+        bucket = self._get_bucket(value)
+        position = bisect.bisect_left(bucket, (section._sequence,))
+        if position < len(bucket) and bucket[position][1] is section:
+            del bucket[position]
+
+    def lookup(self, value):
+        """
+        Returns a list of (sequence, section) tuples for sections with the given
+        attribute value.
+
+        :param value: Attribute value
+        """
+
+        try:
+            entries = self._buckets.get(value, [])
+        except TypeError:
+            entries = []
+
+        if self._unhashable:
+            entries = sorted(entries + [
+                entry for entry in self._unhashable if getattr(entry[1], self.attribute, None) == value
+            ])
+
+        return entries
+
+
 class UCIRoot(object):
     """
     Represents an UCI configuration file with multiple named and ordered
     sections.
     """
 
+    # Index key kinds.
+    NAMED = 'named'
+    ORDERED = 'ordered'
+
     def __init__(self, root):
         """
         Class constructor.
@@ -171,6 +262,77 @@ class UCIRoot(object):
         self._root = root
         self._named_sections = collections.OrderedDict()
         self._ordered_sections = collections.OrderedDict()
+        # Sections in order of creation, indexed by (kind, type) keys.
+        self._typed_sections = {}
+        # Attribute indices, indexed by (kind, type) keys and attribute names.
+        self._indices = {}
+        self._sequence = 0
+
+    def _register_section(self, section, key):
+        """
+        Adds a section to the secondary indices.
+
+        :param section: Section instance
+        :param key: A (kind, type) tuple
+        """
+
+        section.__dict__['_indexed_by'] = self
+        section.__dict__['_index_key'] = key
+        section.__dict__['_sequence'] = self._sequence
+        self._sequence += 1
+
+        self._typed_sections.setdefault(key, []).append(section)
+        for attribute, index in self._indices.get(key, {}).iteritems():
+            index.add(section, getattr(section, attribute, None))
+
+    def update_index(self, section, attribute, old_value, new_value):
+        """
+        Updates secondary indices after a section attribute has changed.
+
+        :param section: Section instance
+        :param attribute: Attribute name
+        :param old_value: Previous attribute value
+        :param new_value: New attribute value
+        """
+
+        index = self._indices.get(section._index_key, {}).get(attribute, None)
+        if index is None:
+            return
+
+        index.remove(section, old_value)
+        index.add(section, new_value)
+
+    def _find_sections(self, key, query):
+        """
+        Returns sections of a given type with specific attribute values. Indices
+        are built on first use of an attribute and maintained afterwards.
+
+        :param key: A (kind, type) tuple
+        :param query: Attribute query
+        :return: A list of sections in order of creation
+        """
+
+        if not query:
+            return list(self._typed_sections.get(key, []))
+
+        indices = self._indices.setdefault(key, {})
+        candidates = None
+        for attribute, value in query.items():
+            index = indices.get(attribute, None)
+            if index is None:
+                index = indices[attribute] = UCISectionIndex(attribute, self._typed_sections.get(key, []))
+
+            entries = index.lookup(value)
+            if candidates is None or len(entries) < len(candidates):
+                candidates = entries
+
+        if len(query) == 1:
+            return [section for order, section in candidates]
+
+        return [
+            section for order, section in candidates
+            if all((getattr(section, a, None) == v for a, v in query.items()))
+        ]
 
     def add(self, *args, **kwargs):
         """
@@ -195,10 +357,12 @@ class UCIRoot(object):
                 raise ValueError("UCI section '{0}' is already defined!".format(section_key))
 
             self._named_sections[section_key] = section
+            self._register_section(section, (UCIRoot.NAMED, section.get_type()))
         else:
             # Adding an ordered section
             section = UCISection(managed_by=managed_by)
             self._ordered_sections.setdefault(args[0], []).append(section)
+            self._register_section(section, (UCIRoot.ORDERED, args[0]))
 
         return section
 
@@ -242,15 +406,7 @@ class UCIRoot(object):
         :return: A list of named sections matching the criteria
         """
 
-        sections = []
-        for name, section in self.named_sections():
-            if section.get_type() != section_type:
-                continue
-
-            if all((getattr(section, a, None) == v for a, v in query.items())):
-                sections.append(section)
-
-        return sections
+        return self._find_sections((UCIRoot.NAMED, section_type), query)
 
     def find_ordered_section(self, section_type, **query):
         """
@@ -278,12 +434,7 @@ class UCIRoot(object):
         :return: List of ordered sections matching the criteria
         """
 
-        sections = []
-        for section in self._ordered_sections.get(section_type, []):
-            if all((getattr(section, a, None) == v for a, v in query.items())):
-                sections.append(section)
-
-        return sections
+        return self._find_sections((UCIRoot.ORDERED, section_type), query)
 
     def __iter__(self):
         return self.named_sections()
@@ -452,7 +603,10 @@ class UCIConfiguration(cgm_base.PlatformConfiguration):
         if root.startswith('__') and root.endswith('__'):
             raise AttributeError(root)
 
-        return self._roots.setdefault(root, UCIRoot(root))
+        try:
+            return self._roots[root]
+        except KeyError:
+            return self._roots.setdefault(root, UCIRoot(root))
 
     __getitem__ = __getattr__
 
@@ -490,7 +644,7 @@ class PlatformOpenWRT(cgm_base.PlatformBase):
         formatted configuration.
 
         :param result: Destination build result
-        :return: A list of generated firmware files
+        :return: A list of (filename, build artifact) tuples
         """
 
         # Extract the device descriptor to get the profile
@@ -499,6 +653,19 @@ class PlatformOpenWRT(cgm_base.PlatformBase):
 
         return openwrt_builder.build_image(result, profile)
 
+    def get_build_fingerprint(self, result):
+        """
+        Returns a description of all inputs that determine the firmware built
+        for a build result.
+
+        :param result: Destination build result
+        :return: A JSON-serializable fingerprint
+        """
+
+        fingerprint = super(PlatformOpenWRT, self).get_build_fingerprint(result)
+        fingerprint['profile'] = result.node.config.core.general().get_device().profiles['openwrt']
+        return fingerprint
+
 cgm_base.register_platform('openwrt', _("OpenWRT"), PlatformOpenWRT())
 
 # NAT routing table.
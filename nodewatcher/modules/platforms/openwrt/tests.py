@@ -0,0 +1,151 @@
+import random
+import unittest
+
+from . import cgm
+
+
+def scan(root, section_type, named, **query):
+    """
+    Finds sections by scanning all sections of a root, which is how lookups
+    were performed before sections were indexed.
+    """
+
+    if named:
+        sections = [section for name, section in root.named_sections() if section.get_type() == section_type]
+    else:
+        sections = dict(root.ordered_sections()).get(section_type, [])
+
+    return [section for section in sections if all((getattr(section, a, None) == v for a, v in query.items()))]
+
+
+class UCIRootTestCase(unittest.TestCase):
+    def assertLookup(self, root, section_type, named, **query):
+        if named:
+            sections = root.find_all_named_sections(section_type, **query)
+            first = root.find_named_section(section_type, **query)
+        else:
+            sections = root.find_all_ordered_sections(section_type, **query)
+            first = root.find_ordered_section(section_type, **query)
+
+        expected = scan(root, section_type, named, **query)
+        self.assertEqual([id(section) for section in sections], [id(section) for section in expected])
+        self.assertIs(first, expected[0] if expected else None)
+
+    def test_lookup(self):
+        manager = object()
+        root = cgm.UCIRoot('network')
+        for i in xrange(10):
+            interface = root.add(interface='if%d' % i, managed_by=manager if i % 3 == 0 else None)
+            interface.proto = 'static' if i % 2 else 'dhcp'
+            if i % 4:
+                interface.ifname = 'eth%d' % (i % 4)
+
+            root.add(device='dev%d' % i).proto = 'static'
+
+        self.assertLookup(root, 'interface', True)
+        self.assertLookup(root, 'interface', True, proto='static')
+        self.assertLookup(root, 'interface', True, proto='static', ifname='eth1')
+        self.assertLookup(root, 'interface', True, ifname=None)
+        self.assertLookup(root, 'interface', True, proto='none')
+        self.assertLookup(root, 'interface', True, _managed_by=manager)
+
+        # Sections of other types are never returned.
+        self.assertLookup(root, 'device', True, proto='static')
+
+    def test_ordered(self):
+        root = cgm.UCIRoot('firewall')
+        for i in xrange(10):
+            zone = root.add('zone')
+            zone.name = 'zone%d' % (i % 3)
+            zone.network = ['net%d' % i]
+            root.add('rule').name = 'zone%d' % (i % 3)
+
+        self.assertLookup(root, 'zone', False)
+        self.assertLookup(root, 'zone', False, name='zone1')
+        self.assertLookup(root, 'zone', False, name='zone1', network=['net4'])
+        self.assertLookup(root, 'rule', False, name='zone2')
+        self.assertLookup(root, 'forwarding', False, name='zone2')
+
+    def test_assignment(self):
+        root = cgm.UCIRoot('network')
+        sections = [root.add(interface='if%d' % i) for i in xrange(5)]
+        for section in sections:
+            section.proto = 'dhcp'
+
+        # Build the index before changing attributes.
+        self.assertLookup(root, 'interface', True, proto='dhcp')
+
+        sections[3].proto = 'static'
+        sections[1].proto = 'static'
+        self.assertLookup(root, 'interface', True, proto='static')
+        self.assertLookup(root, 'interface', True, proto='dhcp')
+
+        # Sections are returned in order of creation, not in order of assignment.
+        sections[1].proto = 'dhcp'
+        sections[1].proto = 'static'
+        self.assertEqual(root.find_all_named_sections('interface', proto='static'), [sections[1], sections[3]])
+
+        # Deleting an attribute removes the section from its bucket.
+        del sections[3].proto
+        self.assertLookup(root, 'interface', True, proto='static')
+        self.assertLookup(root, 'interface', True, proto=None)
+
+        sections[0]['proto'] = 'static'
+        del sections[1]['proto']
+        self.assertLookup(root, 'interface', True, proto='static')
+        self.assertLookup(root, 'interface', True, proto=None)
+
+        # Sections added after the index has been built are indexed as well.
+        root.add(interface='if5').proto = 'static'
+        self.assertLookup(root, 'interface', True, proto='static')
+
+    def test_unhashable(self):
+        root = cgm.UCIRoot('firewall')
+        sections = [root.add('zone') for i in xrange(5)]
+        sections[0].network = ['lan']
+        sections[1].network = 'lan'
+        sections[2].network = ['lan', 'wan']
+        sections[3].network = ['lan']
+
+        self.assertLookup(root, 'zone', False, network=['lan'])
+        self.assertLookup(root, 'zone', False, network='lan')
+        self.assertLookup(root, 'zone', False, network={'lan': True})
+        self.assertLookup(root, 'zone', False, network=None)
+
+        # Values change between hashable and unhashable ones.
+        sections[0].network = 'lan'
+        sections[1].network = ['lan']
+        sections[4].network = ['lan']
+        del sections[3].network
+        self.assertLookup(root, 'zone', False, network=['lan'])
+        self.assertLookup(root, 'zone', False, network='lan')
+        self.assertLookup(root, 'zone', False, network=None)
+
+    def test_random(self):
+        rng = random.Random(42)
+        values = [None, 'a', 'b', 'c', 1, ['a'], ['a', 'b']]
+        root = cgm.UCIRoot('network')
+        sections = []
+
+        for step in xrange(500):
+            if not sections or rng.random() < 0.2:
+                if rng.random() < 0.5:
+                    sections.append(root.add(interface='if%d' % step))
+                else:
+                    sections.append(root.add('route'))
+
+            section = rng.choice(sections)
+            attribute = rng.choice(['proto', 'ifname'])
+            value = rng.choice(values)
+            if value is None:
+                if getattr(section, attribute) is not None:
+                    delattr(section, attribute)
+            else:
+                setattr(section, attribute, value)
+
+            query = {attribute: rng.choice(values)}
+            if rng.random() < 0.3:
+                query['proto' if attribute == 'ifname' else 'ifname'] = rng.choice(values)
+
+            self.assertLookup(root, 'interface', True, **query)
+            self.assertLookup(root, 'route', False, **query)
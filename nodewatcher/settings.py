@@ -445,6 +445,14 @@ CELERY_QUEUES = {
         'exchange': 'monitor',
         'binding_key': 'monitor',
     },
+    'datastream': {
+        'exchange': 'datastream',
+        'binding_key': 'datastream',
+    },
+    'events': {
+        'exchange': 'events',
+        'binding_key': 'events',
+    },
 }
 
 CELERY_ROUTES = {
@@ -456,6 +464,10 @@ CELERY_ROUTES = {
     'nodewatcher.core.monitor.tasks.run_pipeline': {
         'queue': 'monitor',
     },
+    # Events.
+    'nodewatcher.core.events.tasks.deliver_events': {
+        'queue': 'events',
+    },
 }
 
 # Monitoring runs and processors configuration; this defines the order in which monitoring processors
@@ -547,6 +559,13 @@ MONITOR_RUNS = {
     },
 }
 
+# Write monitoring data into the datastream from a separate consumer on the datastream queue, so that
+# datastream backend latency does not extend monitoring runs. Writes of a node must be executed in
+# order, so the queue must be consumed by a single worker process (celery worker -Q datastream -c 1).
+# Set DATASTREAM_WRITE_BEHIND_PARTITIONS to partition writes by node among multiple queues named
+# datastream-0, datastream-1 and so on, each with its own single process worker.
+DATASTREAM_WRITE_BEHIND = False
+
 # Identifier of the run that should be used to handle HTTP pushes.
 MONITOR_HTTP_PUSH_RUN = 'telemetry-push'
 # Base host that should be used for HTTP push. Must be reachable from nodes.
@@ -571,6 +590,18 @@ MEASUREMENT_SOURCE_NODE = ''
 
 # Storage for generated firmware images.
 GENERATOR_STORAGE = 'django.core.files.storage.FileSystemStorage'
+# Maximum total size (in bytes) of the firmware build cache. Set to zero to disable caching.
+GENERATOR_BUILD_CACHE_SIZE = 10 * 1024 * 1024 * 1024
+# Time (in seconds) after which running firmware builds are considered failed.
+GENERATOR_BUILD_TIMEOUT = 2 * 60 * 60
+# Maximum number of nodes for which each process keeps results of configuration validation, so
+# that validating an edited node only re-runs affected modules. Results are discarded when other
+# nodes or builders change, which requires a cache backend (see CACHES) shared by all processes.
+# Without one, validation always runs all modules.
+GENERATOR_INCREMENTAL_CACHE_SIZE = 100
+# Should OpenWrt builders keep root filesystems with packages already installed and reuse
+# them for builds with the same profile and packages.
+OPENWRT_BUILDER_WARM_CACHE = False
 
 # Disable South migrations during unit tests as they will fail
 SOUTH_TESTS_MIGRATE = False
@@ -620,10 +651,44 @@ NETWORK = {
 }
 
 EVENTS_EMAIL = DEFAULT_FROM_EMAIL
+# Window (in seconds) within which repeated node events are coalesced into a single stored event,
+# which records the number of repeats. Set to zero to disable coalescing.
+EVENTS_COALESCE_WINDOW = 0
+# Maximum number of stored events related to a node within EVENTS_STORM_WINDOW seconds, further
+# events are not stored. Set to zero to disable storm suppression.
+EVENTS_STORM_RATE = 0
+EVENTS_STORM_WINDOW = 300
+# Number of days for which stored events are kept, by severity (1 is info, 2 is warning and 3 is error).
+EVENTS_RETENTION = {
+    1: 90,
+    2: 180,
+    3: 365,
+}
 IMAGE_GENERATOR_EMAIL = DEFAULT_FROM_EMAIL
 
 FRONTEND_MAIN_COMPONENT = 'ListComponent'
 
+# Cache API responses and answer conditional requests. Responses are invalidated when monitoring
+# cycles finish or configuration is saved, which requires a cache backend (see CACHES) shared by
+# all processes, so it should only be enabled when one is configured.
+API_CACHE = False
+API_CACHE_TIMEOUT = 300
+# Time (in seconds) for which counts of API results are cached. Set to zero to count results on every request.
+API_COUNT_CACHE_TIMEOUT = 60
+
+# Highest map zoom level at which nodes are clustered by the map API.
+MAP_CLUSTERING_MAX_ZOOM = 12
+# Time (in seconds) for which map tiles are cached. Tiles are also invalidated when a topology
+# snapshot is stored or node configuration changes, where the latter requires a cache backend
+# (see CACHES) shared by all processes. Without one, tiles are cached for MAP_TILE_LOCAL_CACHE_TIMEOUT.
+MAP_TILE_CACHE_TIMEOUT = 3600
+MAP_TILE_LOCAL_CACHE_TIMEOUT = 60
+
+# Maximum age (in seconds) of precomputed statistics, which are refreshed by a periodic task.
+# Statistics are refreshed earlier when data they depend on changes, which requires a cache
+# backend (see CACHES) shared by all processes. Without one, they are only refreshed by age.
+STATISTICS_REFRESH_INTERVAL = 3600
+
 MENUS = {
     'main_menu': [
         {
@@ -0,0 +1,82 @@
+import time
+
+from django.conf import settings
+from django.core import cache
+from django.db.models import signals as django_signals
+
+# Cache key of a generation counter.
+GENERATION_KEY = 'nodewatcher.generation.%s'
+# Cache backends which keep data separately in each process.
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def get_initial():
+    # Counters start at the current time, so that a counter evicted from the cache
+    # never repeats a value it has already had.
+    return int(time.time() * 1000)
+
+
+def is_shared():
+    """
+    Returns true if generations are shared by all processes. This requires
+    a default cache backend which is not local to each process, otherwise
+    generations changed in one process are not seen by other processes.
+    """
+
+    return settings.CACHES.get(cache.DEFAULT_CACHE_ALIAS, {}).get('BACKEND', None) not in LOCAL_CACHE_BACKENDS
+
+
+def get(scopes):
+    """
+    Returns the current generations of the given scopes. A generation changes
+    whenever data in its scope changes, so it may be used to invalidate data
+    derived from it.
+
+    :param scopes: A list of scope names
+    :return: A tuple of generations
+    """
+
+    keys = [GENERATION_KEY % scope for scope in scopes]
+    generations = cache.cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.cache.add(key, get_initial(), timeout=None)
+            generations[key] = cache.cache.get(key)
+
+    return tuple([generations[key] for key in keys])
+
+
+def bump(scope):
+    """
+    Changes the generation of a scope.
+
+    :param scope: Scope name
+    """
+
+    key = GENERATION_KEY % scope
+    try:
+        cache.cache.incr(key)
+    except ValueError:
+        cache.cache.add(key, get_initial(), timeout=None)
+
+
+def bump_on_change(scope, *models):
+    """
+    Changes the generation of a scope whenever instances of the given models
+    are saved or deleted.
+
+    :param scope: Scope name
+    :param models: Model classes
+    """
+
+    def receiver(sender, raw=False, **kwargs):
+        if not raw:
+            bump(scope)
+
+    for model in models:
+        dispatch_uid = 'nodewatcher.generation.%s.%s.%s' % (scope, model._meta.app_label, model._meta.model_name)
+        django_signals.post_save.connect(receiver, sender=model, weak=False, dispatch_uid=dispatch_uid)
+        django_signals.post_delete.connect(receiver, sender=model, weak=False, dispatch_uid=dispatch_uid)
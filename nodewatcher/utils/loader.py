@@ -3,6 +3,9 @@ import importlib
 from django.apps import apps
 from django.utils import module_loading
 
+# Application modules that have already been loaded, as (application, type) tuples.
+_loaded = set()
+
 
 def load_modules(*types):
     """
@@ -18,6 +21,13 @@ def load_modules(*types):
     # on the first import failure). See: https://code.djangoproject.com/ticket/23670
     for app in apps.get_app_configs():
         for type in types:
+            # Modules are loaded on every registry operation, so avoid checking the
+            # filesystem again once they have been loaded
+            if (app.name, type) in _loaded:
+                continue
+
             # Attempt to import the submodule if it exists
             if module_loading.module_has_submodule(app.module, type):
                 importlib.import_module(".%s" % type, app.name)
+
+            _loaded.add((app.name, type))